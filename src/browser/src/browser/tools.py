@@ -1,13 +1,16 @@
 import asyncio
 import base64
+import contextvars
 import logging
 import os
 import threading
+import time
 from contextlib import asynccontextmanager
 from functools import wraps
-from typing import Optional
+from urllib.parse import urlsplit
 
-from playwright.async_api import Browser, Page, TimeoutError, async_playwright
+from fastmcp.server.dependencies import get_context
+from playwright.async_api import Browser, BrowserContext, Page, Route, TimeoutError, async_playwright
 
 from core import WORKSPACE, get_workspace, get_workspace_file
 
@@ -17,11 +20,9 @@ from . import mcp
 logger = logging.getLogger(__name__)
 
 # Global browser state
-_browser: Optional[Browser] = None
-_page: Optional[Page] = None
+_browser: Browser | None = None
 _playwright = None
-_page_lock: Optional[asyncio.Lock] = None  # Lock to prevent concurrent page access
-_browser_lock: Optional[asyncio.Lock] = None  # Lock for browser initialization
+_locks: dict[str, tuple[asyncio.AbstractEventLoop, asyncio.Lock]] = {}  # Locks by name, for their event loop
 
 # Thread lock to protect lock initialization (prevents race conditions during lock creation)
 _lock_init_mutex = threading.Lock()
@@ -30,6 +31,10 @@ _lock_init_mutex = threading.Lock()
 DEFAULT_TIMEOUT = int(os.getenv("BROWSER_TIMEOUT", "30000"))  # 30 seconds
 DEFAULT_NAVIGATION_TIMEOUT = int(os.getenv("NAVIGATION_TIMEOUT", "60000"))  # 60 seconds
 
+# Session pool limits (configurable via environment variables)
+MAX_PAGES = max(1, int(os.getenv("BROWSER_MAX_PAGES", "8")))  # Open sessions (context + page) at a time
+IDLE_TIMEOUT = float(os.getenv("BROWSER_IDLE_TIMEOUT", "600.0"))  # Seconds before an unused session is closed
+
 # Timeout constants for internal operations (configurable via environment variables)
 HEALTH_CHECK_TIMEOUT = float(
     os.getenv("HEALTH_CHECK_TIMEOUT", "10.0")
@@ -41,6 +46,67 @@ SCRIPT_EVAL_TIMEOUT = float(
     os.getenv("SCRIPT_EVAL_TIMEOUT", "60.0")
 )  # Timeout for JavaScript evaluation (increased from 30.0)
 
+# Session of calls made outside an MCP request (e.g. tool functions called directly)
+DEFAULT_SESSION = "default"
+
+# Resource types Playwright reports for requests, and those blocked by each profile.
+# Documents are not blocked by type, pages have to load (blocked domains include their pages).
+RESOURCE_TYPES = (
+    "stylesheet",
+    "image",
+    "media",
+    "font",
+    "script",
+    "texttrack",
+    "xhr",
+    "fetch",
+    "eventsource",
+    "websocket",
+    "manifest",
+    "other",
+)
+BLOCK_PROFILES = {
+    "none": frozenset(),
+    "no-media": frozenset({"image", "media", "font"}),
+    "text-only": frozenset({"image", "media", "font", "stylesheet", "texttrack", "manifest"}),
+}
+DEFAULT_BLOCK_PROFILE = os.getenv("BROWSER_BLOCK_PROFILE", "none")  # Profile of new sessions
+if DEFAULT_BLOCK_PROFILE not in BLOCK_PROFILES:
+    logger.warning(
+        f"Invalid BROWSER_BLOCK_PROFILE='{DEFAULT_BLOCK_PROFILE}' (must be one of: {', '.join(BLOCK_PROFILES)}), "
+        "using default 'none'"
+    )
+    DEFAULT_BLOCK_PROFILE = "none"
+
+
+class BrowserSession:
+    """Browser context and page of one MCP session.
+
+    Each session has its own BrowserContext, so cookies, storage and navigation history are
+    not shared between clients, and its own lock, so sessions run in parallel on one browser.
+    """
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.context: BrowserContext | None = None
+        self.page: Page | None = None
+        self.lock = asyncio.Lock()
+        self.users = 0  # Tool calls holding or waiting for the session
+        self.closed = False  # Set by close_browser, calls still waiting for the lock fail
+        self.last_used = time.monotonic()
+        # Request blocking of the session's context (see set_resource_blocking)
+        self.blocked_types = BLOCK_PROFILES[DEFAULT_BLOCK_PROFILE]
+        self.blocked_domains: tuple[str, ...] = ()
+        self.blocked_requests = 0
+
+
+# Open sessions by MCP session ID, and the event loop their pages belong to
+_sessions: dict[str, BrowserSession] = {}
+_sessions_loop: asyncio.AbstractEventLoop | None = None
+
+# Session of the running tool call, set by @handle_browser_errors
+_current_session: contextvars.ContextVar[BrowserSession] = contextvars.ContextVar("browser_session")
+
 
 def _ensure_lock(lock_name: str) -> asyncio.Lock:
     """Ensure a lock exists for the current event loop.
@@ -49,121 +115,158 @@ def _ensure_lock(lock_name: str) -> asyncio.Lock:
     for each lock name within the same event loop.
 
     Args:
-        lock_name: Either "_page_lock" or "_browser_lock"
+        lock_name: Name of the lock, e.g. "_browser_lock"
 
     Returns:
         The lock instance for the current event loop
     """
-    global _page_lock, _browser_lock, _lock_init_mutex
-
     # Use thread lock to prevent race conditions during lock creation
     with _lock_init_mutex:
-        # Get the current lock value inside the mutex to avoid race conditions
-        current_lock = _page_lock if lock_name == "_page_lock" else _browser_lock
-
         try:
             loop = asyncio.get_running_loop()
-            # Check if we need to create a new lock
-            if current_lock is None or (hasattr(current_lock, "_loop") and current_lock._loop is not loop):
-                # Create new lock for this event loop
-                new_lock = asyncio.Lock()
-                # Update the global variable
-                if lock_name == "_page_lock":
-                    _page_lock = new_lock
-                else:
-                    _browser_lock = new_lock
-                return new_lock
-            return current_lock
         except RuntimeError:
             # No event loop running - shouldn't happen in async context
-            if current_lock is None:
-                new_lock = asyncio.Lock()
-                if lock_name == "_page_lock":
-                    _page_lock = new_lock
-                else:
-                    _browser_lock = new_lock
-                return new_lock
-            return current_lock
+            loop = None
+        current = _locks.get(lock_name)
+        # Locks are bound to the event loop they were created in
+        if current is None or (loop is not None and current[0] is not loop):
+            current = (loop, asyncio.Lock())
+            _locks[lock_name] = current
+        return current[1]
+
+
+def _session_id() -> str:
+    """ID of the MCP session of the running tool call."""
+    try:
+        return get_context().session_id
+    except RuntimeError:
+        return DEFAULT_SESSION
+
+
+async def _close_session(session: BrowserSession):
+    """Close the context and page of a session."""
+    try:
+        if session.context:
+            await session.context.close()
+    except Exception:
+        pass
+    finally:
+        session.context = None
+        session.page = None
+
+
+async def _acquire_session() -> BrowserSession | None:
+    """Get or open the session of the running tool call.
+
+    Sessions idle for more than IDLE_TIMEOUT are closed. If MAX_PAGES sessions are open,
+    the least recently used idle one is closed to make room.
+
+    Returns:
+        The session, to be released with _release_session, or None if all sessions are in use
+    """
+    global _sessions_loop
+    loop = asyncio.get_running_loop()
+    if _sessions_loop is not loop:
+        # Pages of another event loop cannot be used from this one
+        _sessions.clear()
+        _sessions_loop = loop
+
+    # No await until the session is registered, so the pool is consistent between tasks
+    session_id = _session_id()
+    now = time.monotonic()
+    evicted = [
+        s for s in _sessions.values() if s.users == 0 and s.id != session_id and now - s.last_used > IDLE_TIMEOUT
+    ]
+    session = _sessions.get(session_id)
+    if session is None:
+        excess = len(_sessions) - len(evicted) - MAX_PAGES + 1
+        if excess > 0:
+            idle = sorted(
+                (s for s in _sessions.values() if s.users == 0 and s not in evicted), key=lambda s: s.last_used
+            )
+            if len(idle) < excess:
+                return None
+            evicted.extend(idle[:excess])
+        session = _sessions[session_id] = BrowserSession(session_id)
+    session.users += 1
+    for s in evicted:
+        del _sessions[s.id]
+
+    for s in evicted:
+        logger.info(f"Closing idle browser session {s.id}")
+        await _close_session(s)
+    return session
+
+
+def _release_session(session: BrowserSession):
+    """Release a session acquired with _acquire_session."""
+    session.users -= 1
+    session.last_used = time.monotonic()
 
 
 def handle_browser_errors(func):
     """Decorator to handle browser errors and auto-recover.
 
-    Acquires _page_lock to ensure thread-safe access to page operations.
+    Runs the tool in the caller's session, holding the session lock to ensure
+    thread-safe access to its page. Other sessions are not blocked.
     """
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        page_lock = _ensure_lock("_page_lock")
-        async with page_lock:
-            try:
-                return await func(*args, **kwargs)
-            except TimeoutError as e:
-                return f"Error: Operation timed out - {str(e)}"
-            except Exception as e:
-                error_msg = f"Error: {type(e).__name__} - {str(e)}"
-                # Attempt recovery with more aggressive cleanup
+        session = await _acquire_session()
+        if session is None:
+            return f"Error: All {MAX_PAGES} browser pages are in use. Try again later."
+        token = _current_session.set(session)
+        try:
+            async with session.lock:
+                if session.closed:
+                    return "Error: Browser session was closed. Try again to open a new one."
                 try:
-                    await _reset_page_unsafe()
-                    return f"{error_msg}\nPage has been reset. Ready for next operation."
-                except Exception as reset_error:
-                    # If page reset fails, try to close browser entirely
+                    return await func(*args, **kwargs)
+                except TimeoutError as e:
+                    return f"Error: Operation timed out - {str(e)}"
+                except Exception as e:
+                    error_msg = f"Error: {type(e).__name__} - {str(e)}"
+                    # Attempt recovery with more aggressive cleanup
                     try:
-                        global _browser, _page, _playwright
-                        if _page:
-                            try:
-                                await _page.close()
-                            except Exception:
-                                pass
-                        _page = None
-                        if _browser:
-                            try:
-                                await _browser.close()
-                            except Exception:
-                                pass
-                        _browser = None
-                        if _playwright:
-                            try:
-                                await _playwright.stop()
-                            except Exception:
-                                pass
-                        _playwright = None
-                        return f"{error_msg}\nPage reset failed. Browser has been closed. Will reinitialize on next operation."
-                    except Exception as cleanup_error:
-                        return f"{error_msg}\nRecovery failed: {str(reset_error)}\nCleanup failed: {str(cleanup_error)}"
+                        await _reset_page_unsafe()
+                        return f"{error_msg}\nPage has been reset. Ready for next operation."
+                    except Exception as reset_error:
+                        # If page reset fails, close the session's context entirely
+                        try:
+                            await _close_session(session)
+                            return f"{error_msg}\nPage reset failed. Browser context has been closed. Will reinitialize on next operation."
+                        except Exception as cleanup_error:
+                            return f"{error_msg}\nRecovery failed: {str(reset_error)}\nCleanup failed: {str(cleanup_error)}"
+        finally:
+            _current_session.reset(token)
+            _release_session(session)
 
     return wrapper
 
 
 async def _reset_page_unsafe():
-    """Reset the page if it's in a bad state. MUST be called with _page_lock held."""
-    global _page
+    """Reset the session's page if it's in a bad state. MUST be called with the session lock held."""
+    session = _current_session.get()
     try:
-        if _page and not _page.is_closed():
-            await _page.close()
+        if session.page and not session.page.is_closed():
+            await session.page.close()
     except Exception:
         pass
     finally:
-        _page = None
-
-
-async def _reset_page():
-    """Reset the page if it's in a bad state. Thread-safe version."""
-    page_lock = _ensure_lock("_page_lock")
-    async with page_lock:
-        await _reset_page_unsafe()
+        session.page = None
 
 
 async def _is_page_healthy_unsafe() -> bool:
-    """Check if the page is in a healthy state. MUST be called with _page_lock held."""
-    global _page
-    if _page is None or _page.is_closed():
+    """Check if the session's page is in a healthy state. MUST be called with the session lock held."""
+    page = _current_session.get().page
+    if page is None or page.is_closed():
         logger.debug("Page is None or closed")
         return False
     try:
         # Try to evaluate a simple script to check if page is responsive
         # Add a timeout to prevent hanging
-        await asyncio.wait_for(_page.evaluate("1 + 1"), timeout=HEALTH_CHECK_TIMEOUT)
+        await asyncio.wait_for(page.evaluate("1 + 1"), timeout=HEALTH_CHECK_TIMEOUT)
         logger.debug("Page health check passed")
         return True
     except asyncio.TimeoutError:
@@ -176,10 +279,18 @@ async def _is_page_healthy_unsafe() -> bool:
 
 @asynccontextmanager
 async def get_browser():
-    """Get or create browser instance."""
+    """Get or create browser instance, relaunching it if it was disconnected."""
     global _browser, _playwright
     browser_lock = _ensure_lock("_browser_lock")
     async with browser_lock:
+        if _browser is not None and not _browser.is_connected():
+            logger.warning("Browser disconnected, relaunching")
+            _browser = None
+            try:
+                await _playwright.stop()
+            except Exception:
+                pass
+            _playwright = None
         if _browser is None:
             try:
                 _playwright = await async_playwright().start()
@@ -207,25 +318,58 @@ async def get_browser():
         yield _browser
 
 
+def _should_block(resource_type: str, url: str, types: frozenset, domains: tuple[str, ...]) -> bool:
+    """Check if a request is blocked by resource type or by domain (subdomains included)."""
+    if resource_type in types:
+        return True
+    if not domains:
+        return False
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+async def _apply_blocking(session: BrowserSession):
+    """Route the requests of the session's context through its blocklist.
+
+    Requests are only intercepted while something is blocked, since every routed
+    request makes a round trip to the Playwright driver.
+    """
+    context = session.context
+    if context is None:
+        return
+    await context.unroute("**/*")
+    if not session.blocked_types and not session.blocked_domains:
+        return
+
+    types, domains = session.blocked_types, session.blocked_domains
+
+    async def handle(route: Route):
+        request = route.request
+        if _should_block(request.resource_type, request.url, types, domains):
+            session.blocked_requests += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+
+
 async def get_page_unsafe() -> Page:
-    """Get or create page instance. MUST be called with _page_lock held."""
-    global _page
+    """Get or create the session's page. MUST be called with the session lock held."""
+    session = _current_session.get()
     async with get_browser() as browser:
         # Check if page is healthy, not just closed
         if not await _is_page_healthy_unsafe():
             await _reset_page_unsafe()
-            _page = await browser.new_page()
+            # Contexts of a closed or relaunched browser cannot open pages
+            if session.context is None or session.context.browser is not browser:
+                session.context = await browser.new_context()
+                await _apply_blocking(session)
+            session.page = await session.context.new_page()
             # Set default timeouts
-            _page.set_default_timeout(DEFAULT_TIMEOUT)
-            _page.set_default_navigation_timeout(DEFAULT_NAVIGATION_TIMEOUT)
-        return _page
-
-
-async def get_page() -> Page:
-    """Get or create page instance. Thread-safe version."""
-    page_lock = _ensure_lock("_page_lock")
-    async with page_lock:
-        return await get_page_unsafe()
+            session.page.set_default_timeout(DEFAULT_TIMEOUT)
+            session.page.set_default_navigation_timeout(DEFAULT_NAVIGATION_TIMEOUT)
+        return session.page
 
 
 # ======================================================
@@ -448,6 +592,50 @@ async def wait_for_navigation(timeout: int = 30000) -> str:
     return f"Navigation complete. URL: {page.url}"
 
 
+# ======================================================
+# Network
+# ======================================================
+
+
+@mcp.tool()
+@handle_browser_errors
+async def set_resource_blocking(
+    profile: str = "none",
+    resource_types: list[str] | None = None,
+    domains: list[str] | None = None,
+) -> str:
+    """Block requests of the current session to load pages faster.
+
+    Blocked requests are aborted before they reach the network. Applies to the pages
+    of the caller's session until changed or the session is closed.
+
+    Args:
+        profile: "none" (load everything), "no-media" (block images, media and fonts)
+            or "text-only" (also block stylesheets and other non-text resources, for
+            get_content). Scripts are never blocked by a profile.
+        resource_types: Resource types to block in addition to the profile, e.g.
+            ["script", "xhr"]. One of: stylesheet, image, media, font, script, texttrack,
+            xhr, fetch, eventsource, websocket, manifest, other
+        domains: Domains whose requests are blocked, with their subdomains, e.g.
+            ["doubleclick.net", "google-analytics.com"]
+    """
+    if profile not in BLOCK_PROFILES:
+        return f"Error: Invalid profile '{profile}'. Must be one of: {', '.join(BLOCK_PROFILES)}"
+    invalid = [t for t in resource_types or [] if t not in RESOURCE_TYPES]
+    if invalid:
+        return f"Error: Invalid resource types: {', '.join(invalid)}. Must be among: {', '.join(RESOURCE_TYPES)}"
+
+    session = _current_session.get()
+    session.blocked_types = BLOCK_PROFILES[profile] | frozenset(resource_types or [])
+    session.blocked_domains = tuple(d.strip().lower().lstrip(".") for d in domains or [] if d.strip())
+    await _apply_blocking(session)
+
+    blocked = sorted(session.blocked_types) + list(session.blocked_domains)
+    if not blocked:
+        return "Resource blocking disabled"
+    return f"Blocking: {', '.join(blocked)}"
+
+
 # ======================================================
 # Browser management
 # ======================================================
@@ -455,29 +643,32 @@ async def wait_for_navigation(timeout: int = 30000) -> str:
 
 @mcp.tool()
 async def close_browser() -> str:
-    """Close the browser and clean up resources.
+    """Close the browser session and clean up resources.
+
+    Closes the caller's browser context and page. The browser itself is closed
+    once no other session is open.
 
     Note: This function manually handles locking in the correct order
-    (browser_lock -> page_lock) to avoid deadlocks.
+    (session lock -> browser_lock) to avoid deadlocks.
     """
-    global _browser, _page, _playwright
+    global _browser, _playwright
 
-    # Acquire locks in consistent order: browser_lock first, then page_lock
-    browser_lock = _ensure_lock("_browser_lock")
-    page_lock = _ensure_lock("_page_lock")
+    session = _sessions.pop(_session_id(), None) if _sessions_loop is asyncio.get_running_loop() else None
+    if session:
+        # Calls waiting for the session fail instead of opening a context outside the pool,
+        # new calls open a new session
+        session.closed = True
+        # Wait for the session's running tool call, then close its context
+        async with session.lock:
+            await _close_session(session)
 
+    browser_lock = _ensure_lock("_browser_lock")
     async with browser_lock:
-        async with page_lock:
-            # Close the page first
-            try:
-                if _page and not _page.is_closed():
-                    await _page.close()
-            except Exception:
-                pass
-            finally:
-                _page = None
+        # Checked with the lock held, sessions opened meanwhile keep the browser
+        if _sessions:
+            return f"Browser closed for this session ({len(_sessions)} other sessions still open)"
 
-        # Close browser and playwright (still within browser_lock)
+        # Close browser and playwright within browser_lock
         # All global state mutations must happen within appropriate locks
         try:
             if _browser:
@@ -513,17 +704,18 @@ async def force_reset() -> str:
 async def get_page_status() -> str:
     """Check if the page is in a healthy state.
 
-    Note: _page_lock is already held by @handle_browser_errors decorator,
+    Note: the session lock is already held by @handle_browser_errors decorator,
     so it's safe to call _is_page_healthy_unsafe() and get_page_unsafe() here.
     """
-    global _browser, _page
-    # Safe to call _unsafe functions because @handle_browser_errors holds _page_lock
+    # Safe to call _unsafe functions because @handle_browser_errors holds the session lock
     is_healthy = await _is_page_healthy_unsafe()
-    browser_running = _browser is not None
-    page_exists = _page is not None and not _page.is_closed()
+    browser_running = _browser is not None and _browser.is_connected()
+    session = _current_session.get()
+    page_exists = session.page is not None and not session.page.is_closed()
+    sessions = f"Open sessions: {len(_sessions)}/{MAX_PAGES}\nBlocked requests: {session.blocked_requests}"
 
     if is_healthy:
         page = await get_page_unsafe()
-        return f"✓ Page is healthy\nURL: {page.url}\nBrowser running: {browser_running}"
+        return f"✓ Page is healthy\nURL: {page.url}\nBrowser running: {browser_running}\n{sessions}"
     else:
-        return f"✗ Page is not healthy\nBrowser running: {browser_running}\nPage exists: {page_exists}\nRecommendation: Try force_reset or close_browser to recover"
+        return f"✗ Page is not healthy\nBrowser running: {browser_running}\nPage exists: {page_exists}\n{sessions}\nRecommendation: Try force_reset or close_browser to recover"
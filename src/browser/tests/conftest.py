@@ -8,10 +8,12 @@ def reset_browser_state():
     """Reset global browser state before each test."""
     # Reset global state before each test
     tools._browser = None
-    tools._page = None
     tools._playwright = None
+    tools._sessions.clear()
+    tools._sessions_loop = None
     yield
     # Cleanup after test (in case browser was opened)
     tools._browser = None
-    tools._page = None
     tools._playwright = None
+    tools._sessions.clear()
+    tools._sessions_loop = None
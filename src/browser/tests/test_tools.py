@@ -3,7 +3,7 @@ import asyncio
 import pytest
 from fastmcp import Client
 
-from browser import mcp
+from browser import mcp, tools
 
 
 @pytest.mark.asyncio
@@ -277,3 +277,149 @@ async def test_event_loop_changes():
         results = await asyncio.gather(*tasks)
         assert "example.com" in results[0].content[0].text
         assert "Example Domain" in results[1].content[0].text
+
+
+# ======================================================
+# Session Pool Tests
+# ======================================================
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_isolated():
+    """Test that concurrent clients browse on separate pages."""
+    async with Client(mcp) as client1, Client(mcp) as client2:
+        await asyncio.gather(
+            client1.call_tool("navigate", {"url": "https://example.com"}),
+            client2.call_tool("navigate", {"url": "https://httpbin.org/html"}),
+        )
+
+        res1 = await client1.call_tool("get_url", {})
+        res2 = await client2.call_tool("get_url", {})
+        assert "example.com" in res1.content[0].text
+        assert "httpbin.org" in res2.content[0].text
+        assert len(tools._sessions) == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_session_is_evicted(monkeypatch):
+    """Test that an idle session is closed when the pool is full."""
+    monkeypatch.setattr(tools, "MAX_PAGES", 1)
+    async with Client(mcp) as client1, Client(mcp) as client2:
+        await client1.call_tool("navigate", {"url": "https://example.com"})
+        res = await client2.call_tool("navigate", {"url": "https://example.com"})
+        assert "Navigated to" in res.content[0].text
+        assert len(tools._sessions) == 1
+
+        # The first client gets a new page
+        res = await client1.call_tool("get_url", {})
+        assert "example.com" not in res.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_idle_session_is_closed(monkeypatch):
+    """Test that sessions idle for longer than the idle timeout are closed."""
+    monkeypatch.setattr(tools, "IDLE_TIMEOUT", 0.0)
+    async with Client(mcp) as client1, Client(mcp) as client2:
+        await client1.call_tool("navigate", {"url": "https://example.com"})
+        await client2.call_tool("get_title", {})
+        assert len(tools._sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_calls_waiting_on_closed_session_fail():
+    """Test that calls queued on a session closed by close_browser do not reopen it."""
+    tools._sessions_loop = asyncio.get_running_loop()
+    session = tools._sessions[tools.DEFAULT_SESSION] = tools.BrowserSession(tools.DEFAULT_SESSION)
+
+    @tools.handle_browser_errors
+    async def tool():
+        return "ran"
+
+    async with session.lock:
+        waiting = asyncio.create_task(tool())
+        await asyncio.sleep(0)
+        closing = asyncio.create_task(tools.close_browser.fn())
+        await asyncio.sleep(0)
+
+    assert "session was closed" in await waiting
+    assert await closing == "Browser closed"
+    assert not tools._sessions
+
+
+@pytest.mark.asyncio
+async def test_pool_full(monkeypatch):
+    """Test that a call is refused when every page is in use."""
+    monkeypatch.setattr(tools, "MAX_PAGES", 1)
+    tools._sessions_loop = asyncio.get_running_loop()
+    busy = tools._sessions["busy"] = tools.BrowserSession("busy")
+    busy.users = 1
+
+    async with Client(mcp) as client:
+        res = await client.call_tool("get_url", {})
+        assert "All 1 browser pages are in use" in res.content[0].text
+
+
+# ======================================================
+# Resource Blocking Tests
+# ======================================================
+
+
+@pytest.mark.asyncio
+async def test_text_only_profile():
+    """Test that pages load with images, media and stylesheets blocked."""
+    async with Client(mcp) as client:
+        res = await client.call_tool("set_resource_blocking", {"profile": "text-only"})
+        assert "image" in res.content[0].text
+
+        await client.call_tool("navigate", {"url": "https://httpbin.org/html"})
+        await client.call_tool(
+            "evaluate", {"script": "fetch('https://httpbin.org/image/png').catch(() => null).then(() => 1)"}
+        )
+        res = await client.call_tool("get_content", {})
+        assert "Moby-Dick" in res.content[0].text
+
+
+@pytest.mark.asyncio
+async def test_blocked_domain():
+    """Test that requests to blocked domains are aborted."""
+    async with Client(mcp) as client:
+        await client.call_tool("navigate", {"url": "https://example.com"})
+        await client.call_tool("set_resource_blocking", {"domains": ["httpbin.org"]})
+
+        res = await client.call_tool(
+            "evaluate",
+            {"script": "fetch('https://httpbin.org/get').then(() => 'loaded', () => 'blocked')"},
+        )
+        assert res.content[0].text == "blocked"
+        res = await client.call_tool("get_page_status", {})
+        assert "Blocked requests: 1" in res.content[0].text
+
+        await client.call_tool("set_resource_blocking", {})
+        res = await client.call_tool(
+            "evaluate",
+            {"script": "fetch('https://httpbin.org/get').then(() => 'loaded', () => 'blocked')"},
+        )
+        assert res.content[0].text == "loaded"
+
+
+@pytest.mark.asyncio
+async def test_invalid_blocking_options():
+    """Test that unknown profiles and resource types are rejected."""
+    async with Client(mcp) as client:
+        res = await client.call_tool("set_resource_blocking", {"profile": "fast"})
+        assert "Error: Invalid profile 'fast'" in res.content[0].text
+
+        res = await client.call_tool("set_resource_blocking", {"resource_types": ["image", "document"]})
+        assert "Error: Invalid resource types: document" in res.content[0].text
+
+
+def test_should_block():
+    """Test matching of requests against resource types and domains."""
+    types = tools.BLOCK_PROFILES["no-media"]
+    domains = ("tracker.com",)
+
+    assert tools._should_block("image", "https://example.com/a.png", types, domains)
+    assert tools._should_block("script", "https://cdn.tracker.com/t.js", types, domains)
+    assert tools._should_block("script", "https://TRACKER.com/t.js", types, domains)
+    assert not tools._should_block("script", "https://nottracker.com/t.js", types, domains)
+    assert not tools._should_block("stylesheet", "https://example.com/a.css", types, ())
@@ -1,6 +1,9 @@
 """Shared utilities for MCP servers."""
 
 from .cli import create_arg_parser, parse_args, run_server, validate_port
+from .config import get_env_int
+from .processes import process_pool
+from .sqlite_cache import SqliteCache
 from .workspace import MCP_SERVERS_BASE, WORKSPACE, get_workspace, get_workspace_file
 
 __all__ = [
@@ -8,6 +11,9 @@ __all__ = [
     "parse_args",
     "run_server",
     "validate_port",
+    "get_env_int",
+    "process_pool",
+    "SqliteCache",
     "MCP_SERVERS_BASE",
     "WORKSPACE",
     "get_workspace",
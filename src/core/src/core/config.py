@@ -0,0 +1,34 @@
+"""Environment configuration helpers for MCP servers.
+
+Servers read their tuning knobs from environment variables at import time:
+
+    from core import get_env_int
+    MAX_CACHE_BYTES = get_env_int("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+Invalid values are reported on stderr and replaced by the default, so a typo in a
+deployment never keeps a server from starting.
+"""
+
+import os
+import sys
+
+
+def get_env_int(name: str, default: int, min_value: int = 0) -> int:
+    """Get and validate integer environment variable.
+
+    Args:
+        name: Name of the environment variable
+        default: Value used when the variable is unset or invalid
+        min_value: Smallest accepted value
+
+    Returns:
+        The parsed value, or default
+    """
+    try:
+        value = int(os.getenv(name, default))
+        if value < min_value:
+            raise ValueError(f"Must be >= {min_value}")
+        return value
+    except ValueError as e:
+        print(f"Warning: Invalid {name}='{os.getenv(name)}' ({e}), using default {default}", file=sys.stderr)
+        return default
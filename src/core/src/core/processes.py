@@ -0,0 +1,15 @@
+"""Process pools for CPU-bound work in MCP servers.
+
+Workers are started with spawn: a server process runs an event loop and threads, which must
+not be forked (a forked child inherits locks held by other threads and never releases them).
+A spawned worker imports the module of each submitted function, so worker entry points should
+live in modules that do not import the server and its tools.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Create a process pool of max_workers spawned worker processes."""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
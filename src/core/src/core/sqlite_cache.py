@@ -0,0 +1,206 @@
+"""Size-bounded persistent caches in SQLite for MCP servers.
+
+``SqliteCache`` keeps entries in one table of a SQLite database in the workspace, under a
+composite primary key whose last column varies within a lookup (the page of a PDF, the text
+hash for a model, ...). Entries record their size and when they were last used, and the least
+recently used entries are evicted once the total size exceeds ``max_bytes``.
+
+The total size is kept in a one-row side table maintained by triggers, so writes do not scan
+the cache table to decide whether to evict, and the total stays exact across processes
+sharing the database.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+from threading import Lock
+from typing import Any
+
+# Keys per statement, well below SQLite's bound-parameter limit
+_KEY_BATCH_SIZE = 500
+
+
+def _size(value: bytes | str) -> int:
+    """Size of a stored value in bytes, str values are stored as UTF-8."""
+    return len(value.encode()) if isinstance(value, str) else len(value)
+
+
+class SqliteCache:
+    """Base class of a persistent LRU cache bounded by the total size of its values.
+
+    Subclasses set TABLE, KEY_COLUMNS (name and SQL type of each primary key column),
+    VALUE_COLUMN and VALUE_TYPE, and encode values before ``_put_many`` and decode them
+    after ``_get_many``.
+    """
+
+    TABLE: str
+    KEY_COLUMNS: tuple[tuple[str, str], ...]
+    VALUE_COLUMN = "value"
+    VALUE_TYPE = "BLOB"
+
+    def __init__(self, db_path: str, max_bytes: int):
+        """Initialize the cache database.
+
+        Args:
+            db_path: Path to the database file
+            max_bytes: Maximum total size of cached values. 0 disables the cache.
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._clock_lock = Lock()
+        self._last_used = 0
+        self._init_schema()
+
+        # Cached values are derived from user documents, keep the database owner-only
+        try:
+            os.chmod(self.db_path, 0o600)
+        except OSError:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _now(self) -> int:
+        """Strictly increasing timestamp in nanoseconds, so LRU order has no ties within a process."""
+        with self._clock_lock:
+            self._last_used = max(time.time_ns(), self._last_used + 1)
+            return self._last_used
+
+    def _init_schema(self):
+        """Initialize the cache table, the size table and the triggers maintaining it."""
+        table = self.TABLE
+        keys = ", ".join(name for name, _ in self.KEY_COLUMNS)
+        key_columns = "".join(f"{name} {type_} NOT NULL,\n" for name, type_ in self.KEY_COLUMNS)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key_columns}
+                    {self.VALUE_COLUMN} {self.VALUE_TYPE} NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used INTEGER NOT NULL,
+                    PRIMARY KEY ({keys})
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_last_used ON {table}(last_used)")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table}_size (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total INTEGER NOT NULL
+                )
+            """)
+            conn.execute(f"INSERT OR IGNORE INTO {table}_size VALUES (0, 0)")
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_size_insert AFTER INSERT ON {table}
+                BEGIN UPDATE {table}_size SET total = total + NEW.size; END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_size_update AFTER UPDATE OF size ON {table}
+                BEGIN UPDATE {table}_size SET total = total + NEW.size - OLD.size; END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_size_delete AFTER DELETE ON {table}
+                BEGIN UPDATE {table}_size SET total = total - OLD.size; END
+            """)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _get_many(self, prefix: tuple, keys: list) -> dict[Any, Any]:
+        """Look up stored values and mark them as recently used.
+
+        Args:
+            prefix: Values of all key columns but the last
+            keys: Values of the last key column to look up
+
+        Returns:
+            Mapping of key to stored value for the keys found
+        """
+        if not self.enabled or not keys:
+            return {}
+
+        *prefix_columns, key_column = (name for name, _ in self.KEY_COLUMNS)
+        match = "".join(f"{name} = ? AND " for name in prefix_columns)
+        found = {}
+        with closing(self._connect()) as conn, conn:
+            for start in range(0, len(keys), _KEY_BATCH_SIZE):
+                batch = keys[start : start + _KEY_BATCH_SIZE]
+                rows = conn.execute(
+                    f"""
+                    SELECT {key_column}, {self.VALUE_COLUMN} FROM {self.TABLE}
+                    WHERE {match}{key_column} IN ({",".join("?" * len(batch))})
+                    """,
+                    [*prefix, *batch],
+                ).fetchall()
+                if not rows:
+                    continue
+
+                hits = [key for key, _ in rows]
+                conn.execute(
+                    f"""
+                    UPDATE {self.TABLE} SET last_used = ?
+                    WHERE {match}{key_column} IN ({",".join("?" * len(hits))})
+                    """,
+                    [self._now(), *prefix, *hits],
+                )
+                found.update(rows)
+        return found
+
+    def _put_many(self, prefix: tuple, values: dict[Any, Any]):
+        """Store encoded values and evict least recently used entries over the size limit.
+
+        Args:
+            prefix: Values of all key columns but the last
+            values: Mapping of the last key column to encoded value (bytes or str)
+        """
+        if not self.enabled or not values:
+            return
+
+        columns = [name for name, _ in self.KEY_COLUMNS]
+        now = self._now()
+        rows = [(*prefix, key, value, _size(value), now) for key, value in values.items()]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"""
+                INSERT INTO {self.TABLE} ({", ".join(columns)}, {self.VALUE_COLUMN}, size, last_used)
+                VALUES ({", ".join("?" * (len(columns) + 3))})
+                ON CONFLICT ({", ".join(columns)}) DO UPDATE SET
+                    {self.VALUE_COLUMN} = excluded.{self.VALUE_COLUMN},
+                    size = excluded.size,
+                    last_used = excluded.last_used
+                """,
+                rows,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least recently used entries until the total size fits in max_bytes."""
+        total = conn.execute(f"SELECT total FROM {self.TABLE}_size").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for rowid, size in conn.execute(f"SELECT rowid, size FROM {self.TABLE} ORDER BY last_used"):
+            stale.append((rowid,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany(f"DELETE FROM {self.TABLE} WHERE rowid = ?", stale)
+
+    def total_size(self) -> int:
+        """Total size of the cached values."""
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT total FROM {self.TABLE}_size").fetchone()[0]
+
+    def clear(self) -> int:
+        """Delete all cached entries.
+
+        Returns:
+            Number of deleted entries
+        """
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(f"DELETE FROM {self.TABLE}").rowcount
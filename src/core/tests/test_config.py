@@ -0,0 +1,29 @@
+"""Tests for environment configuration helpers."""
+
+from core import get_env_int
+
+
+class TestGetEnvInt:
+    """Tests for get_env_int function."""
+
+    def test_unset_uses_default(self, monkeypatch):
+        """Test default is returned when the variable is unset."""
+        monkeypatch.delenv("CORE_TEST_INT", raising=False)
+        assert get_env_int("CORE_TEST_INT", 5) == 5
+
+    def test_valid_value(self, monkeypatch):
+        """Test valid integer values are parsed."""
+        monkeypatch.setenv("CORE_TEST_INT", "42")
+        assert get_env_int("CORE_TEST_INT", 5) == 42
+
+    def test_invalid_value_uses_default(self, monkeypatch, capsys):
+        """Test non-integer values fall back to the default with a warning."""
+        monkeypatch.setenv("CORE_TEST_INT", "many")
+        assert get_env_int("CORE_TEST_INT", 5) == 5
+        assert "Invalid CORE_TEST_INT='many'" in capsys.readouterr().err
+
+    def test_below_minimum_uses_default(self, monkeypatch, capsys):
+        """Test values below min_value fall back to the default with a warning."""
+        monkeypatch.setenv("CORE_TEST_INT", "0")
+        assert get_env_int("CORE_TEST_INT", 5, min_value=1) == 5
+        assert "Must be >= 1" in capsys.readouterr().err
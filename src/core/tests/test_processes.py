@@ -0,0 +1,15 @@
+"""Tests for process pools."""
+
+import math
+
+from core import process_pool
+
+
+class TestProcessPool:
+    """Tests for process_pool function."""
+
+    def test_runs_in_spawned_workers(self):
+        """Test submitted functions run in spawned worker processes."""
+        with process_pool(2) as pool:
+            assert pool._mp_context.get_start_method() == "spawn"
+            assert list(pool.map(math.factorial, [3, 4])) == [6, 24]
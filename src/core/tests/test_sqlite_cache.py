@@ -0,0 +1,56 @@
+"""Tests for size-bounded SQLite caches."""
+
+from core import SqliteCache
+
+
+class PageCache(SqliteCache):
+    TABLE = "page_cache"
+    KEY_COLUMNS = (("document", "TEXT"), ("page", "INTEGER"))
+    VALUE_TYPE = "TEXT"
+
+
+class TestSqliteCache:
+    """Tests for SqliteCache base class."""
+
+    def test_round_trip(self, tmp_path):
+        """Test stored values are found by prefix and key."""
+        cache = PageCache(str(tmp_path / "cache.db"), max_bytes=1000)
+        cache._put_many(("a.pdf",), {0: "first", 1: "second"})
+
+        assert cache._get_many(("a.pdf",), [0, 1, 2]) == {0: "first", 1: "second"}
+        assert cache._get_many(("b.pdf",), [0]) == {}
+
+    def test_total_size_tracks_writes(self, tmp_path):
+        """Test the total size follows inserts, replacements and deletes."""
+        cache = PageCache(str(tmp_path / "cache.db"), max_bytes=1000)
+        cache._put_many(("a.pdf",), {0: "12345", 1: "123"})
+        cache._put_many(("a.pdf",), {0: "1"})
+        assert cache.total_size() == 4
+
+        cache.clear()
+        assert cache.total_size() == 0
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test the least recently used entries are evicted over max_bytes."""
+        cache = PageCache(str(tmp_path / "cache.db"), max_bytes=10)
+        cache._put_many(("a.pdf",), {0: "aaaa"})
+        cache._put_many(("a.pdf",), {1: "bbbb"})
+        cache._get_many(("a.pdf",), [0])
+        cache._put_many(("a.pdf",), {2: "cccc"})
+
+        assert set(cache._get_many(("a.pdf",), [0, 1, 2])) == {0, 2}
+        assert cache.total_size() == 8
+
+    def test_size_counts_bytes(self, tmp_path):
+        """Test str values are sized in UTF-8 bytes, not characters."""
+        cache = PageCache(str(tmp_path / "cache.db"), max_bytes=1000)
+        cache._put_many(("a.pdf",), {0: "été"})
+
+        assert cache.total_size() == 5
+
+    def test_disabled(self, tmp_path):
+        """Test max_bytes=0 stores nothing."""
+        cache = PageCache(str(tmp_path / "cache.db"), max_bytes=0)
+        cache._put_many(("a.pdf",), {0: "first"})
+
+        assert cache._get_many(("a.pdf",), [0]) == {}
@@ -0,0 +1,100 @@
+"""Benchmark text extraction engines on a corpus of PDFs.
+
+Compares throughput (pages/second) of the ``fast``, ``layout`` and ``auto`` engines and the
+output fidelity of ``fast``/``auto`` against ``layout`` (word-sequence similarity, 1.0 = identical).
+
+Usage:
+    uv run python bin/benchmark_engines.py [corpus_dir]
+
+The corpus defaults to ``workspace/``. If it contains no PDFs, a synthetic corpus with plain
+text, table and two-column pages is generated with reportlab.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from pdf.documents import PdfDocument
+from pdf.engines import ENGINES, iter_page_text
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "workspace"
+
+
+def generate_corpus(out_dir: Path, documents: int = 5, pages: int = 10) -> list[Path]:
+    """Generate synthetic PDFs mixing plain text, table and two-column pages."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    width, height = letter
+    paths = []
+    for d in range(documents):
+        path = out_dir / f"synthetic_{d + 1}.pdf"
+        c = canvas.Canvas(str(path), pagesize=letter)
+        for p in range(pages):
+            kind = p % 3
+            if kind == 0:
+                for line in range(40):
+                    c.drawString(72, height - 72 - line * 16, f"Document {d + 1} page {p + 1} line {line + 1} text")
+            elif kind == 1:
+                for row in range(20):
+                    y = height - 72 - row * 20
+                    for col in range(4):
+                        x = 72 + col * 120
+                        c.rect(x, y - 5, 120, 20)
+                        c.drawString(x + 5, y, f"r{row + 1}c{col + 1}")
+            else:
+                for line in range(40):
+                    y = height - 72 - line * 16
+                    c.drawString(72, y, f"Left column line {line + 1}")
+                    c.drawString(width / 2 + 20, y, f"Right column line {line + 1}")
+            c.showPage()
+        c.save()
+        paths.append(path)
+    return paths
+
+
+def similarity(a: str, b: str) -> float:
+    """Word-sequence similarity between two extractions."""
+    return SequenceMatcher(None, a.split(), b.split(), autojunk=False).ratio()
+
+
+def run(paths: list[Path]) -> None:
+    """Extract every PDF with every engine and print a summary table."""
+    texts: dict[str, dict[tuple[Path, int], str]] = {}
+    print(f"{'engine':<8} {'pages':>7} {'seconds':>9} {'pages/s':>9} {'fidelity':>9}")
+
+    for engine in ("layout", "fast", "auto"):
+        start = time.perf_counter()
+        texts[engine] = {}
+        for path in paths:
+            doc = PdfDocument(path)
+            texts[engine].update(((path, i), text) for i, text in iter_page_text(doc, engine=engine))
+            doc.close()
+        elapsed = time.perf_counter() - start
+
+        pages = len(texts[engine])
+        scores = [similarity(text, texts["layout"][key]) for key, text in texts[engine].items()]
+        fidelity = sum(scores) / len(scores) if scores else 0.0
+        print(f"{engine:<8} {pages:>7} {elapsed:>9.3f} {pages / elapsed:>9.1f} {fidelity:>9.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=f"Benchmark PDF text extraction engines ({', '.join(ENGINES)})")
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS, help="Directory of PDF files")
+    args = parser.parse_args()
+
+    paths = sorted(args.corpus.glob("**/*.pdf")) if args.corpus.is_dir() else []
+    if paths:
+        run(paths)
+        return
+
+    print(f"No PDFs found in {args.corpus}, using a synthetic corpus", file=sys.stderr)
+    with tempfile.TemporaryDirectory() as tmp:
+        run(generate_corpus(Path(tmp)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
-import os
+def __getattr__(name: str):
+    # The server is loaded on first access to mcp, so worker processes that only import
+    # extraction modules do not import the tools and their dependencies
+    if name == "mcp":
+        from .server import mcp
 
-from dotenv import load_dotenv
-from fastmcp import FastMCP
+        return mcp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-load_dotenv()
-
-mcp = FastMCP(os.getenv("NAME", "pdf"))
-
-from . import prompts, server, tools  # noqa: F401, E402
 
 __all__ = ["mcp"]
@@ -0,0 +1,130 @@
+"""Per-page extraction cache for the pdf server.
+
+Extraction results (page text, page tables, document metadata) are stored in a SQLite
+database in the shared workspace, keyed by the SHA-256 of the file content, the result
+kind, the extraction options and the page index. Repeated or overlapping page-range
+requests on the same file only extract the pages that are not cached yet.
+
+The cache is bounded by total payload size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from core import WORKSPACE, SqliteCache, get_env_int, get_workspace_file
+
+# Page index used for document-level entries (metadata, page count)
+DOCUMENT = -1
+
+# Configuration constants (configurable via environment variables)
+MAX_CACHE_BYTES = get_env_int("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024)  # Default: 256MB, 0 disables the cache
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_HASH_MEMO_SIZE = 1024
+
+# Content hashes memoized by (path, size, mtime) so unchanged files are not re-read
+_hash_memo: dict[tuple[str, int, int], str] = {}
+_hash_memo_lock = Lock()
+
+
+def file_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content, memoized by size and mtime."""
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_memo_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+
+    with _hash_memo_lock:
+        if len(_hash_memo) >= MAX_HASH_MEMO_SIZE:
+            _hash_memo.pop(next(iter(_hash_memo)))
+        _hash_memo[memo_key] = content_hash
+    return content_hash
+
+
+class ExtractionCache(SqliteCache):
+    """Manages cached extraction results in a persistent SQLite database."""
+
+    TABLE = "extraction_cache"
+    KEY_COLUMNS = (("file_hash", "TEXT"), ("kind", "TEXT"), ("options", "TEXT"), ("page", "INTEGER"))
+    VALUE_TYPE = "TEXT"
+
+    def __init__(self, db_path: str | None = None, max_bytes: int = MAX_CACHE_BYTES):
+        """Initialize the cache database.
+
+        Args:
+            db_path: Path to the database file. Defaults to ~/.mcp-servers/workspace/pdf_extraction_cache.db
+            max_bytes: Maximum total size of cached payloads. 0 disables the cache.
+
+        Raises:
+            OSError: If workspace directory cannot be created
+        """
+        if db_path is None:
+            db_path = str(get_workspace_file(WORKSPACE, "pdf_extraction_cache.db"))
+        super().__init__(db_path, max_bytes)
+
+    def get_many(self, content_hash: str, kind: str, options: dict, pages: list[int]) -> dict[int, Any]:
+        """Look up cached results for several pages.
+
+        Args:
+            content_hash: Content hash of the PDF (see file_hash)
+            kind: Result kind, e.g. "text", "tables", "metadata"
+            options: Extraction options that affect the result
+            pages: Page indices to look up (DOCUMENT for document-level entries)
+
+        Returns:
+            Mapping of page index to cached value for the pages found
+        """
+        found = self._get_many((content_hash, kind, json.dumps(options, sort_keys=True)), pages)
+        return {page: json.loads(value) for page, value in found.items()}
+
+    def put_many(self, content_hash: str, kind: str, options: dict, values: dict[int, Any]):
+        """Store results for several pages and evict least recently used entries over the size limit.
+
+        Args:
+            content_hash: Content hash of the PDF (see file_hash)
+            kind: Result kind, e.g. "text", "tables", "metadata"
+            options: Extraction options that affect the result
+            values: Mapping of page index to JSON-serializable value
+        """
+        if not self.enabled:
+            return
+        encoded = {page: json.dumps(value) for page, value in values.items()}
+        self._put_many((content_hash, kind, json.dumps(options, sort_keys=True)), encoded)
+
+    def get(self, content_hash: str, kind: str, options: dict, page: int = DOCUMENT) -> Any | None:
+        """Look up a single cached result."""
+        return self.get_many(content_hash, kind, options, [page]).get(page)
+
+    def put(self, content_hash: str, kind: str, options: dict, value: Any, page: int = DOCUMENT):
+        """Store a single result."""
+        self.put_many(content_hash, kind, options, {page: value})
+
+
+# Global instance with thread-safe initialization
+_extraction_cache: ExtractionCache | None = None
+_lock = Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get or create the global extraction cache instance.
+
+    Thread-safe singleton pattern using double-checked locking.
+
+    Returns:
+        ExtractionCache: The global extraction cache instance
+    """
+    global _extraction_cache
+    if _extraction_cache is None:
+        with _lock:
+            if _extraction_cache is None:
+                _extraction_cache = ExtractionCache()
+    return _extraction_cache
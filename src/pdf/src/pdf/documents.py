@@ -0,0 +1,135 @@
+"""Shared document handles for the pdf server.
+
+Tools open PDFs through ``open_document()``, which returns a ``PdfDocument`` whose pypdf,
+pdfplumber and PyMuPDF handles are created lazily and at most once. Page-range parsing and
+extraction therefore share a single parse per backend.
+
+Documents are kept open across requests in a small LRU keyed by path and are invalidated
+when the file's mtime or size changes.
+"""
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock, RLock
+
+import pdfplumber
+import pymupdf
+from pypdf import PdfReader
+
+from core import get_env_int
+
+# Configuration constants (configurable via environment variables)
+MAX_OPEN_DOCUMENTS = get_env_int("PDF_MAX_OPEN_DOCUMENTS", 8)  # Default: 8, 0 disables handle reuse
+
+
+class PdfDocument:
+    """Lazily opened pypdf, pdfplumber and PyMuPDF handles for one PDF file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        stat = path.stat()
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        # Held for the duration of a tool call; the underlying handles are not thread-safe
+        self.lock = RLock()
+        self._reader: PdfReader | None = None
+        self._plumber: pdfplumber.PDF | None = None
+        self._mupdf: pymupdf.Document | None = None
+
+    @property
+    def reader(self) -> PdfReader:
+        """pypdf reader, for page objects and metadata."""
+        if self._reader is None:
+            self._reader = PdfReader(str(self.path))
+        return self._reader
+
+    @property
+    def plumber(self) -> pdfplumber.PDF:
+        """pdfplumber document, for layout-aware text and tables."""
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(self.path)
+        return self._plumber
+
+    @property
+    def mupdf(self) -> pymupdf.Document:
+        """PyMuPDF document, for fast text extraction."""
+        if self._mupdf is None:
+            self._mupdf = pymupdf.open(str(self.path))
+        return self._mupdf
+
+    @property
+    def page_count(self) -> int:
+        """Number of pages, taken from whichever handle is already open (PyMuPDF otherwise)."""
+        if self._reader is not None:
+            return len(self._reader.pages)
+        if self._plumber is not None:
+            return len(self._plumber.pages)
+        return len(self.mupdf)
+
+    def is_current(self) -> bool:
+        """Whether the file on disk is unchanged since the handles were created."""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self.signature
+
+    def close(self):
+        """Close all open handles."""
+        with self.lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            if self._plumber is not None:
+                self._plumber.close()
+                self._plumber = None
+            if self._mupdf is not None:
+                self._mupdf.close()
+                self._mupdf = None
+
+
+_documents: OrderedDict[Path, PdfDocument] = OrderedDict()
+_documents_lock = Lock()
+
+
+@contextmanager
+def open_document(path: Path) -> Iterator[PdfDocument]:
+    """
+    Open a PDF for the duration of a tool call.
+
+    Reuses the cached document for path if the file is unchanged, otherwise creates a new one.
+    The document's lock is held while the caller uses it.
+    """
+    stale = []
+    with _documents_lock:
+        doc = _documents.pop(path, None)
+        if doc is not None and not doc.is_current():
+            stale.append(doc)
+            doc = None
+        if doc is None:
+            doc = PdfDocument(path)
+        if MAX_OPEN_DOCUMENTS > 0:
+            _documents[path] = doc
+            while len(_documents) > MAX_OPEN_DOCUMENTS:
+                stale.append(_documents.popitem(last=False)[1])
+
+    # Close outside the registry lock, evicted documents may still be in use by another call
+    for old in stale:
+        old.close()
+
+    try:
+        with doc.lock:
+            yield doc
+    finally:
+        if MAX_OPEN_DOCUMENTS <= 0:
+            doc.close()
+
+
+def close_documents():
+    """Close and forget all cached documents."""
+    with _documents_lock:
+        docs = list(_documents.values())
+        _documents.clear()
+    for doc in docs:
+        doc.close()
@@ -0,0 +1,84 @@
+"""Text extraction engines for the pdf server.
+
+Two backends are available:
+
+- ``fast``: PyMuPDF ``page.get_text()``. Very fast, returns text in content-stream order.
+- ``layout``: pdfplumber ``page.extract_text()``. Slow layout analysis, but reading order
+  follows the visual position of characters, which matters for tables and multi-column pages.
+
+``auto`` inspects each page with PyMuPDF and only falls back to pdfplumber for pages that
+look complex (ruling lines or side-by-side text lines).
+"""
+
+from collections.abc import Iterable, Iterator
+
+import pymupdf
+
+from .documents import PdfDocument
+
+ENGINES = ("auto", "fast", "layout")
+
+# A page with at least this many vector path items is treated as a table/form page
+COMPLEX_DRAWINGS_THRESHOLD = 8
+
+
+def validate_engine(engine: str) -> str | None:
+    """Return an error message if engine is not supported, otherwise None."""
+    if engine not in ENGINES:
+        return f"Error: Invalid engine '{engine}'. Must be one of: {', '.join(ENGINES)}"
+    return None
+
+
+def is_complex_page(page: pymupdf.Page) -> bool:
+    """
+    Decide whether a page needs pdfplumber's layout analysis.
+
+    A page is complex if it has many vector drawing items (table grids, forms) or if two
+    text lines sit side by side, i.e. overlap vertically while being horizontally disjoint
+    (columns, table cells).
+    """
+    if sum(len(path["items"]) for path in page.get_cdrawings()) >= COMPLEX_DRAWINGS_THRESHOLD:
+        return True
+
+    lines = sorted(
+        (
+            line["bbox"]
+            for block in page.get_text("dict")["blocks"]
+            if block["type"] == 0
+            for line in block["lines"]
+            if any(span["text"].strip() for span in line["spans"])
+        ),
+        key=lambda bbox: bbox[1],
+    )
+    for i, (x0, y0, x1, y1) in enumerate(lines):
+        for ox0, oy0, ox1, _ in lines[i + 1 :]:
+            if oy0 >= y1:
+                break
+            if x1 <= ox0 or ox1 <= x0:
+                return True
+    return False
+
+
+def iter_page_text(
+    doc: PdfDocument,
+    page_indices: Iterable[int] | None = None,
+    engine: str = "auto",
+) -> Iterator[tuple[int, str]]:
+    """
+    Yield (page_index, text) for each requested page using the selected engine.
+
+    If page_indices is None, all pages are extracted. Out-of-range indices are skipped.
+    The pdfplumber handle is only opened when a page needs it.
+    """
+    total_pages = doc.page_count
+    for i in page_indices if page_indices is not None else range(total_pages):
+        if not 0 <= i < total_pages:
+            continue
+
+        if engine == "fast" or (engine == "auto" and not is_complex_page(doc.mupdf[i])):
+            yield i, doc.mupdf[i].get_text()
+            continue
+
+        page = doc.plumber.pages[i]
+        yield i, page.extract_text() or ""
+        page.close()
@@ -0,0 +1,154 @@
+"""Incremental-update writes for the pdf server.
+
+The PDF format allows changes to be appended to the end of a file: the new versions of the
+modified objects, followed by a cross-reference section that points to them and back (via
+``/Prev``) to the previous one. Unchanged bytes are never rewritten, so an edit costs
+O(changed objects) instead of O(file size).
+
+The appended cross-reference section uses the same form as the file's latest one: a classic
+``xref`` table with a trailer, or a cross-reference stream.
+"""
+
+import re
+from collections.abc import Mapping
+from pathlib import Path
+from typing import BinaryIO
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+)
+
+# startxref and its offset are within the last 1024 bytes (ISO 32000-1, 7.5.5)
+TAIL_SIZE = 1024
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_OBJECT_HEADER = re.compile(rb"\s*\d+\s+\d+\s+obj")
+
+
+def last_xref(path: Path) -> tuple[int, bool] | None:
+    """
+    Locate the latest cross-reference section of a PDF.
+
+    Returns:
+        (offset, is_stream) of the section, or None if startxref is missing or does not point
+        to a cross-reference section (e.g. a damaged file that readers repair on load)
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        f.seek(max(0, size - TAIL_SIZE))
+        matches = _STARTXREF.findall(f.read())
+        if not matches:
+            return None
+
+        offset = int(matches[-1])
+        if offset >= size:
+            return None
+        f.seek(offset)
+        head = f.read(32)
+
+    if head.startswith(b"xref"):
+        return offset, False
+    if _OBJECT_HEADER.match(head):
+        return offset, True
+    return None
+
+
+def supports_incremental_update(path: Path, reader: PdfReader) -> bool:
+    """Whether objects can be appended to path as an incremental update."""
+    # Appended objects of encrypted files would have to be encrypted too
+    return not reader.is_encrypted and last_xref(path) is not None
+
+
+def append_update(path: Path, reader: PdfReader, objects: Mapping[IndirectObject, PdfObject]):
+    """
+    Append new versions of objects to path as an incremental update.
+
+    Args:
+        path: PDF file to update in place. Must satisfy supports_incremental_update.
+        reader: Reader for the current content of path, used for the trailer
+        objects: Replacement object for each indirect reference. Indirect references inside
+            the replacements keep pointing at the existing objects.
+
+    Raises:
+        ValueError: If path has no usable cross-reference section
+    """
+    xref = last_xref(path)
+    if xref is None:
+        raise ValueError(f"No cross-reference section found in {path}")
+    prev_offset, is_stream = xref
+
+    trailer = reader.trailer
+    size = int(trailer["/Size"])
+
+    with open(path, "ab") as f:
+        # Offsets must be absolute, and the previous %%EOF may lack a trailing newline
+        f.write(b"\n")
+        entries = []
+        for ref, obj in sorted(objects.items(), key=lambda item: item[0].idnum):
+            entries.append((ref.idnum, ref.generation, f.tell()))
+            f.write(f"{ref.idnum} {ref.generation} obj\n".encode())
+            obj.write_to_stream(f)
+            f.write(b"\nendobj\n")
+
+        if is_stream:
+            xref_offset = _write_xref_stream(f, entries, trailer, size, prev_offset)
+        else:
+            xref_offset = _write_xref_table(f, entries, trailer, size, prev_offset)
+        f.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def _trailer_entries(trailer: Mapping, size: int, prev_offset: int) -> dict[NameObject, PdfObject]:
+    """Entries of the update's trailer: /Size, /Prev and the document-level keys of the previous one."""
+    entries = {NameObject("/Size"): NumberObject(size), NameObject("/Prev"): NumberObject(prev_offset)}
+    for key in ("/Root", "/Info", "/ID"):
+        if key in trailer:
+            entries[NameObject(key)] = trailer.raw_get(key)
+    return entries
+
+
+def _write_xref_table(
+    f: BinaryIO, entries: list[tuple[int, int, int]], trailer: Mapping, size: int, prev_offset: int
+) -> int:
+    """Write a classic cross-reference table and trailer, returning the table's offset."""
+    xref_offset = f.tell()
+    f.write(b"xref\n")
+    f.writelines(f"{num} 1\n{offset:010d} {generation:05d} n \n".encode() for num, generation, offset in entries)
+
+    f.write(b"trailer\n")
+    DictionaryObject(_trailer_entries(trailer, size, prev_offset)).write_to_stream(f)
+    f.write(b"\n")
+    return xref_offset
+
+
+def _write_xref_stream(
+    f: BinaryIO, entries: list[tuple[int, int, int]], trailer: Mapping, size: int, prev_offset: int
+) -> int:
+    """Write a cross-reference stream object, returning its offset."""
+    xref_num = size
+    xref_offset = f.tell()
+    entries = [*entries, (xref_num, 0, xref_offset)]
+
+    offset_width = max(4, (xref_offset.bit_length() + 7) // 8)
+    data = b"".join(
+        b"\x01" + offset.to_bytes(offset_width, "big") + generation.to_bytes(2, "big")
+        for _, generation, offset in entries
+    )
+
+    stream = DecodedStreamObject()
+    stream.update(_trailer_entries(trailer, size + 1, prev_offset))
+    stream[NameObject("/Type")] = NameObject("/XRef")
+    stream[NameObject("/W")] = ArrayObject([NumberObject(1), NumberObject(offset_width), NumberObject(2)])
+    stream[NameObject("/Index")] = ArrayObject(NumberObject(value) for num, _, _ in entries for value in (num, 1))
+    stream.set_data(data)
+
+    f.write(f"{xref_num} 0 obj\n".encode())
+    stream.write_to_stream(f)
+    f.write(b"\nendobj\n")
+    return xref_offset
@@ -1,4 +1,4 @@
-from . import mcp
+from .server import mcp
 
 
 @mcp.prompt()
@@ -12,7 +12,8 @@ def pdf_quick_reference() -> str:
 |------|-----------|--------------|
 | Merge PDFs | pypdf | `writer.add_page(page)` |
 | Split PDFs | pypdf | One page per file |
-| Extract text | pdfplumber | `page.extract_text()` |
+| Extract text (fast) | pymupdf | `page.get_text()` |
+| Extract text (layout) | pdfplumber | `page.extract_text()` |
 | Extract tables | pdfplumber | `page.extract_tables()` |
 | Create PDFs | reportlab | Canvas or Platypus |
 | Command line merge | qpdf | `qpdf --empty --pages ...` |
@@ -22,6 +23,7 @@ def pdf_quick_reference() -> str:
 ## Common Operations
 
 **pypdf** - Basic operations (merge, split, rotate, metadata, passwords)
+**pymupdf** - Fast text extraction
 **pdfplumber** - Text extraction with layout, table extraction
 **reportlab** - Create PDFs from scratch
 """
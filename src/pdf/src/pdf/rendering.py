@@ -0,0 +1,195 @@
+"""Page rasterization for the pdf server.
+
+Pages are rendered with PyMuPDF into a content-addressed cache in the shared workspace
+(``pdf_renders/<content hash>/<page>_<dpi>dpi.<format>``), so rendering the same page of an
+unchanged file again is free. Missing pages are rendered in a process pool, each worker
+rendering a contiguous run of pages with its own document handle.
+
+The cache is bounded by total file size and evicts least recently used images. Each process
+keeps a running total of the cache size, counted once from the directory and then from the
+images it renders. The directory is only scanned again to evict, down to RENDER_CACHE_LOW_WATER
+of the limit so that evictions are rare.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+import pymupdf
+
+from core import WORKSPACE, get_env_int, get_workspace_file, process_pool
+
+RENDER_FORMATS = ("png", "webp")
+MIN_RENDER_DPI = 18
+MAX_RENDER_DPI = 600
+
+# Configuration constants (configurable via environment variables)
+RENDER_WORKERS = get_env_int("PDF_RENDER_WORKERS", min(4, os.cpu_count() or 1), min_value=1)  # Default: up to 4
+# Default: 512MB. 0 keeps every image: rendered pages are returned as files, so they are always written.
+MAX_RENDER_CACHE_BYTES = get_env_int("PDF_RENDER_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+
+# Fraction of MAX_RENDER_CACHE_BYTES the cache is evicted down to
+RENDER_CACHE_LOW_WATER = 0.9
+
+
+def validate_render_options(dpi: int, format: str) -> str | None:
+    """Return an error message if dpi or format is not supported, otherwise None."""
+    if format not in RENDER_FORMATS:
+        return f"Error: Invalid format '{format}'. Must be one of: {', '.join(RENDER_FORMATS)}"
+    if not MIN_RENDER_DPI <= dpi <= MAX_RENDER_DPI:
+        return f"Error: dpi must be between {MIN_RENDER_DPI} and {MAX_RENDER_DPI}"
+    if format == "webp":
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            return "Error: Pillow not installed. Run: uv sync --extra ocr"
+    return None
+
+
+def render_cache_dir() -> Path:
+    """Directory of the render cache in the shared workspace."""
+    return get_workspace_file(WORKSPACE, "pdf_renders")
+
+
+def render_path(content_hash: str, page: int, dpi: int, format: str) -> Path:
+    """Cache path of a rendered page."""
+    return render_cache_dir() / content_hash / f"{page + 1}_{dpi}dpi.{format}"
+
+
+def render_chunk(path: str, pages: list[int], outputs: list[str], dpi: int, format: str):
+    """
+    Render pages of the PDF at path to the given output files.
+
+    Runs in worker processes. Each image is written to a temporary file and moved into
+    place, so concurrent renders of the same page never expose a partial file.
+    """
+    with pymupdf.open(path) as doc:
+        for page, output in zip(pages, outputs):
+            pixmap = doc[page].get_pixmap(dpi=dpi)
+            tmp = f"{output}.{os.getpid()}.tmp"
+            if format == "webp":
+                pixmap.pil_save(tmp, format="WEBP")
+            else:
+                pixmap.save(tmp, output="png")
+            os.replace(tmp, output)
+
+
+_render_pool: ProcessPoolExecutor | None = None
+_lock = Lock()
+
+# Size of the render cache as known to this process, None until first counted
+_cache_total: int | None = None
+_cache_lock = Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Get or create the shared render process pool.
+
+    Thread-safe singleton pattern using double-checked locking.
+    """
+    global _render_pool
+    if _render_pool is None:
+        with _lock:
+            if _render_pool is None:
+                _render_pool = process_pool(RENDER_WORKERS)
+    return _render_pool
+
+
+def render_pages(path: Path, content_hash: str, pages: list[int], dpi: int, format: str) -> list[Path]:
+    """
+    Render pages, reusing cached images.
+
+    Args:
+        path: Path to the PDF file
+        content_hash: Content hash of the PDF (see cache.file_hash)
+        pages: 0-based page indices to render
+        dpi: Resolution in dots per inch
+        format: Image format, "png" or "webp"
+
+    Returns:
+        Paths of the rendered images, in the order of pages
+    """
+    outputs = [render_path(content_hash, page, dpi, format) for page in pages]
+    missing = []
+    for page, output in zip(pages, outputs):
+        # Mark cached images as recently used; an image evicted by a concurrent call is a cache miss
+        try:
+            os.utime(output)
+        except FileNotFoundError:
+            missing.append((page, str(output)))
+
+    if missing:
+        outputs[0].parent.mkdir(parents=True, exist_ok=True)
+        workers = min(RENDER_WORKERS, len(missing))
+        chunk_size = -(-len(missing) // workers)
+        chunks = [missing[start : start + chunk_size] for start in range(0, len(missing), chunk_size)]
+
+        if len(chunks) == 1:
+            render_chunk(str(path), *_unzip(chunks[0]), dpi, format)
+        else:
+            pool = get_render_pool()
+            futures = [pool.submit(render_chunk, str(path), *_unzip(chunk), dpi, format) for chunk in chunks]
+            for future in futures:
+                future.result()
+
+    _record_renders([Path(output) for _, output in missing], set(outputs))
+    return outputs
+
+
+def _unzip(chunk: list[tuple[int, str]]) -> tuple[list[int], list[str]]:
+    return [page for page, _ in chunk], [output for _, output in chunk]
+
+
+def _cache_entries() -> list[tuple[int, int, Path]]:
+    """(mtime_ns, size, path) of the cached images, without the temporary files of renders in progress."""
+    entries = []
+    for file in render_cache_dir().glob("*/*"):
+        if file.suffix == ".tmp":
+            continue
+        try:
+            stat = file.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, file))
+    return entries
+
+
+def _record_renders(rendered: list[Path], keep: set[Path]):
+    """Add rendered images to the cache size, evicting if it exceeds MAX_RENDER_CACHE_BYTES."""
+    global _cache_total
+    if MAX_RENDER_CACHE_BYTES <= 0:
+        return
+
+    with _cache_lock:
+        if _cache_total is None:
+            # The first count includes the images just rendered
+            _cache_total = sum(size for _, size, _ in _cache_entries())
+        else:
+            for file in rendered:
+                try:
+                    _cache_total += file.stat().st_size
+                except OSError:
+                    continue
+        if _cache_total > MAX_RENDER_CACHE_BYTES:
+            _cache_total = _evict(keep)
+
+
+def _evict(keep: set[Path]) -> int:
+    """
+    Delete least recently used images down to RENDER_CACHE_LOW_WATER of MAX_RENDER_CACHE_BYTES, never deleting keep.
+
+    Returns:
+        Size of the remaining images
+    """
+    entries = _cache_entries()
+    total = sum(size for _, size, _ in entries)
+    target = int(MAX_RENDER_CACHE_BYTES * RENDER_CACHE_LOW_WATER)
+    for _, size, file in sorted(entries):
+        if total <= target:
+            break
+        if file in keep:
+            continue
+        file.unlink(missing_ok=True)
+        total -= size
+    return total
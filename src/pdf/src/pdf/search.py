@@ -0,0 +1,176 @@
+"""Full-text search index for the pdf server.
+
+Page text is stored in a SQLite FTS5 table in the shared workspace, keyed by the SHA-256 of
+the file content and the page index. Documents are indexed lazily the first time they are
+searched; unchanged files (and identical copies of a file) are never indexed twice.
+"""
+
+import os
+import re
+import sqlite3
+from collections.abc import Iterable
+from contextlib import closing
+from threading import Lock
+
+from core import WORKSPACE, get_workspace_file
+
+SNIPPET_TOKENS = 16
+
+# Messages of the errors SQLite raises for an invalid FTS5 query, as opposed to database errors
+_QUERY_ERRORS = ("fts5:", "unterminated string", "no such column", "unknown special query")
+
+
+class SearchIndex:
+    """Manages the page text index in a persistent SQLite database."""
+
+    def __init__(self, db_path: str | None = None):
+        """Initialize the index database.
+
+        Args:
+            db_path: Path to the database file. Defaults to ~/.mcp-servers/workspace/pdf_search_index.db
+
+        Raises:
+            OSError: If workspace directory cannot be created
+        """
+        if db_path is None:
+            db_path = str(get_workspace_file(WORKSPACE, "pdf_search_index.db"))
+
+        self.db_path = db_path
+        self._init_schema()
+
+        # Indexed text may be sensitive, keep the database owner-only
+        try:
+            os.chmod(self.db_path, 0o600)
+        except OSError:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_schema(self):
+        """Initialize the database schema."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_documents (
+                    file_hash TEXT PRIMARY KEY,
+                    page_count INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+                    text,
+                    file_hash UNINDEXED,
+                    page UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+
+    def indexed(self, content_hashes: list[str]) -> set[str]:
+        """Return the subset of content_hashes that are already indexed."""
+        found = set()
+        with closing(self._connect()) as conn:
+            for start in range(0, len(content_hashes), 500):
+                batch = content_hashes[start : start + 500]
+                rows = conn.execute(
+                    f"SELECT file_hash FROM indexed_documents WHERE file_hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def add_document(self, content_hash: str, pages: Iterable[tuple[int, str]]):
+        """Index the text of a document.
+
+        Args:
+            content_hash: Content hash of the PDF (see cache.file_hash)
+            pages: (page_index, text) for every page of the document
+        """
+        rows = [(text, content_hash, page) for page, text in pages]
+        with closing(self._connect()) as conn, conn:
+            # Another call may have indexed the same content meanwhile
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM indexed_documents WHERE file_hash = ?", (content_hash,)).fetchone():
+                return
+            conn.executemany("INSERT INTO page_text (text, file_hash, page) VALUES (?, ?, ?)", rows)
+            conn.execute(
+                "INSERT INTO indexed_documents (file_hash, page_count) VALUES (?, ?)",
+                (content_hash, len(rows)),
+            )
+
+    def search(self, query: str, content_hashes: list[str], limit: int = 20) -> list[tuple[str, int, str]]:
+        """Search the pages of the given documents, best matches first.
+
+        The query uses FTS5 syntax (phrases in double quotes, AND/OR/NOT, prefix*). If it is
+        not valid FTS5, every word is searched as a literal term instead.
+
+        Raises:
+            sqlite3.Error: If the index database cannot be read
+
+        Args:
+            query: Search query
+            content_hashes: Documents to search
+            limit: Maximum number of matching pages
+
+        Returns:
+            (content_hash, page_index, snippet) for each matching page, matches marked with **
+        """
+        if not content_hashes:
+            return []
+
+        try:
+            return self._search(query, content_hashes, limit)
+        except sqlite3.OperationalError as e:
+            # Locked or broken databases are not query errors
+            if not str(e).startswith(_QUERY_ERRORS):
+                raise
+            literal = " ".join(f'"{term}"' for term in re.findall(r"\S+", query.replace('"', " ")))
+            if not literal:
+                return []
+            return self._search(literal, content_hashes, limit)
+
+    def _search(self, query: str, content_hashes: list[str], limit: int) -> list[tuple[str, int, str]]:
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TEMP TABLE search_scope (file_hash TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO search_scope VALUES (?)", [(h,) for h in content_hashes])
+            return conn.execute(
+                f"""
+                SELECT file_hash, page, snippet(page_text, 0, '**', '**', '...', {SNIPPET_TOKENS})
+                FROM page_text
+                WHERE page_text MATCH ? AND file_hash IN (SELECT file_hash FROM search_scope)
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (query, limit),
+            ).fetchall()
+
+    def clear(self) -> int:
+        """Delete all indexed documents.
+
+        Returns:
+            Number of deleted documents
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM page_text")
+            return conn.execute("DELETE FROM indexed_documents").rowcount
+
+
+# Global instance with thread-safe initialization
+_search_index: SearchIndex | None = None
+_lock = Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Get or create the global search index instance.
+
+    Thread-safe singleton pattern using double-checked locking.
+
+    Returns:
+        SearchIndex: The global search index instance
+    """
+    global _search_index
+    if _search_index is None:
+        with _lock:
+            if _search_index is None:
+                _search_index = SearchIndex()
+    return _search_index
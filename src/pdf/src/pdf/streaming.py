@@ -0,0 +1,224 @@
+"""Bounded-memory PDF writing for merge and split.
+
+pypdf's ``PdfWriter`` keeps every copied object in memory until ``write()``. ``StreamingPdfWriter``
+serializes a page and every object it references as soon as the page is added, and only keeps
+the byte offsets needed for the final cross-reference table. Readers are opened on file handles
+(not read into memory) and can be released as soon as their pages are copied, so peak memory is
+bounded by the largest single page graph rather than the size of the output.
+"""
+
+from collections import deque
+from collections.abc import Iterable
+from pathlib import Path
+from typing import BinaryIO
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+from core import process_pool
+
+HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+
+class StreamingPdfWriter:
+    """Write a PDF incrementally, one source page graph at a time."""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._start = stream.tell()
+        self._offsets: list[int | None] = []  # byte offset of object number i + 1
+        self._kids: list[int] = []
+        stream.write(HEADER)
+        self._pages_num = self._reserve()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._kids)
+
+    def _reserve(self) -> int:
+        """Allocate an object number in the output file."""
+        self._offsets.append(None)
+        return len(self._offsets)
+
+    def _write_object(self, num: int, obj: PdfObject):
+        self._offsets[num - 1] = self._stream.tell() - self._start
+        self._stream.write(f"{num} 0 obj\n".encode())
+        obj.write_to_stream(self._stream)
+        self._stream.write(b"\nendobj\n")
+
+    def add_pages(self, reader: PdfReader, page_indices: Iterable[int] | None = None):
+        """
+        Copy pages from reader and write them, with everything they reference, immediately.
+
+        Object numbers are remapped per call; nothing from reader is retained afterwards.
+        References to pages of reader that are not copied (e.g. link destinations) become null.
+
+        Args:
+            reader: Source document
+            page_indices: 0-based indices of pages to copy. If None, copies all pages.
+        """
+        pages = reader.pages
+        selected = [i for i in (page_indices if page_indices is not None else range(len(pages))) if 0 <= i < len(pages)]
+
+        # Source (idnum, generation) -> output object number, None for pages that are not copied
+        mapping: dict[tuple[int, int], int | None] = {}
+        for page in pages:
+            ref = page.indirect_reference
+            if ref is not None:
+                mapping[(ref.idnum, ref.generation)] = None
+
+        page_nums = []
+        for i in selected:
+            num = self._reserve()
+            ref = pages[i].indirect_reference
+            if ref is not None:
+                mapping[(ref.idnum, ref.generation)] = num
+            page_nums.append(num)
+
+        pending: deque[tuple[IndirectObject, int]] = deque()
+
+        def remap(ref: IndirectObject) -> PdfObject:
+            key = (ref.idnum, ref.generation)
+            if key not in mapping:
+                mapping[key] = self._reserve()
+                pending.append((ref, mapping[key]))
+            num = mapping[key]
+            return NullObject() if num is None else IndirectObject(num, 0, None)
+
+        for i, num in zip(selected, page_nums):
+            page = self._copy(pages[i], remap, skip=("/Parent",))
+            page[NameObject("/Parent")] = IndirectObject(self._pages_num, 0, None)
+            self._write_object(num, page)
+            self._kids.append(num)
+
+            while pending:
+                ref, obj_num = pending.popleft()
+                obj = reader.get_object(ref)
+                self._write_object(obj_num, NullObject() if obj is None else self._copy(obj, remap))
+
+    def _copy(self, obj: PdfObject, remap, skip: tuple[str, ...] = ()) -> PdfObject:
+        """Copy obj with indirect references remapped to output object numbers."""
+        if isinstance(obj, IndirectObject):
+            return remap(obj)
+        if isinstance(obj, StreamObject):
+            stream = obj.__class__()
+            stream._data = obj._data
+            # /Length is recomputed on write and may be an indirect reference
+            for key, value in obj.items():
+                if key != "/Length":
+                    stream[NameObject(key)] = self._copy(value, remap)
+            return stream
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in obj.items():
+                if key not in skip:
+                    copy[NameObject(key)] = self._copy(value, remap)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value, remap) for value in obj)
+        return obj
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer."""
+        pages = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Pages"),
+                NameObject("/Kids"): ArrayObject(IndirectObject(num, 0, None) for num in self._kids),
+                NameObject("/Count"): NumberObject(len(self._kids)),
+            }
+        )
+        self._write_object(self._pages_num, pages)
+
+        catalog_num = self._reserve()
+        catalog = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Catalog"),
+                NameObject("/Pages"): IndirectObject(self._pages_num, 0, None),
+            }
+        )
+        self._write_object(catalog_num, catalog)
+
+        xref_offset = self._stream.tell() - self._start
+        self._stream.write(f"xref\n0 {len(self._offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in self._offsets:
+            self._stream.write(f"{offset:010d} 00000 n \n".encode())
+
+        trailer = DictionaryObject(
+            {
+                NameObject("/Size"): NumberObject(len(self._offsets) + 1),
+                NameObject("/Root"): IndirectObject(catalog_num, 0, None),
+            }
+        )
+        self._stream.write(b"trailer\n")
+        trailer.write_to_stream(self._stream)
+        self._stream.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def merge_files(paths: list[Path], output: Path) -> int:
+    """
+    Merge PDFs into output, releasing each input as soon as its pages are written.
+
+    Returns:
+        Number of pages written
+    """
+    with open(output, "wb") as out:
+        writer = StreamingPdfWriter(out)
+        for path in paths:
+            with open(path, "rb") as f:
+                reader = PdfReader(f)
+                writer.add_pages(reader)
+                reader.close()
+        writer.close()
+    return writer.page_count
+
+
+def split_file(path: Path, page_indices: list[int], out_dir: Path) -> list[str]:
+    """
+    Write each page of path to its own file in out_dir (``{stem}_page_{n}.pdf``).
+
+    The source is read through a file handle, and parsed objects are dropped after each page so
+    memory does not grow with the number of pages.
+
+    Returns:
+        Paths of the created files
+    """
+    created = []
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        total_pages = len(reader.pages)
+        for i in page_indices:
+            if not 0 <= i < total_pages:
+                continue
+            output = out_dir / f"{path.stem}_page_{i + 1}.pdf"
+            with open(output, "wb") as out:
+                writer = StreamingPdfWriter(out)
+                writer.add_pages(reader, [i])
+                writer.close()
+            created.append(str(output))
+            reader.resolved_objects.clear()
+        reader.close()
+    return created
+
+
+def split_file_parallel(path: Path, page_indices: list[int], out_dir: Path, workers: int) -> list[str]:
+    """
+    Split with a process pool, each worker handling a contiguous run of pages with its own reader.
+
+    Returns:
+        Paths of the created files, in page order
+    """
+    chunk_size = -(-len(page_indices) // workers)
+    chunks = [page_indices[start : start + chunk_size] for start in range(0, len(page_indices), chunk_size)]
+
+    with process_pool(len(chunks)) as pool:
+        results = pool.map(split_file, [path] * len(chunks), chunks, [out_dir] * len(chunks))
+        return [created for chunk in results for created in chunk]
@@ -0,0 +1,201 @@
+"""Table post-processing for the pdf server.
+
+pdfplumber returns each table as a list of rows of optional strings, one table per page
+region. ``build_tables`` turns the per-page results into ``Table`` objects in one pass:
+
+- header detection: the first row is a header if its cells are non-empty, non-numeric
+  and distinct
+- multi-page stitching: a table that is the first on its page continues the last table
+  of the previous page if it has the same number of columns and either repeats that
+  table's header or has no header of its own
+- column typing: columns whose values all parse as integers or floats are typed, empty
+  cells become nulls; identifiers with leading zeros and integers beyond Int64 stay strings
+
+Typed tables can be written to Parquet with polars (``uv sync --extra tables``), which
+DuckDB and the data-analysis server read directly.
+"""
+
+import csv
+import io
+import json
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+_INT = re.compile(r"[+-]?\d+")
+_GROUPED_NUMBER = re.compile(r"[+-]?\d{1,3}(,\d{3})+(\.\d+)?")
+_FLOAT = re.compile(r"[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?")
+_LEADING_ZERO = re.compile(r"[+-]?0\d")
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+
+@dataclass
+class Table:
+    """A table, possibly spanning several pages."""
+
+    pages: list[int]  # 0-based page indices
+    index: int  # 1-based index of the table on its first page
+    rows: list[list[str | None]]
+    header: list[str] | None = None
+    types: list[type] = field(default_factory=list)
+
+    @property
+    def columns(self) -> list[str]:
+        """Unique column names, from the header where available."""
+        names = []
+        for i in range(len(self.rows[0])):
+            name = (self.header[i] if self.header else "") or f"col_{i + 1}"
+            base, n = name, 2
+            while name in names:
+                name, n = f"{base}_{n}", n + 1
+            names.append(name)
+        return names
+
+    @property
+    def label(self) -> str:
+        first, last = self.pages[0] + 1, self.pages[-1] + 1
+        pages = f"Page {first}" if first == last else f"Pages {first}-{last}"
+        return f"{pages}, Table {self.index}"
+
+    def typed_rows(self) -> list[list[Any]]:
+        """Rows with cells converted to the column types."""
+        return [[_convert(cell, kind) for cell, kind in zip(row, self.types)] for row in self.rows]
+
+
+def build_tables(page_tables: Iterable[tuple[int, list[list[list[str | None]]]]]) -> list[Table]:
+    """
+    Detect headers, stitch tables continued across pages and infer column types.
+
+    Args:
+        page_tables: (page_index, tables) in page order, as returned by pdfplumber
+
+    Returns:
+        Tables in document order
+    """
+    tables: list[Table] = []
+    # Last table of the previous page, if it can be continued
+    open_table: Table | None = None
+
+    for page, raw_tables in page_tables:
+        raw_tables = [_clean(raw) for raw in raw_tables]
+        raw_tables = [raw for raw in raw_tables if raw]
+        for index, rows in enumerate(raw_tables, start=1):
+            header = _detect_header(rows)
+            if (
+                index == 1
+                and open_table is not None
+                and open_table.pages[-1] == page - 1
+                and len(rows[0]) == len(open_table.rows[0])
+                and (header is None or header == open_table.header)
+            ):
+                open_table.pages.append(page)
+                open_table.rows.extend(rows[1:] if header is not None else rows)
+                table = open_table
+            else:
+                table = Table(pages=[page], index=index, rows=rows[1:] if header else rows, header=header)
+                tables.append(table)
+        open_table = table if raw_tables else None
+
+    for table in tables:
+        table.types = [_infer_type([row[i] for row in table.rows]) for i in range(len(table.columns))]
+    return tables
+
+
+def format_table(table: Table, format: str) -> str:
+    """Format a table as markdown, CSV or JSON."""
+    if format == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        if table.header:
+            writer.writerow(table.header)
+        writer.writerows([cell if cell is not None else "" for cell in row] for row in table.rows)
+        return out.getvalue().rstrip("\n")
+
+    elif format == "json":
+        columns = table.columns
+        return json.dumps([dict(zip(columns, row)) for row in table.typed_rows()], indent=2)
+
+    else:  # markdown
+        lines = ["| " + " | ".join(table.columns) + " |", "| " + " | ".join(["---"] * len(table.columns)) + " |"]
+        for row in table.rows:
+            cells = [(cell or "").replace("\n", " ").replace("|", "\\|") for cell in row]
+            lines.append("| " + " | ".join(cells) + " |")
+        return "\n".join(lines)
+
+
+def write_parquet(table: Table, path: Path):
+    """
+    Write a table to a Parquet file with typed columns.
+
+    Raises:
+        ImportError: If polars is not installed
+    """
+    import polars as pl
+
+    dtypes = {int: pl.Int64, float: pl.Float64, str: pl.String}
+    columns = table.columns
+    typed_rows = table.typed_rows()
+    frame = pl.DataFrame(
+        {name: [row[i] for row in typed_rows] for i, name in enumerate(columns)},
+        schema={name: dtypes[kind] for name, kind in zip(columns, table.types)},
+    )
+    frame.write_parquet(path)
+
+
+def _clean(rows: list[list[str | None]]) -> list[list[str | None]]:
+    """Strip cells and drop rows that are entirely empty."""
+    cleaned = [[cell.strip() if isinstance(cell, str) else None for cell in row] for row in rows]
+    return [row for row in cleaned if any(row)]
+
+
+def _detect_header(rows: list[list[str | None]]) -> list[str] | None:
+    """Return the first row if it looks like a header row."""
+    first = rows[0]
+    if len(rows) < 2 or not all(first) or len(set(first)) != len(first):
+        return None
+    if any(_FLOAT.fullmatch(cell.replace(",", "")) for cell in first):
+        return None
+    return [" ".join(cell.split()) for cell in first]
+
+
+def _number(value: str) -> int | float | None:
+    """
+    Parse an integer or float cell, allowing thousands separators.
+
+    Identifiers with leading zeros ("007", zip codes) and integers outside the Int64 range
+    are not numbers, so their columns stay strings.
+    """
+    if _LEADING_ZERO.match(value):
+        return None
+    if _GROUPED_NUMBER.fullmatch(value):
+        value = value.replace(",", "")
+    if _INT.fullmatch(value):
+        number = int(value)
+        return number if _INT64_MIN <= number <= _INT64_MAX else None
+    if _FLOAT.fullmatch(value):
+        return float(value)
+    return None
+
+
+def _infer_type(values: list[str | None]) -> type:
+    """Infer int, float or str for a column from its non-empty values."""
+    kinds = set()
+    for value in values:
+        if value:
+            number = _number(value)
+            if number is None:
+                return str
+            kinds.add(type(number))
+    if not kinds:
+        return str
+    return int if kinds == {int} else float
+
+
+def _convert(value: str | None, kind: type) -> Any:
+    if not value:
+        return None
+    if kind is str:
+        return value
+    return kind(_number(value))
@@ -1,9 +1,30 @@
+import asyncio
+import shutil
+from collections.abc import Callable, Iterable, Iterator
 from pathlib import Path
+from typing import Any
 
-import pdfplumber
-from pypdf import PdfReader, PdfWriter
+from fastmcp import Context
+from pypdf import PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, NumberObject
 
-from . import mcp
+from core import WORKSPACE, get_workspace_file
+
+from .cache import file_hash, get_extraction_cache
+from .documents import PdfDocument, open_document
+from .engines import iter_page_text, validate_engine
+from .incremental import append_update, supports_incremental_update
+from .rendering import render_pages as render_page_images
+from .rendering import validate_render_options
+from .search import get_search_index
+from .server import mcp
+from .streaming import merge_files, split_file, split_file_parallel
+from .tables import build_tables, format_table, write_parquet
+
+# Pages per extraction/cache window when iterating over a document
+STREAM_WINDOW = 16
+
+TABLE_FORMATS = ("markdown", "csv", "json", "parquet")
 
 # ======================================================
 # Text Extraction
@@ -11,72 +32,291 @@ from . import mcp
 
 
 @mcp.tool()
-def extract_text(file_path: str, pages: str | None = None) -> str:
+def extract_text(
+    file_path: str,
+    pages: str | None = None,
+    engine: str = "auto",
+    output_file: str | None = None,
+) -> str:
     """
     Extract text content from a PDF file.
 
     Args:
         file_path: Path to the PDF file
         pages: Optional page range (e.g., "1-3", "1,3,5", "2-"). If None, extracts all pages.
+        engine: Extraction engine - "fast" (PyMuPDF), "layout" (pdfplumber), or "auto"
+            (PyMuPDF for simple pages, pdfplumber for pages with tables or columns)
+        output_file: Optional filename in the shared workspace (~/.mcp-servers/workspace/).
+            If set, pages are written to the file as they are extracted and only a summary is returned.
 
     Returns:
-        Extracted text content
+        Extracted text content, or a summary if output_file is set
     """
+    if error := validate_engine(engine):
+        return error
+
     path = Path(file_path).expanduser().resolve()
     if not path.exists():
         return f"Error: File not found: {path}"
 
-    page_indices = _parse_page_range(pages, path) if pages else None
+    try:
+        output = _workspace_output(output_file) if output_file else None
+    except ValueError as e:
+        return f"Error: {e}"
+
+    content_hash = file_hash(path)
+    with open_document(path) as doc:
+        total_pages = _page_count(doc, content_hash)
+        page_indices = _parse_page_range(pages, total_pages) if pages else None
+        target_pages = page_indices if page_indices else list(range(total_pages))
+
+        page_texts = _iter_cached_pages(
+            content_hash,
+            "text",
+            {"engine": engine},
+            target_pages,
+            lambda missing: iter_page_text(doc, missing, engine),
+        )
+
+        if output is not None:
+            with open(output, "w", encoding="utf-8") as f:
+                count, chars = 0, 0
+                for i, text in page_texts:
+                    f.write(("\n\n" if count else "") + f"--- Page {i + 1} ---\n{text}")
+                    count += 1
+                    chars += len(text)
+            return f"Extracted {count} pages ({chars} characters) to: {output}"
+
+        results = [f"--- Page {i + 1} ---\n{text}" for i, text in page_texts]
 
-    results = []
-    with pdfplumber.open(path) as pdf:
-        total_pages = len(pdf.pages)
-        target_pages = page_indices if page_indices else range(total_pages)
+    return "\n\n".join(results) if results else "No text extracted."
 
-        for i in target_pages:
-            if 0 <= i < total_pages:
-                page = pdf.pages[i]
-                text = page.extract_text() or ""
-                results.append(f"--- Page {i + 1} ---\n{text}")
 
-    return "\n\n".join(results) if results else "No text extracted."
+@mcp.tool()
+async def stream_text(
+    ctx: Context,
+    file_path: str,
+    pages: str | None = None,
+    engine: str = "auto",
+    output_file: str | None = None,
+) -> str:
+    """
+    Extract text to a workspace file page by page, reporting each page as an MCP progress notification.
+
+    Use this instead of extract_text for large PDFs: extraction runs off the event loop in windows
+    of pages, the file grows as pages are extracted and the final response is only a summary.
+
+    Args:
+        ctx: FastMCP context
+        file_path: Path to the PDF file
+        pages: Optional page range (e.g., "1-3", "1,3,5", "2-"). If None, extracts all pages.
+        engine: Extraction engine - "fast" (PyMuPDF), "layout" (pdfplumber), or "auto"
+        output_file: Optional filename in the shared workspace (~/.mcp-servers/workspace/)
+            to write the extracted text to. Defaults to the PDF's name with a .txt extension.
+
+    Returns:
+        Summary with the number of pages and characters extracted and the output path
+    """
+    if error := validate_engine(engine):
+        return error
+
+    path = Path(file_path).expanduser().resolve()
+    if not path.exists():
+        return f"Error: File not found: {path}"
+
+    try:
+        output = _workspace_output(output_file or f"{path.stem}.txt")
+    except ValueError as e:
+        return f"Error: {e}"
+
+    content_hash = await asyncio.to_thread(file_hash, path)
+    total_pages = await asyncio.to_thread(_document_page_count, path, content_hash)
+    page_indices = _parse_page_range(pages, total_pages) if pages else None
+    target_pages = page_indices if page_indices else list(range(total_pages))
+
+    count, chars = 0, 0
+    for start in range(0, len(target_pages) or 1, STREAM_WINDOW):
+        window = target_pages[start : start + STREAM_WINDOW]
+        page_texts = await asyncio.to_thread(_write_text_window, path, content_hash, window, engine, output, count)
+        for i, text in page_texts:
+            count += 1
+            chars += len(text)
+            await ctx.report_progress(
+                progress=count, total=len(target_pages), message=f"Page {i + 1}: {len(text)} characters"
+            )
+
+    return f"Streamed {count} pages ({chars} characters) to: {output}"
 
 
 @mcp.tool()
-def extract_tables(file_path: str, pages: str | None = None, format: str = "markdown") -> str:
+def extract_tables(
+    file_path: str,
+    pages: str | None = None,
+    format: str = "markdown",
+    output_dir: str | None = None,
+) -> str:
     """
     Extract tables from a PDF file.
 
+    Header rows are detected, and tables continued across consecutive pages are stitched
+    into one table (a repeated header on the continuation page is dropped).
+
     Args:
         file_path: Path to the PDF file
         pages: Optional page range (e.g., "1-3", "1,3,5"). If None, extracts from all pages.
-        format: Output format - "markdown", "csv", or "json"
+        format: Output format - "markdown", "csv", "json", or "parquet". Parquet writes one file
+            per table with typed columns (requires: uv sync --extra tables).
+        output_dir: Directory in the shared workspace (~/.mcp-servers/workspace/) for Parquet files
+            (default: tables/<file name>)
 
     Returns:
-        Extracted tables in the specified format
+        Extracted tables in the specified format, or the written Parquet files
     """
+    if format not in TABLE_FORMATS:
+        return f"Error: Invalid format '{format}'. Must be one of: {', '.join(TABLE_FORMATS)}"
+
     path = Path(file_path).expanduser().resolve()
     if not path.exists():
         return f"Error: File not found: {path}"
 
-    page_indices = _parse_page_range(pages, path) if pages else None
+    if format == "parquet":
+        try:
+            import polars  # noqa: F401
+        except ImportError:
+            return "Error: polars not installed. Run: uv sync --extra tables"
+        try:
+            out_dir = get_workspace_file(WORKSPACE, output_dir or f"tables/{path.stem}")
+        except ValueError as e:
+            return f"Error: {e}"
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    content_hash = file_hash(path)
+    with open_document(path) as doc:
+        total_pages = _page_count(doc, content_hash)
+        page_indices = _parse_page_range(pages, total_pages) if pages else None
+        target_pages = page_indices if page_indices else list(range(total_pages))
+
+        tables = build_tables(
+            _iter_cached_pages(
+                content_hash,
+                "tables",
+                {},
+                target_pages,
+                lambda missing: _iter_page_tables(doc, missing),
+            )
+        )
+
+    if not tables:
+        return "No tables found."
+
+    if format == "parquet":
+        results = []
+        for n, table in enumerate(tables, start=1):
+            output = out_dir / f"table_{n}.parquet"
+            write_parquet(table, output)
+            results.append(f"{table.label} ({len(table.rows)} rows x {len(table.columns)} columns): {output}")
+        return f"Wrote {len(tables)} tables:\n" + "\n".join(results)
+
+    return "\n\n".join(f"--- {table.label} ---\n{format_table(table, format)}" for table in tables)
+
+
+# ======================================================
+# Search
+# ======================================================
+
+
+@mcp.tool()
+def search_pdf(path: str, query: str, limit: int = 20) -> str:
+    """
+    Search PDF text and return matching pages with snippets.
+
+    Documents are added to a persistent full-text index the first time they are searched,
+    so later searches on unchanged files do not extract any text.
+
+    Args:
+        path: Path to a PDF file, or a directory to search all PDFs in (recursively)
+        query: Search terms. Supports "exact phrases", OR, NOT and prefix* queries.
+        limit: Maximum number of matching pages to return (default: 20)
+
+    Returns:
+        Matching pages, best matches first, with matched terms marked as **term**
+    """
+    if limit < 1:
+        return "Error: limit must be at least 1"
+
+    root = Path(path).expanduser().resolve()
+    if not root.exists():
+        return f"Error: Path not found: {root}"
+
+    files = sorted(root.rglob("*.pdf")) if root.is_dir() else [root]
+    if not files:
+        return f"No PDF files found in: {root}"
+
+    # Identical copies share a hash and are indexed once
+    paths_by_hash: dict[str, list[Path]] = {}
+    for file in files:
+        paths_by_hash.setdefault(file_hash(file), []).append(file)
+
+    index = get_search_index()
+    indexed = index.indexed(list(paths_by_hash))
+    for content_hash, hash_paths in paths_by_hash.items():
+        if content_hash not in indexed:
+            with open_document(hash_paths[0]) as doc:
+                index.add_document(content_hash, _iter_search_text(doc, content_hash))
+
+    matches = index.search(query, list(paths_by_hash), limit)
+    if not matches:
+        return f"No matches found for: {query}"
 
     results = []
-    with pdfplumber.open(path) as pdf:
-        total_pages = len(pdf.pages)
-        target_pages = page_indices if page_indices else range(total_pages)
+    for content_hash, page, snippet in matches:
+        for file in paths_by_hash[content_hash]:
+            name = file.relative_to(root) if root.is_dir() else file.name
+            results.append(f"--- {name}, Page {page + 1} ---\n{snippet}")
+
+    return f"Found {len(results)} matching pages:\n\n" + "\n\n".join(results)
+
 
-        for i in target_pages:
-            if 0 <= i < total_pages:
-                page = pdf.pages[i]
-                tables = page.extract_tables()
+# ======================================================
+# Rendering
+# ======================================================
 
-                for table_idx, table in enumerate(tables):
-                    if table:
-                        formatted = _format_table(table, format)
-                        results.append(f"--- Page {i + 1}, Table {table_idx + 1} ---\n{formatted}")
 
-    return "\n\n".join(results) if results else "No tables found."
+@mcp.tool()
+def render_pages(file_path: str, pages: str | None = None, dpi: int = 150, format: str = "png") -> str:
+    """
+    Render PDF pages to images.
+
+    Images are cached in the shared workspace (~/.mcp-servers/workspace/pdf_renders/) by file
+    content, page and resolution, so rendering the same page again returns the cached file.
+
+    Args:
+        file_path: Path to the PDF file
+        pages: Optional page range (e.g., "1-3", "1,3,5", "2-"). If None, renders all pages.
+        dpi: Resolution in dots per inch (default: 150, 72 = original size)
+        format: Image format - "png" or "webp"
+
+    Returns:
+        Paths to the rendered images, one per page
+    """
+    if error := validate_render_options(dpi, format):
+        return error
+
+    path = Path(file_path).expanduser().resolve()
+    if not path.exists():
+        return f"Error: File not found: {path}"
+
+    content_hash = file_hash(path)
+    with open_document(path) as doc:
+        total_pages = _page_count(doc, content_hash)
+    page_indices = _parse_page_range(pages, total_pages) if pages else list(range(total_pages))
+    if not page_indices:
+        return "No pages to render."
+
+    images = render_page_images(path, content_hash, page_indices, dpi, format)
+
+    lines = [f"Page {i + 1}: {image}" for i, image in zip(page_indices, images)]
+    return f"Rendered {len(images)} pages at {dpi} dpi:\n" + "\n".join(lines)
 
 
 # ======================================================
@@ -99,19 +339,25 @@ def get_metadata(file_path: str) -> str:
     if not path.exists():
         return f"Error: File not found: {path}"
 
-    reader = PdfReader(str(path))
-    meta = reader.metadata or {}
-
-    info = {
-        "Title": meta.get("/Title", "N/A"),
-        "Author": meta.get("/Author", "N/A"),
-        "Subject": meta.get("/Subject", "N/A"),
-        "Creator": meta.get("/Creator", "N/A"),
-        "Producer": meta.get("/Producer", "N/A"),
-        "Creation Date": meta.get("/CreationDate", "N/A"),
-        "Modification Date": meta.get("/ModDate", "N/A"),
-        "Page Count": len(reader.pages),
-    }
+    cache = get_extraction_cache()
+    content_hash = file_hash(path)
+    info = cache.get(content_hash, "metadata", {})
+
+    if info is None:
+        with open_document(path) as doc:
+            meta = doc.reader.metadata or {}
+
+            info = {
+                "Title": str(meta.get("/Title", "N/A")),
+                "Author": str(meta.get("/Author", "N/A")),
+                "Subject": str(meta.get("/Subject", "N/A")),
+                "Creator": str(meta.get("/Creator", "N/A")),
+                "Producer": str(meta.get("/Producer", "N/A")),
+                "Creation Date": str(meta.get("/CreationDate", "N/A")),
+                "Modification Date": str(meta.get("/ModDate", "N/A")),
+                "Page Count": len(doc.reader.pages),
+            }
+        cache.put(content_hash, "metadata", {}, info)
 
     return "\n".join(f"{k}: {v}" for k, v in info.items())
 
@@ -131,8 +377,8 @@ def get_page_count(file_path: str) -> int:
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    reader = PdfReader(str(path))
-    return len(reader.pages)
+    with open_document(path) as doc:
+        return _page_count(doc, file_hash(path))
 
 
 # ======================================================
@@ -141,18 +387,24 @@ def get_page_count(file_path: str) -> int:
 
 
 @mcp.tool()
-def split_pdf(file_path: str, output_dir: str, pages: str | None = None) -> str:
+def split_pdf(file_path: str, output_dir: str, pages: str | None = None, workers: int = 1) -> str:
     """
     Split a PDF into individual pages or a subset of pages.
 
+    Pages are written one at a time, so memory stays bounded for very large documents.
+
     Args:
         file_path: Path to the PDF file
         output_dir: Directory to save the split pages
         pages: Optional page range to extract (e.g., "1-3", "1,3,5"). If None, splits all pages.
+        workers: Number of worker processes (default: 1). Values above 1 split page runs in parallel.
 
     Returns:
         List of created files
     """
+    if workers < 1:
+        return "Error: workers must be at least 1"
+
     path = Path(file_path).expanduser().resolve()
     out_dir = Path(output_dir).expanduser().resolve()
 
@@ -161,21 +413,14 @@ def split_pdf(file_path: str, output_dir: str, pages: str | None = None) -> str:
 
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    reader = PdfReader(str(path))
-    page_indices = _parse_page_range(pages, path) if pages else range(len(reader.pages))
-
-    created_files = []
-    base_name = path.stem
-
-    for i in page_indices:
-        if 0 <= i < len(reader.pages):
-            writer = PdfWriter()
-            writer.add_page(reader.pages[i])
+    with open_document(path) as doc:
+        total_pages = _page_count(doc, file_hash(path))
+    page_indices = _parse_page_range(pages, total_pages) if pages else list(range(total_pages))
 
-            output_path = out_dir / f"{base_name}_page_{i + 1}.pdf"
-            with open(output_path, "wb") as f:
-                writer.write(f)
-            created_files.append(str(output_path))
+    if workers > 1 and len(page_indices) > 1:
+        created_files = split_file_parallel(path, page_indices, out_dir, min(workers, len(page_indices)))
+    else:
+        created_files = split_file(path, page_indices, out_dir)
 
     return f"Created {len(created_files)} files:\n" + "\n".join(created_files)
 
@@ -185,6 +430,9 @@ def merge_pdfs(file_paths: list[str], output_path: str) -> str:
     """
     Merge multiple PDF files into a single PDF.
 
+    Each input is written to the output as soon as it is read and released afterwards,
+    so memory stays bounded when merging many large files.
+
     Args:
         file_paths: List of paths to PDF files to merge
         output_path: Path for the merged output file
@@ -192,21 +440,23 @@ def merge_pdfs(file_paths: list[str], output_path: str) -> str:
     Returns:
         Path to the merged file
     """
-    writer = PdfWriter()
     out_path = Path(output_path).expanduser().resolve()
 
+    paths = []
     for fp in file_paths:
         path = Path(fp).expanduser().resolve()
         if not path.exists():
             return f"Error: File not found: {path}"
-
-        reader = PdfReader(str(path))
-        for page in reader.pages:
-            writer.add_page(page)
+        paths.append(path)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "wb") as f:
-        writer.write(f)
+    # Write next to the output and swap in at the end, the output may also be one of the inputs
+    tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+    try:
+        merge_files(paths, tmp_path)
+        tmp_path.replace(out_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     return f"Merged {len(file_paths)} files into: {out_path}"
 
@@ -217,6 +467,7 @@ def rotate_pages(
     rotation: int,
     pages: str | None = None,
     output_path: str | None = None,
+    incremental: bool = True,
 ) -> str:
     """
     Rotate pages in a PDF file.
@@ -226,6 +477,9 @@ def rotate_pages(
         rotation: Rotation angle in degrees (90, 180, or 270)
         pages: Optional page range to rotate. If None, rotates all pages.
         output_path: Optional output path. If None, overwrites the original file.
+        incremental: Append only the rotated page objects to the file as an incremental update
+            instead of rewriting the whole document (default: True). Encrypted or damaged files
+            are always rewritten.
 
     Returns:
         Path to the rotated file
@@ -237,16 +491,33 @@ def rotate_pages(
     if not path.exists():
         return f"Error: File not found: {path}"
 
-    reader = PdfReader(str(path))
-    writer = PdfWriter()
-    page_indices = _parse_page_range(pages, path) if pages else None
+    out = Path(output_path).expanduser().resolve() if output_path else path
 
-    for i, page in enumerate(reader.pages):
-        if page_indices is None or i in page_indices:
-            page.rotate(rotation)
-        writer.add_page(page)
+    with open_document(path) as doc:
+        reader = doc.reader
+        page_indices = _parse_page_range(pages, len(reader.pages)) if pages else None
+
+        if incremental and supports_incremental_update(path, reader):
+            updates = {}
+            for i, page in enumerate(reader.pages):
+                if page_indices is None or i in page_indices:
+                    # Update a copy, the shared reader's pages must stay unchanged
+                    copy = DictionaryObject(page)
+                    copy[NameObject("/Rotate")] = NumberObject((page.rotation + rotation) % 360)
+                    updates[page.indirect_reference] = copy
+
+            if out != path:
+                shutil.copyfile(path, out)
+            append_update(out, reader, updates)
+            return f"Rotated pages by {rotation}° and saved to: {out}"
+
+        writer = PdfWriter()
+        for i, page in enumerate(reader.pages):
+            # Rotate the writer's copy, the shared reader's pages must stay unchanged
+            copy = writer.add_page(page)
+            if page_indices is None or i in page_indices:
+                copy.rotate(rotation)
 
-    out = Path(output_path).expanduser().resolve() if output_path else path
     with open(out, "wb") as f:
         writer.write(f)
 
@@ -270,13 +541,14 @@ def extract_pages(file_path: str, pages: str, output_path: str) -> str:
     if not path.exists():
         return f"Error: File not found: {path}"
 
-    reader = PdfReader(str(path))
     writer = PdfWriter()
-    page_indices = _parse_page_range(pages, path)
+    with open_document(path) as doc:
+        reader = doc.reader
+        page_indices = _parse_page_range(pages, len(reader.pages))
 
-    for i in page_indices:
-        if 0 <= i < len(reader.pages):
-            writer.add_page(reader.pages[i])
+        for i in page_indices:
+            if 0 <= i < len(reader.pages):
+                writer.add_page(reader.pages[i])
 
     out = Path(output_path).expanduser().resolve()
     out.parent.mkdir(parents=True, exist_ok=True)
@@ -286,12 +558,156 @@ def extract_pages(file_path: str, pages: str, output_path: str) -> str:
     return f"Extracted {len(page_indices)} pages to: {out}"
 
 
+# ======================================================
+# Cache
+# ======================================================
+
+
+@mcp.tool()
+def clear_extraction_cache() -> str:
+    """
+    Clear cached text, table and metadata extraction results.
+
+    Returns:
+        Number of cleared cache entries
+    """
+    count = get_extraction_cache().clear()
+    return f"Cleared {count} cached extraction entries."
+
+
+@mcp.tool()
+def clear_search_index() -> str:
+    """
+    Clear the full-text search index used by search_pdf.
+
+    Returns:
+        Number of documents removed from the index
+    """
+    count = get_search_index().clear()
+    return f"Removed {count} documents from the search index."
+
+
 # ======================================================
 # Helper Functions
 # ======================================================
 
 
-def _parse_page_range(pages_str: str, path: Path) -> list[int]:
+def _iter_cached_pages(
+    content_hash: str,
+    kind: str,
+    options: dict,
+    page_indices: list[int],
+    extract: Callable[[list[int]], Iterable[tuple[int, Any]]],
+) -> Iterator[tuple[int, Any]]:
+    """
+    Yield per-page results in page order, extracting and caching only pages missing from the cache.
+
+    Pages are processed in windows of STREAM_WINDOW, so results can be consumed while later
+    pages are still being extracted and memory stays bounded for large documents.
+
+    Args:
+        content_hash: Content hash of the PDF
+        kind: Result kind stored in the cache (e.g., "text", "tables")
+        options: Extraction options that affect the result
+        page_indices: 0-based page indices to return
+        extract: Called with the missing page indices, yields (page_index, value)
+
+    Yields:
+        (page_index, result) for each page that has a result
+    """
+    cache = get_extraction_cache()
+    for start in range(0, len(page_indices), STREAM_WINDOW):
+        window = page_indices[start : start + STREAM_WINDOW]
+        results = cache.get_many(content_hash, kind, options, window)
+
+        missing = [i for i in window if i not in results]
+        if missing:
+            extracted = dict(extract(missing))
+            cache.put_many(content_hash, kind, options, extracted)
+            results.update(extracted)
+
+        for i in window:
+            if i in results:
+                yield i, results[i]
+
+
+def _write_text_window(
+    path: Path, content_hash: str, window: list[int], engine: str, output: Path, written: int
+) -> list[tuple[int, str]]:
+    """
+    Extract one window of pages and append it to output, for stream_text.
+
+    Runs in a worker thread; the document is opened (and its lock held) only for this window.
+
+    Args:
+        path: Path to the PDF file
+        content_hash: Content hash of the PDF
+        window: 0-based page indices to extract
+        engine: Extraction engine
+        output: File to write to, truncated when nothing has been written yet
+        written: Number of pages already written to output
+
+    Returns:
+        (page_index, text) for each extracted page
+    """
+    with open_document(path) as doc:
+        page_texts = list(
+            _iter_cached_pages(
+                content_hash, "text", {"engine": engine}, window, lambda missing: iter_page_text(doc, missing, engine)
+            )
+        )
+
+    with open(output, "a" if written else "w", encoding="utf-8") as f:
+        for n, (i, text) in enumerate(page_texts, start=written):
+            f.write(("\n\n" if n else "") + f"--- Page {i + 1} ---\n{text}")
+    return page_texts
+
+
+def _document_page_count(path: Path, content_hash: str) -> int:
+    """Get the number of pages of the PDF at path, using the extraction cache."""
+    with open_document(path) as doc:
+        return _page_count(doc, content_hash)
+
+
+def _workspace_output(filename: str) -> Path:
+    """Resolve an output filename inside the shared workspace, creating parent directories."""
+    output = get_workspace_file(WORKSPACE, filename)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    return output
+
+
+def _iter_search_text(doc: PdfDocument, content_hash: str) -> Iterator[tuple[int, str]]:
+    """Yield (page_index, text) for every page to index, using the fast engine and the extraction cache."""
+    return _iter_cached_pages(
+        content_hash,
+        "text",
+        {"engine": "fast"},
+        list(range(_page_count(doc, content_hash))),
+        lambda missing: iter_page_text(doc, missing, "fast"),
+    )
+
+
+def _page_count(doc: PdfDocument, content_hash: str) -> int:
+    """Get the number of pages of a PDF, using the extraction cache."""
+    cache = get_extraction_cache()
+    count = cache.get(content_hash, "page_count", {})
+    if count is None:
+        count = doc.page_count
+        cache.put(content_hash, "page_count", {}, count)
+    return count
+
+
+def _iter_page_tables(doc: PdfDocument, page_indices: list[int]) -> Iterator[tuple[int, list]]:
+    """Yield (page_index, tables) for each requested page using pdfplumber."""
+    total_pages = doc.page_count
+    for i in page_indices:
+        if 0 <= i < total_pages:
+            page = doc.plumber.pages[i]
+            yield i, page.extract_tables()
+            page.close()
+
+
+def _parse_page_range(pages_str: str, total_pages: int) -> list[int]:
     """
     Parse a page range string into a list of 0-based page indices.
 
@@ -300,9 +716,10 @@ def _parse_page_range(pages_str: str, path: Path) -> list[int]:
     - "1,3,5" -> [0, 2, 4]
     - "2-" -> [1, 2, 3, ...] (to end)
     - "-3" -> [0, 1, 2] (from start)
+
+    The page count comes from the caller's already opened document, so parsing
+    the range never re-reads the file.
     """
-    reader = PdfReader(str(path))
-    total_pages = len(reader.pages)
     indices = set()
 
     for part in pages_str.split(","):
@@ -319,35 +736,3 @@ def _parse_page_range(pages_str: str, path: Path) -> list[int]:
             indices.add(int(part) - 1)
 
     return sorted(i for i in indices if 0 <= i < total_pages)
-
-
-def _format_table(table: list[list], format: str) -> str:
-    """Format a table in the specified format."""
-    if format == "csv":
-        lines = []
-        for row in table:
-            cells = [str(cell).replace(",", ";") if cell else "" for cell in row]
-            lines.append(",".join(cells))
-        return "\n".join(lines)
-
-    elif format == "json":
-        import json
-
-        if table and len(table) > 1:
-            headers = [str(h) if h else f"col_{i}" for i, h in enumerate(table[0])]
-            rows = []
-            for row in table[1:]:
-                rows.append({headers[i]: cell for i, cell in enumerate(row)})
-            return json.dumps(rows, indent=2)
-        return json.dumps(table, indent=2)
-
-    else:  # markdown
-        if not table:
-            return ""
-        lines = []
-        for i, row in enumerate(table):
-            cells = [str(cell) if cell else "" for cell in row]
-            lines.append("| " + " | ".join(cells) + " |")
-            if i == 0:
-                lines.append("| " + " | ".join(["---"] * len(cells)) + " |")
-        return "\n".join(lines)
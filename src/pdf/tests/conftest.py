@@ -1,6 +1,7 @@
-import pytest
 from pathlib import Path
 
+import pytest
+
 
 @pytest.fixture(scope="session")
 def sample_pdf(tmp_path_factory) -> Path:
@@ -35,9 +36,9 @@ def sample_pdf(tmp_path_factory) -> Path:
 @pytest.fixture(scope="session")
 def sample_pdf_with_table(tmp_path_factory) -> Path:
     """Create a sample PDF with a table for testing."""
-    from reportlab.lib.pagesizes import letter
     from reportlab.lib import colors
-    from reportlab.platypus import Table, TableStyle, SimpleDocTemplate
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 
     pdf_path = tmp_path_factory.mktemp("data") / "sample_table.pdf"
     doc = SimpleDocTemplate(str(pdf_path), pagesize=letter)
@@ -70,9 +71,70 @@ def sample_pdf_with_table(tmp_path_factory) -> Path:
     return pdf_path
 
 
+@pytest.fixture(scope="session")
+def multipage_table_pdf(tmp_path_factory) -> Path:
+    """Create a PDF with one table spanning two pages, with the header repeated on each page."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    pdf_path = tmp_path_factory.mktemp("data") / "multipage_table.pdf"
+    doc = SimpleDocTemplate(str(pdf_path), pagesize=letter)
+
+    data = [["Item", "Quantity", "Price", "Origin"]]
+    data += [[f"Item {n}", str(n), f"{n * 1.5:.2f}", "Tokyo, Japan"] for n in range(1, 61)]
+
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 1, "black")]))
+
+    doc.build([table])
+    return pdf_path
+
+
 @pytest.fixture
 def output_dir(tmp_path) -> Path:
     """Create an output directory for test results."""
     out = tmp_path / "output"
     out.mkdir()
     return out
+
+
+@pytest.fixture(autouse=True)
+def extraction_cache(tmp_path, monkeypatch):
+    """Use an isolated extraction cache for each test."""
+    from pdf import cache
+
+    extraction_cache = cache.ExtractionCache(str(tmp_path / "pdf_extraction_cache.db"))
+    monkeypatch.setattr(cache, "_extraction_cache", extraction_cache)
+    return extraction_cache
+
+
+@pytest.fixture(autouse=True)
+def search_index(tmp_path, monkeypatch):
+    """Use an isolated search index for each test."""
+    from pdf import search
+
+    search_index = search.SearchIndex(str(tmp_path / "pdf_search_index.db"))
+    monkeypatch.setattr(search, "_search_index", search_index)
+    return search_index
+
+
+@pytest.fixture(autouse=True)
+def document_handles():
+    """Close shared document handles after each test."""
+    from pdf.documents import close_documents
+
+    yield
+    close_documents()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch) -> Path:
+    """Redirect the shared workspace to a temporary directory."""
+    from core import workspace
+
+    from pdf import rendering
+
+    monkeypatch.setattr(workspace, "MCP_SERVERS_BASE", tmp_path / ".mcp-servers")
+    # The render cache size counted in another test's workspace does not apply
+    monkeypatch.setattr(rendering, "_cache_total", None)
+    return workspace.get_workspace(workspace.WORKSPACE)
@@ -1,6 +1,17 @@
+import json
+import shutil
+from pathlib import Path
+
+import pymupdf
 import pytest
+from fastmcp import Client
+from pypdf import PdfReader, PdfWriter
 
 from pdf import mcp
+from pdf.cache import ExtractionCache, file_hash
+from pdf.documents import open_document
+from pdf.engines import is_complex_page, iter_page_text
+from pdf.tables import build_tables, write_parquet
 
 
 def get_tool(name: str):
@@ -49,6 +60,87 @@ class TestExtractText:
         assert "Error" in result
         assert "not found" in result
 
+    @pytest.mark.parametrize("engine", ["fast", "layout", "auto"])
+    def test_engines(self, sample_pdf, engine):
+        extract_text = get_tool("extract_text")
+        result = extract_text(file_path=str(sample_pdf), pages="1-2", engine=engine)
+
+        assert "--- Page 1 ---" in result
+        assert "--- Page 2 ---" in result
+        assert "Test Document Title" in result
+        assert "Page 3: Final Page" not in result
+
+    def test_auto_engine_table_page(self, sample_pdf_with_table):
+        extract_text = get_tool("extract_text")
+        result = extract_text(file_path=str(sample_pdf_with_table), engine="auto")
+
+        # Table rows are kept on one line, as with the layout engine
+        assert "Alice 30 Tokyo" in result
+
+    def test_invalid_engine(self, sample_pdf):
+        extract_text = get_tool("extract_text")
+        result = extract_text(file_path=str(sample_pdf), engine="ocr")
+
+        assert "Error" in result
+        assert "auto, fast, layout" in result
+
+
+class TestStreamingExtraction:
+    def test_extract_text_to_workspace_file(self, sample_pdf, workspace):
+        extract_text = get_tool("extract_text")
+        result = extract_text(file_path=str(sample_pdf), output_file="texts/sample.txt")
+
+        output = workspace / "texts" / "sample.txt"
+        assert "Extracted 3 pages" in result
+        assert str(output) in result
+        assert "Test Document Title" not in result
+        assert output.read_text() == extract_text(file_path=str(sample_pdf))
+
+    def test_output_file_outside_workspace(self, sample_pdf, workspace):
+        extract_text = get_tool("extract_text")
+        result = extract_text(file_path=str(sample_pdf), output_file="../escape.txt")
+
+        assert "Error" in result
+
+    @pytest.mark.asyncio
+    async def test_stream_text_progress_notifications(self, sample_pdf, workspace):
+        messages = []
+
+        async def progress_handler(progress, total, message):
+            messages.append((progress, total, message))
+
+        async with Client(mcp, progress_handler=progress_handler) as client:
+            res = await client.call_tool(
+                "stream_text",
+                {"file_path": str(sample_pdf), "pages": "2-", "output_file": "streamed.txt"},
+            )
+
+        assert "Streamed 2 pages" in res.content[0].text
+        assert [(p, t) for p, t, _ in messages] == [(1, 2), (2, 2)]
+        assert messages[0][2].startswith("Page 2:")
+        assert "Final Page" not in messages[1][2]
+        text = (workspace / "streamed.txt").read_text()
+        assert text.startswith("--- Page 2 ---")
+        assert "Page 3: Final Page" in text
+
+    @pytest.mark.asyncio
+    async def test_stream_text_default_output_file(self, sample_pdf, workspace):
+        async with Client(mcp) as client:
+            res = await client.call_tool("stream_text", {"file_path": str(sample_pdf)})
+
+        assert "Streamed 3 pages" in res.content[0].text
+        assert "Page 1" in (workspace / f"{sample_pdf.stem}.txt").read_text()
+
+
+class TestEngines:
+    def test_simple_page_is_not_complex(self, sample_pdf):
+        with pymupdf.open(str(sample_pdf)) as doc:
+            assert not is_complex_page(doc[0])
+
+    def test_table_page_is_complex(self, sample_pdf_with_table):
+        with pymupdf.open(str(sample_pdf_with_table)) as doc:
+            assert is_complex_page(doc[0])
+
 
 class TestExtractTables:
     def test_extract_table_markdown(self, sample_pdf_with_table):
@@ -73,6 +165,61 @@ class TestExtractTables:
         assert "Name" in result
         assert "Alice" in result
 
+    def test_multipage_table_is_stitched(self, multipage_table_pdf):
+        extract_tables = get_tool("extract_tables")
+        result = extract_tables(file_path=str(multipage_table_pdf), format="csv")
+
+        assert result.startswith("--- Pages 1-2, Table 1 ---")
+        assert result.count("Item,Quantity,Price,Origin") == 1
+        assert len(result.splitlines()) == 62
+
+    def test_csv_quotes_commas(self, multipage_table_pdf):
+        extract_tables = get_tool("extract_tables")
+        result = extract_tables(file_path=str(multipage_table_pdf), pages="1", format="csv")
+
+        assert 'Item 1,1,1.50,"Tokyo, Japan"' in result
+
+    def test_json_values_are_typed(self, multipage_table_pdf):
+        extract_tables = get_tool("extract_tables")
+        result = extract_tables(file_path=str(multipage_table_pdf), pages="1", format="json")
+
+        rows = json.loads(result.split("\n", 1)[1])
+        assert rows[0] == {"Item": "Item 1", "Quantity": 1, "Price": 1.5, "Origin": "Tokyo, Japan"}
+
+    def test_extract_table_parquet(self, multipage_table_pdf, workspace):
+        polars = pytest.importorskip("polars")
+
+        extract_tables = get_tool("extract_tables")
+        result = extract_tables(file_path=str(multipage_table_pdf), format="parquet", output_dir="parts")
+
+        assert "Wrote 1 tables" in result
+        assert "60 rows x 4 columns" in result
+        frame = polars.read_parquet(workspace / "parts" / "table_1.parquet")
+        assert frame.schema == {
+            "Item": polars.String,
+            "Quantity": polars.Int64,
+            "Price": polars.Float64,
+            "Origin": polars.String,
+        }
+        assert frame["Quantity"].sum() == sum(range(1, 61))
+
+    def test_identifiers_and_large_integers_stay_strings(self, workspace):
+        polars = pytest.importorskip("polars")
+
+        rows = [["Zip", "Part", "Count"], ["01234", "12345678901234567890", "7"], ["98765", "42", "0"]]
+        (table,) = build_tables([(0, [rows])])
+
+        assert table.types == [str, str, int]
+        assert table.typed_rows()[0] == ["01234", "12345678901234567890", 7]
+        write_parquet(table, workspace / "ids.parquet")
+        assert polars.read_parquet(workspace / "ids.parquet")["Zip"].to_list() == ["01234", "98765"]
+
+    def test_invalid_format(self, sample_pdf_with_table):
+        extract_tables = get_tool("extract_tables")
+        result = extract_tables(file_path=str(sample_pdf_with_table), format="xml")
+
+        assert "Error" in result
+
     def test_no_tables(self, sample_pdf):
         extract_tables = get_tool("extract_tables")
         result = extract_tables(file_path=str(sample_pdf))
@@ -134,6 +281,21 @@ class TestSplitPdf:
         assert not (output_dir / "sample_page_2.pdf").exists()
         assert (output_dir / "sample_page_3.pdf").exists()
 
+    def test_split_parallel(self, sample_pdf, output_dir):
+        split_pdf = get_tool("split_pdf")
+        result = split_pdf(file_path=str(sample_pdf), output_dir=str(output_dir), workers=2)
+
+        assert "Created 3 files" in result
+        extract_text = get_tool("extract_text")
+        for n in range(1, 4):
+            assert f"Page {n}:" in extract_text(file_path=str(output_dir / f"sample_page_{n}.pdf"))
+
+    def test_invalid_workers(self, sample_pdf, output_dir):
+        split_pdf = get_tool("split_pdf")
+        result = split_pdf(file_path=str(sample_pdf), output_dir=str(output_dir), workers=0)
+
+        assert "Error" in result
+
     def test_file_not_found(self, output_dir):
         split_pdf = get_tool("split_pdf")
         result = split_pdf(file_path="/nonexistent/path.pdf", output_dir=str(output_dir))
@@ -164,6 +326,28 @@ class TestMergePdfs:
         get_page_count = get_tool("get_page_count")
         assert get_page_count(file_path=str(merged_path)) == 2
 
+    def test_merge_preserves_content(self, sample_pdf, sample_pdf_with_table, output_dir):
+        merge_pdfs = get_tool("merge_pdfs")
+        merged_path = output_dir / "merged.pdf"
+        result = merge_pdfs(file_paths=[str(sample_pdf), str(sample_pdf_with_table)], output_path=str(merged_path))
+
+        assert "Merged 2 files" in result
+        reader = PdfReader(str(merged_path), strict=True)
+        assert len(reader.pages) == 4
+        assert "Page 3: Final Page" in reader.pages[2].extract_text()
+        assert "Alice" in get_tool("extract_tables")(file_path=str(merged_path), pages="4")
+
+    def test_merge_into_input(self, sample_pdf, output_dir):
+        target = output_dir / "target.pdf"
+        shutil.copyfile(sample_pdf, target)
+
+        merge_pdfs = get_tool("merge_pdfs")
+        result = merge_pdfs(file_paths=[str(target), str(sample_pdf)], output_path=str(target))
+
+        assert "Merged 2 files" in result
+        assert get_tool("get_page_count")(file_path=str(target)) == 6
+        assert not list(output_dir.glob("*.tmp"))
+
     def test_file_not_found(self, output_dir):
         merge_pdfs = get_tool("merge_pdfs")
         result = merge_pdfs(
@@ -211,6 +395,62 @@ class TestRotatePages:
         assert "Error" in result
         assert "90, 180, or 270" in result
 
+    def test_incremental_update_appends_to_file(self, sample_pdf, output_dir):
+        target = output_dir / "target.pdf"
+        shutil.copyfile(sample_pdf, target)
+        original = target.read_bytes()
+
+        rotate_pages = get_tool("rotate_pages")
+        rotate_pages(file_path=str(target), rotation=90, pages="2")
+
+        updated = target.read_bytes()
+        assert updated.startswith(original)
+        assert len(updated) - len(original) < 1024
+        reader = PdfReader(str(target), strict=True)
+        assert [page.rotation for page in reader.pages] == [0, 90, 0]
+        assert [page.rotation for page in pymupdf.open(target)] == [0, 90, 0]
+
+    def test_incremental_update_with_xref_stream(self, output_dir):
+        from pdf.incremental import last_xref
+
+        target = output_dir / "xref_stream.pdf"
+        doc = pymupdf.open()
+        for n in range(3):
+            doc.new_page().insert_text((72, 72), f"Page {n + 1}")
+        doc.save(target, use_objstms=True, garbage=3)
+        doc.close()
+
+        rotate_pages = get_tool("rotate_pages")
+        rotate_pages(file_path=str(target), rotation=270, pages="1,3")
+        rotate_pages(file_path=str(target), rotation=90, pages="1")
+
+        assert last_xref(target)[1]
+        reader = PdfReader(str(target), strict=True)
+        assert [page.rotation for page in reader.pages] == [0, 0, 270]
+        assert "Page 3" in pymupdf.open(target)[2].get_text()
+
+    def test_encrypted_file_is_rewritten(self, sample_pdf, output_dir):
+        writer = PdfWriter(clone_from=str(sample_pdf))
+        writer.encrypt("")
+        target = output_dir / "encrypted.pdf"
+        with open(target, "wb") as f:
+            writer.write(f)
+
+        rotate_pages = get_tool("rotate_pages")
+        output_path = output_dir / "rotated.pdf"
+        rotate_pages(file_path=str(target), rotation=180, output_path=str(output_path))
+
+        assert not output_path.read_bytes().startswith(target.read_bytes())
+        assert [page.rotation for page in PdfReader(str(output_path)).pages] == [180, 180, 180]
+
+    def test_full_rewrite(self, sample_pdf, output_dir):
+        rotate_pages = get_tool("rotate_pages")
+        output_path = output_dir / "rotated.pdf"
+        rotate_pages(file_path=str(sample_pdf), rotation=90, output_path=str(output_path), incremental=False)
+
+        assert not output_path.read_bytes().startswith(sample_pdf.read_bytes())
+        assert [page.rotation for page in PdfReader(str(output_path)).pages] == [90, 90, 90]
+
     def test_file_not_found(self, output_dir):
         rotate_pages = get_tool("rotate_pages")
         result = rotate_pages(
@@ -265,6 +505,299 @@ class TestExtractPages:
         assert "Error" in result
 
 
+class TestSearchPdf:
+    def test_search_file(self, sample_pdf):
+        search_pdf = get_tool("search_pdf")
+        result = search_pdf(path=str(sample_pdf), query="second")
+
+        assert "Found 1 matching pages" in result
+        assert "sample.pdf, Page 2" in result
+        assert "**Second**" in result
+
+    def test_search_directory(self, sample_pdf, sample_pdf_with_table, output_dir):
+        shutil.copyfile(sample_pdf, output_dir / "a.pdf")
+        (output_dir / "nested").mkdir()
+        shutil.copyfile(sample_pdf_with_table, output_dir / "nested" / "b.pdf")
+
+        search_pdf = get_tool("search_pdf")
+        result = search_pdf(path=str(output_dir), query="Tokyo OR Final")
+
+        assert "a.pdf, Page 3" in result
+        assert "nested/b.pdf, Page 1" in result
+
+    def test_index_built_once(self, sample_pdf, monkeypatch):
+        from pdf import tools
+
+        calls = []
+        original = tools._iter_search_text
+
+        def recording_iter_search_text(doc, content_hash):
+            calls.append(content_hash)
+            return original(doc, content_hash)
+
+        monkeypatch.setattr(tools, "_iter_search_text", recording_iter_search_text)
+
+        search_pdf = get_tool("search_pdf")
+        search_pdf(path=str(sample_pdf), query="page")
+        search_pdf(path=str(sample_pdf), query="test")
+
+        assert len(calls) == 1
+
+    def test_phrase_and_literal_queries(self, sample_pdf):
+        search_pdf = get_tool("search_pdf")
+
+        assert "Page 1" in search_pdf(path=str(sample_pdf), query='"test paragraph"')
+        # Not valid FTS5 syntax, searched as literal terms
+        assert "Page 1" in search_pdf(path=str(sample_pdf), query="test-paragraph")
+
+    def test_database_errors_are_not_query_errors(self, sample_pdf, monkeypatch):
+        import sqlite3
+
+        from pdf.search import SearchIndex
+
+        search_pdf = get_tool("search_pdf")
+        search_pdf(path=str(sample_pdf), query="page")
+
+        def locked(self, query, content_hashes, limit):
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(SearchIndex, "_search", locked)
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            search_pdf(path=str(sample_pdf), query="page")
+
+    def test_no_matches(self, sample_pdf):
+        search_pdf = get_tool("search_pdf")
+        result = search_pdf(path=str(sample_pdf), query="nonexistentterm")
+
+        assert "No matches found" in result
+
+    def test_limit(self, sample_pdf):
+        search_pdf = get_tool("search_pdf")
+        result = search_pdf(path=str(sample_pdf), query="page", limit=1)
+
+        assert "Found 1 matching pages" in result
+        assert "Error" in search_pdf(path=str(sample_pdf), query="page", limit=0)
+
+    def test_path_not_found(self):
+        search_pdf = get_tool("search_pdf")
+        result = search_pdf(path="/nonexistent/path.pdf", query="page")
+
+        assert "Error" in result
+
+    def test_clear_search_index(self, sample_pdf):
+        get_tool("search_pdf")(path=str(sample_pdf), query="page")
+
+        assert get_tool("clear_search_index")() == "Removed 1 documents from the search index."
+
+
+class TestRenderPages:
+    def test_render_png(self, sample_pdf, workspace):
+        render_pages = get_tool("render_pages")
+        result = render_pages(file_path=str(sample_pdf), pages="1-2", dpi=72)
+
+        assert "Rendered 2 pages at 72 dpi" in result
+        image = Path(result.splitlines()[1].split(": ", 1)[1])
+        assert image.is_relative_to(workspace / "pdf_renders")
+        assert image.read_bytes().startswith(b"\x89PNG")
+        # Letter size at 72 dpi
+        assert pymupdf.Pixmap(str(image)).width == 612
+
+    def test_render_webp(self, sample_pdf, workspace):
+        render_pages = get_tool("render_pages")
+        result = render_pages(file_path=str(sample_pdf), pages="3", dpi=36, format="webp")
+
+        image = Path(result.splitlines()[1].split(": ", 1)[1])
+        assert image.suffix == ".webp"
+        assert image.read_bytes()[8:12] == b"WEBP"
+
+    def test_parallel_render(self, sample_pdf, workspace, monkeypatch):
+        from pdf import rendering
+
+        monkeypatch.setattr(rendering, "RENDER_WORKERS", 2)
+        render_pages = get_tool("render_pages")
+        result = render_pages(file_path=str(sample_pdf), dpi=36)
+
+        assert "Rendered 3 pages" in result
+        assert len(list((workspace / "pdf_renders").glob("*/*.png"))) == 3
+
+    def test_cached_render(self, sample_pdf, workspace, monkeypatch):
+        from pdf import rendering
+
+        render_pages = get_tool("render_pages")
+        first = render_pages(file_path=str(sample_pdf), pages="1", dpi=72)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("page rendered again")
+
+        monkeypatch.setattr(rendering, "render_chunk", fail)
+        assert render_pages(file_path=str(sample_pdf), pages="1", dpi=72) == first
+
+    def test_eviction_keeps_requested_pages(self, sample_pdf, workspace, monkeypatch):
+        from pdf import rendering
+
+        render_pages = get_tool("render_pages")
+        render_pages(file_path=str(sample_pdf), pages="1", dpi=72)
+        monkeypatch.setattr(rendering, "MAX_RENDER_CACHE_BYTES", 1)
+        render_pages(file_path=str(sample_pdf), pages="2", dpi=72)
+
+        assert [p.name for p in (workspace / "pdf_renders").glob("*/*")] == ["2_72dpi.png"]
+
+    def test_eviction_skips_renders_in_progress(self, sample_pdf, workspace, monkeypatch):
+        from pdf import rendering
+
+        render_pages = get_tool("render_pages")
+        render_pages(file_path=str(sample_pdf), pages="1", dpi=72)
+        in_progress = next((workspace / "pdf_renders").glob("*/")) / "3_72dpi.png.123.tmp"
+        in_progress.write_bytes(b"partial")
+        monkeypatch.setattr(rendering, "MAX_RENDER_CACHE_BYTES", 1)
+        render_pages(file_path=str(sample_pdf), pages="2", dpi=72)
+
+        assert in_progress.exists()
+
+    def test_cache_size_is_counted_once(self, sample_pdf, workspace, monkeypatch):
+        from pdf import rendering
+
+        render_pages = get_tool("render_pages")
+        render_pages(file_path=str(sample_pdf), pages="1", dpi=72)
+        scans = []
+        entries = rendering._cache_entries
+        monkeypatch.setattr(rendering, "_cache_entries", lambda: scans.append(1) or entries())
+        render_pages(file_path=str(sample_pdf), pages="2-3", dpi=72)
+
+        assert not scans
+        assert rendering._cache_total == sum(p.stat().st_size for p in (workspace / "pdf_renders").glob("*/*"))
+
+    def test_invalid_options(self, sample_pdf):
+        render_pages = get_tool("render_pages")
+
+        assert "Error" in render_pages(file_path=str(sample_pdf), format="gif")
+        assert "Error" in render_pages(file_path=str(sample_pdf), dpi=5000)
+
+    def test_file_not_found(self):
+        render_pages = get_tool("render_pages")
+        result = render_pages(file_path="/nonexistent/path.pdf")
+
+        assert "Error" in result
+
+
+class TestExtractionCache:
+    def test_overlapping_ranges_extract_missing_pages_only(self, sample_pdf, monkeypatch):
+        from pdf import tools
+
+        calls = []
+
+        def recording_iter_page_text(doc, page_indices, engine):
+            calls.append(list(page_indices))
+            return iter_page_text(doc, page_indices, engine)
+
+        monkeypatch.setattr(tools, "iter_page_text", recording_iter_page_text)
+        extract_text = get_tool("extract_text")
+
+        first = extract_text(file_path=str(sample_pdf), pages="1-2")
+        full = extract_text(file_path=str(sample_pdf))
+        again = extract_text(file_path=str(sample_pdf), pages="1-2")
+
+        assert calls == [[0, 1], [2]]
+        assert first == again
+        assert "--- Page 3 ---" in full
+
+    def test_engine_is_part_of_key(self, sample_pdf, extraction_cache):
+        extract_text = get_tool("extract_text")
+        extract_text(file_path=str(sample_pdf), engine="fast")
+
+        content_hash = file_hash(sample_pdf)
+        assert len(extraction_cache.get_many(content_hash, "text", {"engine": "fast"}, [0, 1, 2])) == 3
+        assert extraction_cache.get_many(content_hash, "text", {"engine": "layout"}, [0, 1, 2]) == {}
+
+    def test_tables_and_metadata_cached(self, sample_pdf_with_table, extraction_cache):
+        extract_tables = get_tool("extract_tables")
+        get_metadata = get_tool("get_metadata")
+
+        tables = extract_tables(file_path=str(sample_pdf_with_table), format="csv")
+        metadata = get_metadata(file_path=str(sample_pdf_with_table))
+
+        content_hash = file_hash(sample_pdf_with_table)
+        assert extraction_cache.get(content_hash, "tables", {}, 0)[0][1] == ["Alice", "30", "Tokyo"]
+        assert extraction_cache.get(content_hash, "metadata", {})["Page Count"] == 1
+        assert extract_tables(file_path=str(sample_pdf_with_table), format="csv") == tables
+        assert get_metadata(file_path=str(sample_pdf_with_table)) == metadata
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=100)
+        cache.put("hash", "text", {}, "a" * 40, page=0)
+        cache.put("hash", "text", {}, "b" * 40, page=1)
+        cache.get("hash", "text", {}, page=0)  # page 0 becomes most recently used
+        cache.put("hash", "text", {}, "c" * 40, page=2)
+
+        assert cache.get("hash", "text", {}, page=0) == "a" * 40
+        assert cache.get("hash", "text", {}, page=1) is None
+        assert cache.get("hash", "text", {}, page=2) == "c" * 40
+
+    def test_disabled_cache(self, tmp_path):
+        cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=0)
+        cache.put("hash", "text", {}, "text", page=0)
+
+        assert cache.get("hash", "text", {}, page=0) is None
+
+    def test_modified_file_gets_new_hash(self, sample_pdf, output_dir):
+        copy = output_dir / "copy.pdf"
+        copy.write_bytes(sample_pdf.read_bytes())
+        original_hash = file_hash(copy)
+
+        rotate_pages = get_tool("rotate_pages")
+        rotate_pages(file_path=str(copy), rotation=90)
+
+        assert file_hash(copy) != original_hash
+
+    def test_clear_extraction_cache(self, sample_pdf):
+        extract_text = get_tool("extract_text")
+        extract_text(file_path=str(sample_pdf))
+
+        clear_extraction_cache = get_tool("clear_extraction_cache")
+        result = clear_extraction_cache()
+
+        # 3 pages of text plus the page count
+        assert "Cleared 4" in result
+
+
+class TestDocumentHandles:
+    def test_handles_reused_across_calls(self, sample_pdf):
+        with open_document(sample_pdf) as first:
+            pass
+        with open_document(sample_pdf) as second:
+            pass
+
+        assert first is second
+
+    def test_page_range_parsing_does_not_open_pypdf(self, sample_pdf):
+        extract_text = get_tool("extract_text")
+        extract_text(file_path=str(sample_pdf), pages="2-", engine="fast")
+
+        with open_document(sample_pdf) as doc:
+            assert doc._reader is None
+            assert doc._plumber is None
+
+    def test_modified_file_invalidates_handle(self, sample_pdf, output_dir):
+        copy = output_dir / "copy.pdf"
+        copy.write_bytes(sample_pdf.read_bytes())
+        with open_document(copy) as before:
+            assert before.reader.pages[0].rotation == 0
+
+        rotate_pages = get_tool("rotate_pages")
+        rotate_pages(file_path=str(copy), rotation=90, pages="1")
+
+        with open_document(copy) as after:
+            assert after is not before
+            assert after.reader.pages[0].rotation == 90
+
+    def test_rotate_does_not_modify_shared_reader(self, sample_pdf, output_dir):
+        rotate_pages = get_tool("rotate_pages")
+        rotate_pages(file_path=str(sample_pdf), rotation=90, output_path=str(output_dir / "rotated.pdf"))
+
+        with open_document(sample_pdf) as doc:
+            assert doc.reader.pages[0].rotation == 0
+
+
 class TestPageRangeParsing:
     """Test the page range parsing functionality."""
 
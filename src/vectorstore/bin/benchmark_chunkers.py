@@ -0,0 +1,180 @@
+"""Benchmark chunking engines on a corpus of documents.
+
+Compares the ``fixed`` chunker (character windows) with the ``structure`` chunker (token budgets
+at sentence, paragraph and heading boundaries) at comparable chunk sizes:
+
+- index size: number of chunks and total tokens embedded
+- retrieval quality: for sampled sentences of the corpus, a query made of some of the sentence's
+  words is embedded and the chunks are ranked by cosine similarity. A hit is a chunk that
+  contains the whole sentence; hit@1, hit@5 and mean reciprocal rank are reported.
+
+Usage:
+    uv run python bin/benchmark_chunkers.py [corpus_dir] [--embedding hash|configured]
+
+The corpus defaults to ``workspace/`` (PDF, .txt and .md files). If it contains no documents, a
+synthetic corpus of sectioned reports is generated. ``--embedding hash`` (default) uses an
+offline bag-of-words embedding, ``configured`` the server's embedding function (EMBEDDING_TYPE).
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pymupdf
+from vectorstore.chunking import chunk_pages, split_sentences, token_counter, tokenizer_spec
+from vectorstore.ingest import find_files
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / "workspace"
+
+# (label, chunker, chunk_size, chunk_overlap): 1000 characters are about 250 tokens
+CONFIGURATIONS = [
+    ("fixed 1000/200 chars", "fixed", 1000, 200),
+    ("structure 256/32 tokens", "structure", 256, 32),
+    ("structure 128/16 tokens", "structure", 128, 16),
+]
+
+SUBJECTS = ["latency", "throughput", "revenue", "error rate", "memory use", "coverage", "uptime", "cost"]
+SYSTEMS = ["ingest service", "query router", "billing job", "search index", "cache tier", "scheduler"]
+CHANGES = ["rose", "fell", "stayed flat", "doubled", "halved", "recovered"]
+
+
+def generate_corpus(documents: int = 20, sections: int = 6, paragraphs: int = 3) -> list[list[str]]:
+    """Generate reports with numbered sections of paragraphs, as page texts (one section per page)."""
+    rng = random.Random(0)
+    corpus = []
+    for d in range(documents):
+        pages = []
+        for s in range(sections):
+            lines = [f"{s + 1}. {rng.choice(SYSTEMS).upper()} REVIEW"]
+            for _ in range(paragraphs):
+                sentences = [
+                    f"In quarter {rng.randint(1, 4)} the {rng.choice(SUBJECTS)} of the {rng.choice(SYSTEMS)} "
+                    f"{rng.choice(CHANGES)} to {rng.randint(10, 9999)} units after change {d}-{s}-{n}."
+                    for n in range(rng.randint(3, 8))
+                ]
+                lines.extend([" ".join(sentences), ""])
+            pages.append("\n".join(lines))
+        corpus.append(pages)
+    return corpus
+
+
+def load_corpus(paths: list[Path]) -> list[list[str]]:
+    """Page texts of PDF and text files."""
+    corpus = []
+    for path in paths:
+        if path.suffix.lower() == ".pdf":
+            with pymupdf.open(path) as doc:
+                corpus.append([page.get_text() for page in doc])
+        else:
+            corpus.append([path.read_text(encoding="utf-8", errors="replace")])
+    return corpus
+
+
+def hash_embedding(texts: list[str], dimensions: int = 512) -> np.ndarray:
+    """Bag-of-words embeddings with hashed vocabulary, L2-normalized."""
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for word in text.lower().split():
+            word = word.strip(".,;:!?\"'()")
+            if word:
+                vectors[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % dimensions] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def make_queries(corpus: list[list[str]], count: int = 200) -> list[tuple[str, str]]:
+    """Sample (query, sentence) pairs: the query is a random half of the sentence's words."""
+    rng = random.Random(1)
+    sentences = [
+        " ".join(sentence.split())
+        for pages in corpus
+        for page in pages
+        for paragraph in page.split("\n\n")
+        for sentence in split_sentences(" ".join(paragraph.split()))
+        if len(sentence.split()) >= 6
+    ]
+    pairs = []
+    for sentence in rng.sample(sentences, min(count, len(sentences))):
+        words = sentence.split()
+        pairs.append((" ".join(rng.sample(words, len(words) // 2)), sentence))
+    return pairs
+
+
+def run(corpus: list[list[str]], embed: Callable[[list[str]], np.ndarray], tokenizer: str) -> None:
+    """Chunk the corpus with every configuration and print a summary table."""
+    count_tokens = token_counter(tokenizer)
+    queries = make_queries(corpus)
+    query_vectors = embed([query for query, _ in queries])
+    print(f"{len(corpus)} documents, {len(queries)} queries, tokenizer: {tokenizer}")
+    print(f"{'chunker':<24} {'chunks':>7} {'tokens':>9} {'avg':>6} {'seconds':>8} {'hit@1':>6} {'hit@5':>6} {'mrr':>6}")
+
+    for label, chunker, chunk_size, chunk_overlap in CONFIGURATIONS:
+        start = time.perf_counter()
+        chunks = [
+            chunk.text
+            for pages in corpus
+            for chunk in chunk_pages(enumerate(pages), chunk_size, chunk_overlap, chunker, tokenizer)
+        ]
+        elapsed = time.perf_counter() - start
+        tokens = sum(count_tokens(chunk) for chunk in chunks)
+
+        # Compare whitespace-normalized text, chunkers may join lines differently
+        normalized = [" ".join(chunk.split()) for chunk in chunks]
+        scores = query_vectors @ embed(chunks).T
+        hits1 = hits5 = reciprocal_ranks = 0.0
+        for (_, sentence), row in zip(queries, scores):
+            ranking = np.argsort(-row)
+            rank = next((r for r, i in enumerate(ranking[:100]) if sentence in normalized[i]), None)
+            if rank is not None:
+                hits1 += rank == 0
+                hits5 += rank < 5
+                reciprocal_ranks += 1 / (rank + 1)
+
+        n = len(queries) or 1
+        print(
+            f"{label:<24} {len(chunks):>7} {tokens:>9} {tokens / max(1, len(chunks)):>6.0f} {elapsed:>8.3f} "
+            f"{hits1 / n:>6.3f} {hits5 / n:>6.3f} {reciprocal_ranks / n:>6.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark vectorstore chunking engines")
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS, help="Directory of documents")
+    parser.add_argument("--embedding", choices=["hash", "configured"], default="hash", help="Embedding to rank with")
+    args = parser.parse_args()
+
+    tokenizer = "estimate"
+    embed = hash_embedding
+    if args.embedding == "configured":
+        from vectorstore.tools import _get_embedding_function
+
+        embedding_function = _get_embedding_function()
+        tokenizer = tokenizer_spec(embedding_function)
+
+        def embed(texts: list[str]) -> np.ndarray:
+            vectors = np.asarray(
+                [
+                    vector
+                    for start in range(0, len(texts), 256)
+                    for vector in embedding_function(texts[start : start + 256])
+                ],
+                dtype=np.float32,
+            )
+            return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    paths = find_files(args.corpus, "**/*", exclude=["README.md"]) if args.corpus.is_dir() else []
+    if paths:
+        run(load_corpus(paths), embed, tokenizer)
+        return
+
+    print(f"No documents found in {args.corpus}, using a synthetic corpus", file=sys.stderr)
+    run(generate_corpus(), embed, tokenizer)
+
+
+if __name__ == "__main__":
+    main()
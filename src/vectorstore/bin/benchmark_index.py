@@ -0,0 +1,123 @@
+"""Benchmark vector index configurations on synthetic embeddings.
+
+Compares Chroma's HNSW index at several graph sizes and search depths with the int8 quantized
+scan (``quantization="int8"``, see vectorstore/quantization.py) and an exact float32 scan:
+
+- recall@k: share of the exact k nearest neighbors returned
+- latency: median and 95th percentile milliseconds per query
+- memory: bytes of the vector index on disk (HNSW graph and vectors, or int8 codes and scales)
+
+Usage:
+    uv run python bin/benchmark_index.py [--vectors 20000] [--dimensions 384] [--queries 200] [-k 10]
+
+Embeddings are drawn around random cluster centers and L2-normalized, so the benchmark needs no
+model or network. Collections use cosine distance like the default embedding model.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+from vectorstore.quantization import QuantizedIndex, distances
+
+# (label, HNSW configuration) of the collections compared, besides the quantized and exact scans
+CONFIGURATIONS = [
+    ("hnsw M=8 ef=20", {"max_neighbors": 8, "ef_construction": 64, "ef_search": 20}),
+    ("hnsw M=16 ef=100", {"max_neighbors": 16, "ef_construction": 100, "ef_search": 100}),
+    ("hnsw M=32 ef=200", {"max_neighbors": 32, "ef_construction": 200, "ef_search": 200}),
+]
+
+ADD_BATCH_SIZE = 5000
+
+
+def generate_vectors(count: int, dimensions: int, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Normalized vectors scattered around random cluster centers, like embeddings of related texts."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)] + 0.6 * rng.normal(size=(count, dimensions))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def measure(search, queries: np.ndarray, truth: list[set[str]], k: int) -> tuple[float, float, float]:
+    """Run search on each query, returning (recall@k, median ms, p95 ms)."""
+    latencies, found = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += len(expected.intersection(ids[:k]))
+    return found / (k * len(queries)), float(np.median(latencies)), float(np.percentile(latencies, 95))
+
+
+def run(count: int, dimensions: int, query_count: int, k: int) -> None:
+    """Index the synthetic vectors with every configuration and print a summary table."""
+    vectors = generate_vectors(count + query_count, dimensions)
+    vectors, queries = vectors[:count], vectors[count:]
+    ids = [f"v{i}" for i in range(count)]
+    exact = distances(vectors, queries, "cosine")
+    truth = [{ids[i] for i in np.argsort(row)[:k]} for row in exact]
+
+    print(f"{count} vectors, {dimensions} dimensions, {query_count} queries, recall@{k}")
+    print(f"{'index':<20} {'build s':>8} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7} {'memory MB':>10}")
+
+    def report(label: str, build: float, search, memory: int) -> None:
+        recall, p50, p95 = measure(search, queries, truth, k)
+        print(f"{label:<20} {build:>8.2f} {recall:>7.3f} {p50:>7.2f} {p95:>7.2f} {memory / 2**20:>10.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        chroma_path = Path(tmp) / "chroma"
+        client = chromadb.PersistentClient(path=str(chroma_path))
+        collection = None
+        for n, (label, hnsw) in enumerate(CONFIGURATIONS):
+            segments = set(chroma_path.iterdir())
+            start = time.perf_counter()
+            collection = client.create_collection(f"hnsw-{n}", configuration={"hnsw": {"space": "cosine", **hnsw}})
+            for offset in range(0, count, ADD_BATCH_SIZE):
+                collection.add(
+                    ids=ids[offset : offset + ADD_BATCH_SIZE], embeddings=vectors[offset : offset + ADD_BATCH_SIZE]
+                )
+            build = time.perf_counter() - start
+
+            def search(query: np.ndarray, collection=collection) -> list[str]:
+                return collection.query(query_embeddings=[query], n_results=k, include=[])["ids"][0]
+
+            # The HNSW index of the collection is the segment directory its creation added
+            memory = sum(directory_size(path) for path in set(chroma_path.iterdir()) - segments if path.is_dir())
+            report(label, build, search, memory)
+
+        index = QuantizedIndex("benchmark", "cosine", Path(tmp) / "quantized")
+        start = time.perf_counter()
+        index.build(collection)
+        build = time.perf_counter() - start
+
+        def quantized_search(query: np.ndarray) -> list[str]:
+            return index.query(collection, [query], k, include=["distances"])["ids"][0]
+
+        report("int8 scan + rerank", build, quantized_search, index.nbytes)
+
+        def exact_search(query: np.ndarray) -> list[str]:
+            return [ids[i] for i in np.argsort(distances(vectors, query[None, :], "cosine")[0])[:k]]
+
+        report("exact float32 scan", 0.0, exact_search, vectors.nbytes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark vectorstore index configurations")
+    parser.add_argument("--vectors", type=int, default=20000, help="Number of indexed vectors")
+    parser.add_argument("--dimensions", type=int, default=384, help="Vector dimensions")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("-k", type=int, default=10, help="Neighbors per query")
+    args = parser.parse_args()
+    run(args.vectors, args.dimensions, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""Chunking engines for the vectorstore server.
+
+A chunker turns the (page_index, text) pairs of a document into ``TextChunk`` objects:
+
+- ``fixed``: windows of chunk_size characters overlapping by chunk_overlap characters, per page.
+  Windows cut through words and sentences.
+- ``structure``: paragraphs and sentences packed into chunks of at most chunk_size tokens.
+  Chunks end at headings and, where possible, at paragraph boundaries. Paragraphs continue
+  across page breaks, and consecutive chunks of a section overlap by whole sentences of up to
+  chunk_overlap tokens.
+
+Token budgets use the tokenizer of the embedding model where it is available (tiktoken for
+OpenAI models, the Hugging Face tokenizer of the local ONNX model), otherwise an estimate of
+about 4 characters per token. Tokenizers are identified by a picklable spec string (see
+``tokenizer_spec``), so worker processes can load them too.
+"""
+
+import math
+import re
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+CHUNKERS = ("fixed", "structure")
+
+# Input limits of the embedding models, in tokens. Longer inputs are truncated, so "structure"
+# chunks are clamped to them. MiniLM's 256 positions include the [CLS] and [SEP] tokens.
+MAX_MODEL_TOKENS = {"hf": 254, "tiktoken": 8191}
+
+# Longest line (in characters and words) that can be a heading
+MAX_HEADING_CHARS = 80
+MAX_HEADING_WORDS = 12
+
+_MARKDOWN_HEADING = re.compile(r"#{1,6}\s+(\S.*)")
+_NUMBERED_HEADING = re.compile(r"(\d+(\.\d+)*\.?|[IVX]+\.|[A-Z]\.)\s+[A-Z]")
+_SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*(?=\s+[\"'“‘(\[]?[A-Z0-9])")
+_TERMINAL_PUNCTUATION = tuple(".!?:;\"'”’)")
+# Words ending with a period that rarely end a sentence
+_ABBREVIATIONS = frozenset(["dr", "mr", "mrs", "ms", "prof", "st", "vs", "fig", "no", "e.g", "i.e", "etc", "cf", "al"])
+
+# Tokenizer specs whose fallback to estimate_tokens was already reported
+_fallback_warned: set[str] = set()
+
+
+@dataclass
+class TextChunk:
+    """A chunk of document text and where it comes from."""
+
+    text: str
+    page: int  # 0-based index of the first page
+    page_end: int | None = None  # 0-based index of the last page, for chunkers that cross pages
+    section: str | None = None  # Heading of the enclosing section
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text (about 4 characters per token for BPE tokenizers)."""
+    return max(1, -(-len(text) // 4))
+
+
+# ======================================================
+# Tokenizers
+# ======================================================
+
+
+def tokenizer_spec(embedding_function: Any) -> str:
+    """
+    Identify the tokenizer of an embedding function's model.
+
+    Returns:
+        "tiktoken:<model>", "hf:<tokenizer.json path>" or "estimate"
+    """
+    # Unwrap CachedEmbeddingFunction
+    embedding_function = getattr(embedding_function, "embedding_function", embedding_function)
+    try:
+        name = embedding_function.name()
+    except (AttributeError, NotImplementedError, TypeError):
+        return "estimate"
+
+    if name == "openai":
+        return f"tiktoken:{embedding_function.model_name}"
+    if name in ("default", "onnx_mini_lm_l6_v2"):
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        return f"hf:{ONNXMiniLM_L6_V2.DOWNLOAD_PATH / ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME / 'tokenizer.json'}"
+    if name == "local":
+        # Same model as the default, downloaded to the configured model directory
+        path = embedding_function.DOWNLOAD_PATH / embedding_function.EXTRACTED_FOLDER_NAME / "tokenizer.json"
+        return f"hf:{path}"
+    return "estimate"
+
+
+def max_chunk_tokens(spec: str) -> int | None:
+    """Input limit in tokens of the model whose tokenizer spec is given, None if unknown."""
+    return MAX_MODEL_TOKENS.get(spec.partition(":")[0])
+
+
+@lru_cache(maxsize=8)
+def _load_tokenizer(spec: str) -> Callable[[str], int]:
+    """
+    Load the tokenizer identified by spec.
+
+    Failures are not cached: the MiniLM tokenizer.json is only downloaded by the first embedding.
+
+    Raises:
+        ValueError: If spec is not a tokenizer spec
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "tiktoken":
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(argument)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode_ordinary(text))
+
+    if kind == "hf":
+        from tokenizers import Tokenizer
+
+        if not Path(argument).is_file():
+            raise FileNotFoundError(f"No such file: '{argument}'")
+        tokenizer = Tokenizer.from_file(argument)
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    raise ValueError(f"Unknown tokenizer spec '{spec}'")
+
+
+def token_counter(spec: str = "estimate") -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text with the tokenizer identified by spec.
+
+    Falls back to estimate_tokens if the tokenizer cannot be loaded (tiktoken encoding or model
+    files not downloaded), with a warning the first time for each spec.
+    """
+    if spec == "estimate":
+        return estimate_tokens
+    try:
+        return _load_tokenizer(spec)
+    except (ImportError, OSError, ValueError) as e:
+        if spec not in _fallback_warned:
+            _fallback_warned.add(spec)
+            print(f"Warning: Could not load tokenizer '{spec}' ({e}), estimating token counts", file=sys.stderr)
+    return estimate_tokens
+
+
+# ======================================================
+# Chunkers
+# ======================================================
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> list[str]:
+    """Split text into overlapping chunks."""
+    if not text.strip():
+        return []
+
+    chunks = []
+    start = 0
+    text_len = len(text)
+
+    while start < text_len:
+        end = start + chunk_size
+        chunk = text[start:end]
+
+        if chunk.strip():
+            chunks.append(chunk.strip())
+
+        start = end - chunk_overlap
+        if start >= text_len:
+            break
+
+    return chunks
+
+
+def chunk_fixed(
+    pages: Iterable[tuple[int, str]], chunk_size: int, chunk_overlap: int, count_tokens: Callable[[str], int]
+) -> Iterator[TextChunk]:
+    """Character windows of chunk_size overlapping by chunk_overlap characters, per page."""
+    for page, text in pages:
+        for chunk in chunk_text(text, chunk_size, chunk_overlap):
+            yield TextChunk(chunk, page)
+
+
+def chunk_structure(
+    pages: Iterable[tuple[int, str]], chunk_size: int, chunk_overlap: int, count_tokens: Callable[[str], int]
+) -> Iterator[TextChunk]:
+    """Paragraphs and sentences packed into chunks of at most chunk_size tokens."""
+    packer = _Packer(chunk_size, chunk_overlap, count_tokens)
+    for kind, text, first, last in _blocks(pages):
+        if kind == "heading":
+            yield from packer.start_section(text, first)
+        else:
+            yield from packer.add_paragraph(text, first, last)
+    yield from packer.flush(overlap=False)
+
+
+_CHUNKERS = {"fixed": chunk_fixed, "structure": chunk_structure}
+
+
+def chunk_pages(
+    pages: Iterable[tuple[int, str]],
+    chunk_size: int,
+    chunk_overlap: int,
+    chunker: str = "fixed",
+    tokenizer: str = "estimate",
+) -> Iterator[TextChunk]:
+    """
+    Chunk the pages of a document.
+
+    Args:
+        pages: (page_index, text) in page order, consumed lazily
+        chunk_size: Maximum chunk size, in characters for "fixed" and tokens for "structure".
+            "structure" chunks are clamped to the input limit of the model (see max_chunk_tokens).
+        chunk_overlap: Overlap between consecutive chunks, in the same unit as chunk_size,
+            scaled down with chunk_size when it is clamped
+        chunker: Chunking engine, one of CHUNKERS
+        tokenizer: Tokenizer spec for token budgets (see tokenizer_spec)
+
+    Raises:
+        ValueError: If chunker is unknown
+    """
+    if chunker not in _CHUNKERS:
+        raise ValueError(f"Invalid chunker '{chunker}'. Must be one of: {', '.join(CHUNKERS)}")
+    limit = max_chunk_tokens(tokenizer)
+    if chunker == "structure" and limit is not None and chunk_size > limit:
+        chunk_overlap = chunk_overlap * limit // chunk_size
+        chunk_size = limit
+    return _CHUNKERS[chunker](pages, chunk_size, chunk_overlap, token_counter(tokenizer))
+
+
+# ======================================================
+# Structure Parsing
+# ======================================================
+
+
+def is_heading(line: str) -> bool:
+    """Whether a line looks like a heading: markdown, numbered or all-caps, short and unpunctuated."""
+    if _MARKDOWN_HEADING.fullmatch(line):
+        return True
+    if len(line) > MAX_HEADING_CHARS or len(line.split()) > MAX_HEADING_WORDS:
+        return False
+    if line.endswith((*_TERMINAL_PUNCTUATION, ",")):
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split a paragraph into sentences at terminal punctuation followed by a capitalized word."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        words = text[start : match.start()].split()
+        if match.group().startswith(".") and words and words[-1].lower().lstrip("(") in _ABBREVIATIONS:
+            continue
+        sentences.append(text[start : match.end()].strip())
+        start = match.end()
+    sentences.append(text[start:].strip())
+    return [sentence for sentence in sentences if sentence]
+
+
+def _join_lines(lines: list[str]) -> str:
+    """Join the lines of a paragraph, undoing end-of-line hyphenation."""
+    text = ""
+    for line in lines:
+        if text.endswith("-") and line[:1].islower():
+            text = text[:-1] + line
+        else:
+            text = f"{text} {line}" if text else line
+    return text
+
+
+def _blocks(pages: Iterable[tuple[int, str]]) -> Iterator[tuple[str, str, int, int]]:
+    """
+    Yield ("heading" | "paragraph", text, first_page, last_page) blocks of a document.
+
+    Paragraphs end at blank lines and headings. A paragraph that does not end with terminal
+    punctuation at the end of a page continues on the next page.
+    """
+    lines: list[str] = []
+    first = last = 0
+
+    def paragraph() -> Iterator[tuple[str, str, int, int]]:
+        if lines:
+            yield "paragraph", _join_lines(lines), first, last
+            lines.clear()
+
+    for page, text in pages:
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if not line:
+                yield from paragraph()
+            elif is_heading(line):
+                yield from paragraph()
+                match = _MARKDOWN_HEADING.fullmatch(line)
+                yield "heading", match.group(1) if match else line, page, page
+            else:
+                if not lines:
+                    first = page
+                lines.append(line)
+                last = page
+        if lines and lines[-1].endswith(_TERMINAL_PUNCTUATION):
+            yield from paragraph()
+    yield from paragraph()
+
+
+@dataclass
+class _Sentence:
+    text: str
+    tokens: int
+    first: int
+    last: int
+
+
+class _Packer:
+    """Packs sentences into chunks within a token budget."""
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, count_tokens: Callable[[str], int]):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._count_tokens = count_tokens
+        self.section: str | None = None
+        self.heading: _Sentence | None = None
+        self.paragraphs: list[list[_Sentence]] = []
+        self.tokens = 0
+        # Whether the chunk has text that is not carried over from the previous chunk
+        self.fresh = False
+
+    def count_tokens(self, text: str) -> int:
+        # One more for the space or line break joining the text to the rest of the chunk, so
+        # the sum over the parts of a chunk does not undercount the whole
+        return self._count_tokens(text) + 1
+
+    def start_section(self, heading: str, page: int) -> Iterator[TextChunk]:
+        yield from self.flush(overlap=False)
+        self.section = heading
+        self.heading = _Sentence(heading, self.count_tokens(heading), page, page)
+        self.tokens = self.heading.tokens
+
+    def add_paragraph(self, text: str, first: int, last: int) -> Iterator[TextChunk]:
+        tokens = self.count_tokens(text)
+        if self.tokens + tokens > self.chunk_size:
+            yield from self._make_room(tokens)
+        if self.tokens + tokens <= self.chunk_size:
+            self._append(_Sentence(text, tokens, first, last), new_paragraph=True)
+            return
+
+        # Too long for one chunk: pack sentence by sentence, continuing the paragraph after
+        # the sentences carried over into the next chunk
+        new_paragraph = True
+        for sentence in self._sentences(text, first, last):
+            if self.tokens + sentence.tokens > self.chunk_size:
+                yield from self._make_room(sentence.tokens)
+                new_paragraph = False
+            self._append(sentence, new_paragraph)
+            new_paragraph = False
+
+    def flush(self, overlap: bool) -> Iterator[TextChunk]:
+        """Emit the current chunk and start the next one, seeded with overlap sentences if overlap."""
+        if not self.fresh:
+            if not overlap:
+                self._reset()
+            return
+
+        sentences = [sentence for paragraph in self.paragraphs for sentence in paragraph]
+        parts = [" ".join(sentence.text for sentence in paragraph) for paragraph in self.paragraphs]
+        if self.heading is not None:
+            sentences.insert(0, self.heading)
+            parts.insert(0, self.heading.text)
+        yield TextChunk(
+            "\n\n".join(parts),
+            page=min(sentence.first for sentence in sentences),
+            page_end=max(sentence.last for sentence in sentences),
+            section=self.section,
+        )
+
+        carried: list[_Sentence] = []
+        if overlap:
+            tokens = 0
+            for sentence in reversed(self.paragraphs[-1]):
+                tokens += sentence.tokens
+                if tokens > self.chunk_overlap:
+                    break
+                carried.insert(0, sentence)
+        self._reset()
+        if carried:
+            self.paragraphs = [carried]
+            self.tokens = sum(sentence.tokens for sentence in carried)
+
+    def _make_room(self, tokens: int) -> Iterator[TextChunk]:
+        """Emit the current chunk, dropping the overlap if tokens still do not fit after it."""
+        if self.fresh:
+            yield from self.flush(overlap=True)
+        if self.tokens + tokens > self.chunk_size and not self.fresh:
+            self.paragraphs = []
+            self.tokens = self.heading.tokens if self.heading is not None else 0
+
+    def _append(self, sentence: _Sentence, new_paragraph: bool):
+        if new_paragraph or not self.paragraphs:
+            self.paragraphs.append([])
+        self.paragraphs[-1].append(sentence)
+        self.tokens += sentence.tokens
+        self.fresh = True
+
+    def _reset(self):
+        self.heading = None
+        self.paragraphs = []
+        self.tokens = 0
+        self.fresh = False
+
+    def _sentences(self, text: str, first: int, last: int) -> Iterator[_Sentence]:
+        """Sentences of a paragraph, with sentences over the budget split into word windows."""
+        for sentence in split_sentences(text):
+            tokens = self.count_tokens(sentence)
+            if tokens <= self.chunk_size:
+                yield _Sentence(sentence, tokens, first, last)
+                continue
+            words = sentence.split()
+            size = math.ceil(len(words) / math.ceil(tokens / self.chunk_size))
+            for start in range(0, len(words), size):
+                piece = " ".join(words[start : start + size])
+                yield _Sentence(piece, self.count_tokens(piece), first, last)
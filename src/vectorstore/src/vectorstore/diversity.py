@@ -0,0 +1,124 @@
+"""Result diversification for the vectorstore server.
+
+Top-k results of chunked documents are often near-duplicates: overlapping chunks, or the same
+passage ingested from several files. ``diversify`` re-ranks query results that were fetched
+MMR_CANDIDATE_FACTOR times deeper than requested:
+
+- maximal marginal relevance (MMR): results are picked greedily by
+  (1 - diversity) * relevance - diversity * (highest cosine similarity to a picked result),
+  with similarities computed on the stored embeddings. Relevance is the cosine similarity to
+  the query for vector search, and the score relative to the best one for lexical and hybrid
+  search
+- cross-query dedup: for multi-query calls, a document returned for one query is not returned
+  for later ones, and with MMR the results of earlier queries count as picked for later ones
+"""
+
+from typing import Any
+
+import numpy as np
+
+from core import get_env_int
+
+# Configuration constants (configurable via environment variables)
+MMR_CANDIDATE_FACTOR = get_env_int("VECTORSTORE_MMR_CANDIDATE_FACTOR", 4, min_value=1)  # Default: 4x n_results
+
+# Per-query fields of query results
+RESULT_FIELDS = ("ids", "documents", "metadatas", "distances", "embeddings", "uris", "data", "scores")
+
+
+def _relevance(
+    result: dict[str, Any], query: int, candidates: list[int], embeddings: np.ndarray, query_embedding: Any
+) -> np.ndarray:
+    """Relevance of a query's candidates, higher is better, on the scale of cosine similarity."""
+    if "scores" not in result:
+        return embeddings @ _normalized([query_embedding])[0]
+    scores = np.asarray(result["scores"][query], dtype=np.float64)
+    best = scores.max() if len(scores) else 0.0
+    return scores[candidates] / best if best > 0 else scores[candidates]
+
+
+def _normalized(embeddings: Any) -> np.ndarray:
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def mmr(
+    relevance: np.ndarray,
+    embeddings: np.ndarray,
+    n_results: int,
+    diversity: float,
+    picked: np.ndarray | None = None,
+) -> list[int]:
+    """
+    Pick results by maximal marginal relevance.
+
+    Args:
+        relevance: Relevance of each candidate, higher is better
+        embeddings: L2-normalized embeddings of the candidates (rows)
+        n_results: Number of results to pick
+        diversity: Weight of the similarity penalty, from 0 (relevance order) to 1
+        picked: L2-normalized embeddings of results picked before (e.g. for other queries)
+
+    Returns:
+        Indexes of the picked candidates, in pick order
+    """
+    count = len(relevance)
+    if not count:
+        return []
+    redundancy = np.zeros(count)
+    if picked is not None and len(picked):
+        redundancy = (embeddings @ picked.T).max(axis=1)
+    similarity = embeddings @ embeddings.T
+    available = np.ones(count, dtype=bool)
+    order: list[int] = []
+    for _ in range(min(n_results, count)):
+        scores = np.where(available, (1.0 - diversity) * relevance - diversity * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        order.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return order
+
+
+def diversify(
+    result: dict[str, Any],
+    n_results: int,
+    diversity: float,
+    dedup: bool,
+    query_embeddings: list[Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Re-rank query results by MMR and/or drop documents already returned for an earlier query.
+
+    Args:
+        result: Chroma-shaped query results, with "embeddings" if diversity > 0
+        n_results: Number of results to keep per query
+        diversity: MMR weight of the similarity penalty (0 keeps the relevance order)
+        dedup: If True, documents are returned for the first query that ranks them only
+        query_embeddings: Embeddings of the queries, for the relevance of results without "scores"
+
+    Returns:
+        Results in the same shape, with at most n_results per query
+    """
+    fields = [field for field in RESULT_FIELDS if result.get(field) is not None]
+    output: dict[str, Any] = {field: [] for field in fields}
+    seen: set[str] = set()
+    picked: list[np.ndarray] = []
+    for query, ids in enumerate(result["ids"]):
+        candidates = [i for i, id_ in enumerate(ids) if not (dedup and id_ in seen)]
+        if diversity > 0 and candidates:
+            embeddings = _normalized([result["embeddings"][query][i] for i in candidates])
+            query_embedding = query_embeddings[query] if query_embeddings is not None else None
+            relevance = _relevance(result, query, candidates, embeddings, query_embedding)
+            previous = np.vstack(picked) if picked else None
+            positions = mmr(relevance, embeddings, n_results, diversity, previous)
+            chosen = [candidates[position] for position in positions]
+            if dedup:
+                picked.append(embeddings[positions])
+        else:
+            chosen = candidates[:n_results]
+        seen.update(ids[i] for i in chosen)
+        for field in fields:
+            row = result[field][query]
+            output[field].append([row[i] for i in chosen])
+    return {**result, **output}
@@ -0,0 +1,186 @@
+"""Persistent embedding cache for the vectorstore server.
+
+Embeddings are stored in a SQLite database in the shared workspace, keyed by the embedding
+model (the embedding function's name and configuration) and the SHA-256 of the normalized
+text. ``CachedEmbeddingFunction`` wraps the configured embedding function, so re-ingesting
+a changed document or upserting unchanged text only embeds the text that is not cached yet.
+
+The cache is bounded by total vector size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+import unicodedata
+from functools import lru_cache
+from threading import Lock
+from typing import Any
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from core import WORKSPACE, SqliteCache, get_env_int, get_workspace_file
+
+# Configuration constants (configurable via environment variables)
+MAX_CACHE_BYTES = get_env_int("VECTORSTORE_EMBEDDING_CACHE_MAX_BYTES", 1024 * 1024 * 1024)  # Default: 1GB, 0 disables
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of text after Unicode (NFC) and whitespace normalization."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def model_key(embedding_function: Any) -> str:
+    """Identify the model of an embedding function by its name and configuration."""
+    name = embedding_function.name()
+    config = embedding_function.get_config()
+    if name is NotImplemented or config is NotImplemented:
+        # Legacy embedding functions without a config, fall back to the class
+        return type(embedding_function).__qualname__
+    return f"{name}:{json.dumps(config, sort_keys=True, default=str)}"
+
+
+class EmbeddingCache(SqliteCache):
+    """Manages cached embeddings in a persistent SQLite database."""
+
+    TABLE = "embedding_cache"
+    KEY_COLUMNS = (("model", "TEXT"), ("text_hash", "TEXT"))
+    VALUE_COLUMN = "vector"
+
+    def __init__(self, db_path: str | None = None, max_bytes: int = MAX_CACHE_BYTES):
+        """Initialize the cache database.
+
+        Args:
+            db_path: Path to the database file. Defaults to ~/.mcp-servers/workspace/vectorstore_embedding_cache.db
+            max_bytes: Maximum total size of cached vectors. 0 disables the cache.
+
+        Raises:
+            OSError: If workspace directory cannot be created
+        """
+        if db_path is None:
+            db_path = str(get_workspace_file(WORKSPACE, "vectorstore_embedding_cache.db"))
+        super().__init__(db_path, max_bytes)
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, np.ndarray]:
+        """Look up cached embeddings.
+
+        Args:
+            model: Model key (see model_key)
+            hashes: Text hashes to look up (see text_hash)
+
+        Returns:
+            Mapping of text hash to float32 vector for the hashes found
+        """
+        found = self._get_many((model,), hashes)
+        return {hash_: np.frombuffer(vector, dtype=np.float32) for hash_, vector in found.items()}
+
+    def put_many(self, model: str, vectors: dict[str, Any]):
+        """Store embeddings and evict least recently used entries over the size limit.
+
+        Args:
+            model: Model key (see model_key)
+            vectors: Mapping of text hash to vector
+        """
+        if not self.enabled:
+            return
+        encoded = {hash_: np.asarray(vector, dtype=np.float32).tobytes() for hash_, vector in vectors.items()}
+        self._put_many((model,), encoded)
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Embedding function that reuses cached vectors and only embeds uncached text.
+
+    Reports the name and configuration of the wrapped function, so collections created
+    through the wrapper stay compatible with the unwrapped function and vice versa.
+    Queries are embedded by the wrapped function's embed_query, uncached.
+
+    Chroma calls name() on the class of an embedding function too (to register it under that
+    name), so each wrapped class gets a subclass whose name() is the wrapped function's, and
+    functions Chroma rebuilds from a collection's configuration are cached as well.
+    """
+
+    _wrapped_class: type[EmbeddingFunction] | None = None
+
+    def __new__(cls, embedding_function: EmbeddingFunction, cache: "EmbeddingCache | None" = None):
+        if cls._wrapped_class is None:
+            cls = _cached_class(type(embedding_function), embedding_function.name())
+        return super().__new__(cls)
+
+    def __init__(self, embedding_function: EmbeddingFunction, cache: "EmbeddingCache | None" = None):
+        self.embedding_function = embedding_function
+        self._cache = cache
+        self.model = model_key(embedding_function)
+
+    @classmethod
+    def build_from_config(cls, config: dict[str, Any]) -> "CachedEmbeddingFunction":
+        return cls(cls._wrapped_class.build_from_config(config))
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache or get_embedding_cache()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        hashes = [text_hash(text) for text in input]
+        cached = self.cache.get_many(self.model, list(dict.fromkeys(hashes)))
+
+        # Embed each uncached text once, even if it occurs several times in the input
+        missing = {hash_: text for hash_, text in zip(hashes, input) if hash_ not in cached}
+        if missing:
+            vectors = self.embedding_function(list(missing.values()))
+            embedded = {hash_: np.asarray(vector, dtype=np.float32) for hash_, vector in zip(missing, vectors)}
+            self.cache.put_many(self.model, embedded)
+            cached.update(embedded)
+
+        return [cached[hash_] for hash_ in hashes]
+
+    def embed_query(self, input: Documents) -> Embeddings:
+        return self.embedding_function.embed_query(input=input)
+
+    def get_config(self) -> dict[str, Any]:
+        return self.embedding_function.get_config()
+
+    def validate_config(self, config: dict[str, Any]):
+        self.embedding_function.validate_config(config)
+
+    def validate_config_update(self, old_config: dict[str, Any], new_config: dict[str, Any]):
+        self.embedding_function.validate_config_update(old_config, new_config)
+
+    def default_space(self):
+        return self.embedding_function.default_space()
+
+    def supported_spaces(self):
+        return self.embedding_function.supported_spaces()
+
+    def is_legacy(self) -> bool:
+        return self.embedding_function.is_legacy()
+
+
+@lru_cache(maxsize=None)
+def _cached_class(wrapped_class: type[EmbeddingFunction], name: str) -> type[CachedEmbeddingFunction]:
+    """Subclass of CachedEmbeddingFunction wrapping instances of wrapped_class named name."""
+    return type(
+        f"Cached{wrapped_class.__name__}",
+        (CachedEmbeddingFunction,),
+        {"_wrapped_class": wrapped_class, "name": staticmethod(lambda: name)},
+    )
+
+
+# Global instance with thread-safe initialization
+_embedding_cache: EmbeddingCache | None = None
+_lock = Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the global embedding cache instance.
+
+    Thread-safe singleton pattern using double-checked locking.
+
+    Returns:
+        EmbeddingCache: The global embedding cache instance
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -0,0 +1,101 @@
+"""Response encoding for the vectorstore server.
+
+``get_documents`` and ``query`` return Chroma results as JSON. Results with embeddings are
+dominated by float arrays, so responses can be made smaller and faster to produce:
+
+- output format ``"compact"``: JSON without indentation or spaces, serialized by orjson when
+  it is installed (it serializes numpy arrays natively) and by the json module otherwise
+- embedding encoding ``"float32"`` or ``"float16"``: each embedding matrix is sent as one
+  base64 buffer of little-endian floats, ``{"dtype", "shape", "data"}``, instead of a list of
+  decimal numbers. float16 halves the size again at about 3 significant digits, enough for
+  similarity. ``decode_embeddings`` turns a buffer back into an array
+- metadata keys: only the listed keys of each metadata are returned
+"""
+
+import base64
+import json
+from typing import Any
+
+import numpy as np
+
+OUTPUT_FORMATS = ("json", "compact")
+EMBEDDING_ENCODINGS = ("list", "float32", "float16")
+
+
+def _default(value: Any) -> Any:
+    """Serialize the numpy values of Chroma results (embeddings are ndarrays)."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_embeddings(embeddings: Any, dtype: str) -> dict[str, Any]:
+    """
+    Encode a matrix of embeddings (one row per document) as a base64 buffer.
+
+    Args:
+        embeddings: Embeddings as an array or a list of vectors
+        dtype: "float32" or "float16"
+
+    Returns:
+        {"dtype": dtype, "shape": [rows, dimensions], "data": base64 of the little-endian values}
+    """
+    matrix = np.asarray(embeddings, dtype=np.dtype(dtype).newbyteorder("<"))
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1 if len(matrix) else 0)
+    return {"dtype": dtype, "shape": list(matrix.shape), "data": base64.b64encode(matrix.tobytes()).decode("ascii")}
+
+
+def decode_embeddings(encoded: dict[str, Any]) -> np.ndarray:
+    """Decode an embedding buffer made by encode_embeddings into a float32 array."""
+    values = np.frombuffer(base64.b64decode(encoded["data"]), dtype=np.dtype(encoded["dtype"]).newbyteorder("<"))
+    return values.reshape(encoded["shape"]).astype(np.float32)
+
+
+def _project(metadata: dict[str, Any] | None, keys: list[str]) -> dict[str, Any] | None:
+    if metadata is None:
+        return None
+    return {key: metadata[key] for key in keys if key in metadata}
+
+
+def encode_result(
+    result: dict[str, Any],
+    output_format: str = "json",
+    embedding_encoding: str = "list",
+    metadata_keys: list[str] | None = None,
+    per_query: bool = False,
+) -> str:
+    """
+    Serialize a Chroma get or query result.
+
+    Args:
+        result: Result of get (one list per field) or query (one list per query and field)
+        output_format: "json" (indented) or "compact"
+        embedding_encoding: "list" (JSON numbers), "float32" or "float16" (base64 buffers)
+        metadata_keys: If given, only these keys of each metadata are returned
+        per_query: True for query results, whose fields hold one list per query
+
+    Returns:
+        The result as a JSON string
+    """
+    result = dict(result)
+    if metadata_keys is not None and result.get("metadatas") is not None:
+        if per_query:
+            result["metadatas"] = [[_project(m, metadata_keys) for m in row] for row in result["metadatas"]]
+        else:
+            result["metadatas"] = [_project(m, metadata_keys) for m in result["metadatas"]]
+    if embedding_encoding != "list" and result.get("embeddings") is not None:
+        if per_query:
+            result["embeddings"] = [encode_embeddings(row, embedding_encoding) for row in result["embeddings"]]
+        else:
+            result["embeddings"] = encode_embeddings(result["embeddings"], embedding_encoding)
+
+    if output_format == "json":
+        return json.dumps(result, indent=2, default=_default)
+    try:
+        import orjson
+    except ImportError:
+        return json.dumps(result, separators=(",", ":"), default=_default)
+    return orjson.dumps(result, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
@@ -0,0 +1,523 @@
+"""Pipelined document ingestion for the vectorstore server.
+
+Ingestion runs as a pipeline instead of extract-everything-then-add-once:
+
+1. Page text is extracted in windows, on a process pool for large PDFs.
+2. Chunks are grouped into batches bounded by an estimated token budget.
+3. Batches are embedded concurrently on a thread pool, retrying rate-limited and transient
+   failures with exponential backoff.
+4. Each embedded batch is added to the collection as soon as it (and every batch before it)
+   is ready, with the precomputed embeddings so Chroma does not embed again.
+
+At most EMBED_CONCURRENCY batches are in flight, so memory stays bounded by the batch budget
+rather than the size of the document.
+
+Every chunk stores a hash of its text and metadata (CHUNK_HASH_KEY). ``sync_chunks`` compares
+it with the stored chunks of a document to upsert only changed chunks and delete the ones that
+disappeared, so re-ingesting a document costs O(changes) embeddings and writes.
+
+Directories are ingested by extracting and chunking whole files on a process pool
+(``extract_file_chunks``), writing in large batches (``BufferedWriter``) and recording completed
+files in an ``IngestManifest``, so an interrupted run resumes where it stopped.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any
+
+import openai
+import pymupdf
+
+from core import WORKSPACE, get_env_int, get_workspace_file, process_pool
+
+from .chunking import chunk_pages, estimate_tokens
+
+# Configuration constants (configurable via environment variables)
+EMBED_BATCH_TOKENS = get_env_int("VECTORSTORE_EMBED_BATCH_TOKENS", 8192, min_value=1)  # Default: 8192 per request
+EMBED_CONCURRENCY = get_env_int("VECTORSTORE_EMBED_CONCURRENCY", 4, min_value=1)  # Default: 4 requests in flight
+EMBED_MAX_RETRIES = get_env_int("VECTORSTORE_EMBED_MAX_RETRIES", 5)  # Default: 5 retries per batch
+EXTRACT_WORKERS = get_env_int("VECTORSTORE_EXTRACT_WORKERS", min(4, os.cpu_count() or 1), min_value=1)
+WRITE_BATCH_SIZE = get_env_int("VECTORSTORE_WRITE_BATCH_SIZE", 1024, min_value=1)  # Default: 1024 chunks per write
+
+# Pages per extraction task, and the page count above which extraction uses the process pool
+EXTRACT_WINDOW = 32
+MAX_BATCH_SIZE = 2048  # Inputs per embedding request (OpenAI limit)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Metadata key of the chunk content hash
+CHUNK_HASH_KEY = "chunk_hash"
+
+# File types ingested from directories
+PDF_SUFFIXES = (".pdf",)
+TEXT_SUFFIXES = (".txt", ".md")
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+@dataclass
+class Chunk:
+    """A chunk of text ready to be embedded and stored."""
+
+    id: str
+    text: str
+    metadata: dict[str, Any]
+
+
+def chunk_hash(text: str, metadata: dict[str, Any]) -> str:
+    """SHA-256 of a chunk's text and metadata (without the hash itself)."""
+    metadata = {key: value for key, value in metadata.items() if key != CHUNK_HASH_KEY}
+    return hashlib.sha256(json.dumps([text, metadata], sort_keys=True).encode()).hexdigest()
+
+
+def document_chunks(
+    source: str,
+    pages: Iterable[tuple[int, str, int]],
+    chunk_size: int,
+    chunk_overlap: int,
+    chunker: str = "fixed",
+    tokenizer: str = "estimate",
+) -> Iterator[Chunk]:
+    """
+    Chunk a document, with ids "{source}:p{page}:c{index}" and hashed metadata.
+
+    Args:
+        source: Source name of the document, stored as "source" metadata
+        pages: (page_index, text, total_pages) in page order, consumed lazily
+        chunk_size: Maximum chunk size (see chunking.chunk_pages)
+        chunk_overlap: Overlap between consecutive chunks
+        chunker: Chunking engine, one of chunking.CHUNKERS
+        tokenizer: Tokenizer spec for token budgets (see chunking.tokenizer_spec)
+    """
+    total_pages = 0
+
+    def page_texts() -> Iterator[tuple[int, str]]:
+        nonlocal total_pages
+        for page, text, total_pages in pages:
+            yield page, text
+
+    # Chunk indices count from 0 on the first page of each chunk
+    chunk_indices: dict[int, int] = {}
+    for text_chunk in chunk_pages(page_texts(), chunk_size, chunk_overlap, chunker, tokenizer):
+        chunk_idx = chunk_indices.get(text_chunk.page, 0)
+        chunk_indices[text_chunk.page] = chunk_idx + 1
+        metadata: dict[str, Any] = {
+            "source": source,
+            "page": text_chunk.page + 1,
+            "chunk_index": chunk_idx,
+            "total_pages": total_pages,
+        }
+        if text_chunk.page_end is not None:
+            metadata["page_end"] = text_chunk.page_end + 1
+        if text_chunk.section:
+            metadata["section"] = text_chunk.section
+        metadata[CHUNK_HASH_KEY] = chunk_hash(text_chunk.text, metadata)
+        yield Chunk(f"{source}:p{text_chunk.page + 1}:c{chunk_idx}", text_chunk.text, metadata)
+
+
+# ======================================================
+# Extraction
+# ======================================================
+
+
+def extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Extract the text of pages [start, stop) of a PDF. Runs in worker processes."""
+    with pymupdf.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, len(doc)))]
+
+
+def iter_pdf_pages(path: Path, workers: int | None = None) -> Iterator[tuple[int, str, int]]:
+    """
+    Yield (page_index, text, total_pages) for every page of a PDF, in page order.
+
+    Small documents are extracted in-process. Larger ones are extracted in windows of
+    EXTRACT_WINDOW pages on a process pool of workers (default: EXTRACT_WORKERS) processes,
+    with at most 2 * workers windows pending.
+    """
+    workers = workers or EXTRACT_WORKERS
+    with pymupdf.open(str(path)) as doc:
+        total_pages = len(doc)
+        if workers <= 1 or total_pages <= EXTRACT_WINDOW:
+            for i in range(total_pages):
+                yield i, doc[i].get_text(), total_pages
+            return
+
+    def drain(window_start: int, future: Future) -> Iterator[tuple[int, str, int]]:
+        for offset, text in enumerate(future.result()):
+            yield window_start + offset, text, total_pages
+
+    with process_pool(workers) as pool:
+        pending: deque[tuple[int, Future]] = deque()
+        for start in range(0, total_pages, EXTRACT_WINDOW):
+            pending.append((start, pool.submit(extract_page_range, str(path), start, start + EXTRACT_WINDOW)))
+            if len(pending) >= 2 * workers:
+                yield from drain(*pending.popleft())
+        while pending:
+            yield from drain(*pending.popleft())
+
+
+def extract_file_chunks(
+    path: str,
+    source: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    chunker: str = "fixed",
+    tokenizer: str = "estimate",
+) -> list[Chunk]:
+    """
+    Extract and chunk a PDF or text file. Runs in worker processes.
+
+    Text files are treated as a single page.
+    """
+    if path.lower().endswith(PDF_SUFFIXES):
+        with pymupdf.open(path) as doc:
+            total_pages = len(doc)
+            pages = ((i, doc[i].get_text(), total_pages) for i in range(total_pages))
+            return list(document_chunks(source, pages, chunk_size, chunk_overlap, chunker, tokenizer))
+
+    text = Path(path).read_text(encoding="utf-8", errors="replace")
+    return list(document_chunks(source, [(0, text, 1)], chunk_size, chunk_overlap, chunker, tokenizer))
+
+
+# ======================================================
+# Batching and Embedding
+# ======================================================
+
+
+def batch_chunks(chunks: Iterable[Chunk], max_tokens: int) -> Iterator[list[Chunk]]:
+    """Group chunks into batches whose estimated token count stays within max_tokens."""
+    batch: list[Chunk] = []
+    tokens = 0
+    for chunk in chunks:
+        chunk_tokens = estimate_tokens(chunk.text)
+        if batch and (tokens + chunk_tokens > max_tokens or len(batch) >= MAX_BATCH_SIZE):
+            yield batch
+            batch, tokens = [], 0
+        batch.append(chunk)
+        tokens += chunk_tokens
+    if batch:
+        yield batch
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds to wait from a Retry-After response header, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def embed_with_retry(
+    embedding_function: Callable[[list[str]], Any],
+    texts: list[str],
+    max_retries: int | None = None,
+) -> list:
+    """
+    Embed texts, retrying rate-limited and transient failures with exponential backoff.
+
+    The Retry-After header of rate-limit responses is honored when present.
+    """
+    max_retries = EMBED_MAX_RETRIES if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        try:
+            return list(embedding_function(texts))
+        except _RETRYABLE_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            delay = _retry_after(e) or min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+            time.sleep(delay * random.uniform(1.0, 1.25))
+            attempt += 1
+
+
+def ingest_chunks(
+    write: Callable[..., None],
+    embedding_function: Callable[[list[str]], Any],
+    chunks: Iterable[Chunk],
+    max_tokens: int | None = None,
+    concurrency: int | None = None,
+) -> int:
+    """
+    Embed chunks in concurrent batches and write each batch as soon as it is ready.
+
+    Batches are written in order, from the calling thread.
+
+    Args:
+        write: Collection write method (e.g., coll.add or coll.upsert)
+        embedding_function: Embedding function to call on each batch of texts
+        chunks: Chunks to ingest, consumed lazily
+        max_tokens: Estimated token budget per embedding request (default: EMBED_BATCH_TOKENS)
+        concurrency: Maximum number of embedding requests in flight (default: EMBED_CONCURRENCY)
+
+    Returns:
+        Number of chunks written
+    """
+    max_tokens = max_tokens or EMBED_BATCH_TOKENS
+    concurrency = concurrency or EMBED_CONCURRENCY
+    written = 0
+
+    def flush(batch: list[Chunk], future: Future):
+        nonlocal written
+        write(
+            ids=[chunk.id for chunk in batch],
+            documents=[chunk.text for chunk in batch],
+            metadatas=[chunk.metadata for chunk in batch],
+            embeddings=future.result(),
+        )
+        written += len(batch)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed") as pool:
+        pending: deque[tuple[list[Chunk], Future]] = deque()
+        try:
+            for batch in batch_chunks(chunks, max_tokens):
+                pending.append((batch, pool.submit(embed_with_retry, embedding_function, [c.text for c in batch])))
+                if len(pending) >= concurrency:
+                    flush(*pending.popleft())
+            while pending:
+                flush(*pending.popleft())
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    return written
+
+
+def sync_chunks(
+    collection: Any,
+    embedding_function: Callable[[list[str]], Any],
+    chunks: Iterable[Chunk],
+    where: dict[str, Any],
+) -> tuple[int, int, int]:
+    """
+    Bring the stored chunks of a document in line with chunks, embedding only what changed.
+
+    Chunks whose id is stored with the same CHUNK_HASH_KEY are skipped, new and changed chunks
+    are upserted, and stored chunks matching where that are no longer produced are deleted.
+
+    Args:
+        collection: Chroma collection
+        embedding_function: Embedding function to call on each batch of texts
+        chunks: Current chunks of the document, with CHUNK_HASH_KEY in their metadata
+        where: Metadata filter selecting the stored chunks of the document
+
+    Returns:
+        (written, unchanged, deleted) chunk counts. Nothing is deleted if chunks is empty.
+    """
+    stored = collection.get(where=where, include=["metadatas"])
+    existing = {id_: (metadata or {}).get(CHUNK_HASH_KEY) for id_, metadata in zip(stored["ids"], stored["metadatas"])}
+    seen: set[str] = set()
+    unchanged = 0
+
+    def changed() -> Iterator[Chunk]:
+        nonlocal unchanged
+        for chunk in chunks:
+            seen.add(chunk.id)
+            if existing.get(chunk.id) == chunk.metadata[CHUNK_HASH_KEY]:
+                unchanged += 1
+            else:
+                yield chunk
+
+    written = ingest_chunks(collection.upsert, embedding_function, changed())
+
+    # A document without chunks is more likely unreadable than empty, keep what is stored
+    if not seen:
+        return written, unchanged, 0
+
+    stale = [id_ for id_ in existing if id_ not in seen]
+    _delete_ids(collection, stale)
+    return written, unchanged, len(stale)
+
+
+def delete_stale_chunks(collection: Any, sources: list[str], keep: set[str]) -> int:
+    """
+    Delete the stored chunks of the documents in sources whose ids are not in keep.
+
+    Used after re-ingesting modified documents, whose earlier versions may have had more pages
+    or chunks than the current ones.
+
+    Returns:
+        Number of deleted chunks
+    """
+    if not sources:
+        return 0
+    stored = collection.get(where={"source": {"$in": sources}}, include=[])
+    stale = [id_ for id_ in stored["ids"] if id_ not in keep]
+    _delete_ids(collection, stale)
+    return len(stale)
+
+
+def _delete_ids(collection: Any, ids: list[str]):
+    """Delete ids from a collection in batches of MAX_BATCH_SIZE."""
+    for start in range(0, len(ids), MAX_BATCH_SIZE):
+        collection.delete(ids=ids[start : start + MAX_BATCH_SIZE])
+
+
+# ======================================================
+# Corpus Ingestion
+# ======================================================
+
+
+def find_files(root: Path, include: str, exclude: Iterable[str] = ()) -> list[Path]:
+    """
+    Find the PDF and text files under root, sorted by path.
+
+    Args:
+        root: Directory to search
+        include: Glob pattern relative to root, e.g. "**/*.pdf"
+        exclude: fnmatch patterns matched against the path relative to root, e.g. "drafts/*"
+    """
+    exclude = list(exclude)
+    files = []
+    for path in sorted(root.glob(include)):
+        if path.suffix.lower() not in PDF_SUFFIXES + TEXT_SUFFIXES or not path.is_file():
+            continue
+        if any(fnmatch(path.relative_to(root).as_posix(), pattern) for pattern in exclude):
+            continue
+        files.append(path)
+    return files
+
+
+# Errors extracting a single file, reported for that file instead of failing the ingestion
+EXTRACTION_ERRORS = (OSError, RuntimeError, ValueError, pymupdf.mupdf.FzErrorBase)
+
+
+async def extract_files(
+    files: list[tuple[Path, str]],
+    chunk_size: int,
+    chunk_overlap: int,
+    chunker: str = "fixed",
+    tokenizer: str = "estimate",
+    workers: int | None = None,
+) -> AsyncIterator[tuple[int, list[Chunk] | Exception]]:
+    """
+    Yield (index, chunks) for each (path, source) in files, in order, or (index, error) if it failed.
+
+    Files are extracted on a process pool of workers (default: EXTRACT_WORKERS) processes with
+    at most 2 * workers files pending, so extraction continues while the caller embeds.
+    """
+    workers = workers or EXTRACT_WORKERS
+    options = (chunk_size, chunk_overlap, chunker, tokenizer)
+    if workers <= 1 or len(files) <= 1:
+        for index, (path, source) in enumerate(files):
+            try:
+                yield index, await asyncio.to_thread(extract_file_chunks, str(path), source, *options)
+            except EXTRACTION_ERRORS as e:
+                yield index, e
+        return
+
+    async def result(future: Future) -> list[Chunk] | Exception:
+        try:
+            return await asyncio.wrap_future(future)
+        except EXTRACTION_ERRORS as e:
+            return e
+
+    with process_pool(workers) as pool:
+        pending: deque[tuple[int, Future]] = deque()
+        for index, (path, source) in enumerate(files):
+            pending.append((index, pool.submit(extract_file_chunks, str(path), source, *options)))
+            if len(pending) >= 2 * workers:
+                index, future = pending.popleft()
+                yield index, await result(future)
+        while pending:
+            index, future = pending.popleft()
+            yield index, await result(future)
+
+
+class BufferedWriter:
+    """Collects embedded batches and writes them to the collection in batches of batch_size chunks."""
+
+    def __init__(self, write: Callable[..., None], batch_size: int | None = None):
+        self.write = write
+        self.batch_size = batch_size or WRITE_BATCH_SIZE
+        self._buffer: dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+
+    def __call__(self, **batch: list):
+        for key, values in batch.items():
+            self._buffer[key].extend(values)
+        while len(self._buffer["ids"]) >= self.batch_size:
+            self._write(self.batch_size)
+
+    def flush(self):
+        """Write everything buffered."""
+        if self._buffer["ids"]:
+            self._write(len(self._buffer["ids"]))
+
+    def _write(self, count: int):
+        self.write(**{key: values[:count] for key, values in self._buffer.items()})
+        for values in self._buffer.values():
+            del values[:count]
+
+
+def manifest_dir() -> Path:
+    """Directory of the ingest manifests in the shared workspace."""
+    return get_workspace_file(WORKSPACE, "vectorstore_manifests")
+
+
+class IngestManifest:
+    """Append-only record of the files ingested into a collection, for resuming interrupted runs.
+
+    Files are identified by their source name, size and modification time, so modified files
+    are ingested again. The manifest is keyed by collection id: a deleted and recreated
+    collection starts with an empty manifest.
+    """
+
+    def __init__(self, collection_id: str, path: Path | None = None):
+        """Initialize the manifest.
+
+        Args:
+            collection_id: Id of the collection the files are ingested into
+            path: Path to the manifest file. Defaults to
+                ~/.mcp-servers/workspace/vectorstore_manifests/<collection_id>.jsonl
+
+        Raises:
+            OSError: If workspace directory cannot be created
+        """
+        if path is None:
+            path = manifest_dir() / f"{collection_id}.jsonl"
+        self.path = path
+
+    def completed(self) -> dict[str, tuple[int, int]]:
+        """Return (size, mtime_ns) of every ingested file by source name."""
+        entries = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partial last line of an interrupted write
+                    continue
+                entries[entry["source"]] = (entry["size"], entry["mtime_ns"])
+        return entries
+
+    def record(self, entries: Iterable[tuple[str, int, int, int]]):
+        """Record ingested files as (source, size, mtime_ns, chunk_count)."""
+        lines = [
+            json.dumps({"source": source, "size": size, "mtime_ns": mtime_ns, "chunks": chunks}) + "\n"
+            for source, size, mtime_ns, chunks in entries
+        ]
+        if not lines:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
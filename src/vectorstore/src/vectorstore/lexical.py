@@ -0,0 +1,399 @@
+"""Lexical (BM25) search and hybrid retrieval for the vectorstore server.
+
+Dense retrieval misses exact tokens such as part numbers and names. Each collection can have a
+``LexicalIndex``: a SQLite FTS5 full-text index of its documents in the shared workspace, ranked
+with BM25. The index is built from the collection on the first lexical or hybrid query and kept
+current by ``IndexedCollection``, the collection proxy the tools read and write through.
+Collections that are never searched lexically have no index and no write overhead.
+
+Hybrid queries fuse the vector and BM25 rankings with reciprocal rank fusion (RRF): a document
+scores sum(1 / (RRF_K + rank)) over the rankings it appears in.
+"""
+
+import os
+import re
+import sqlite3
+from collections.abc import Iterable
+from contextlib import closing
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from core import WORKSPACE, get_env_int, get_workspace_file
+
+from .ingest import MAX_BATCH_SIZE
+from .quantization import QUANTIZATION_KEY, QUANTIZATIONS, QuantizedIndex
+from .query_cache import ResultCache
+
+# Configuration constants (configurable via environment variables)
+RRF_K = get_env_int("VECTORSTORE_RRF_K", 60, min_value=1)  # Default: 60, rank damping of reciprocal rank fusion
+HYBRID_CANDIDATES = get_env_int("VECTORSTORE_HYBRID_CANDIDATES", 50, min_value=1)  # Default: 50 per ranking
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Stay well below SQLite's bound-parameter limit
+_SQL_BATCH = 500
+_WORD = re.compile(r"\w")
+
+
+def lexical_index_dir() -> Path:
+    """Directory of the lexical indexes in the shared workspace."""
+    return get_workspace_file(WORKSPACE, "vectorstore_lexical")
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching any of its words.
+
+    Whitespace-separated terms are quoted, so punctuation is not query syntax and terms such
+    as "AB-1234" match as a phrase of their tokens.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split() if _WORD.search(term)]
+    return " OR ".join(terms)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """
+    Fuse rankings of ids with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of ids, best first
+        k: Rank damping constant
+
+    Returns:
+        (id, score) pairs, best first. Ties keep the order in which ids were first ranked.
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndex:
+    """BM25 full-text index of a collection's documents in a SQLite FTS5 table."""
+
+    def __init__(self, collection_id: str, path: Path | None = None):
+        """Initialize the index, the database is created on the first write.
+
+        Args:
+            collection_id: Id of the indexed collection
+            path: Path to the database file. Defaults to
+                ~/.mcp-servers/workspace/vectorstore_lexical/<collection_id>.db
+        """
+        if path is None:
+            path = lexical_index_dir() / f"{collection_id}.db"
+        self.path = path
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        created = not self.path.exists()
+        conn = sqlite3.connect(self.path, timeout=30)
+        if created:
+            # The index holds the documents' text, keep it owner-only
+            try:
+                os.chmod(self.path, 0o600)
+            except OSError:
+                pass
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FTS5 rows are keyed by integer rowid, the ids table maps them to document ids
+        conn.execute("CREATE TABLE IF NOT EXISTS ids (rowid INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE)")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents "
+            "USING fts5(document, tokenize='unicode61 remove_diacritics 2')"
+        )
+        return conn
+
+    def _rowids(self, conn: sqlite3.Connection, ids: list[str]) -> dict[str, int]:
+        rowids = {}
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start : start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rowids.update(conn.execute(f"SELECT id, rowid FROM ids WHERE id IN ({placeholders})", batch))
+        return rowids
+
+    def _upsert(self, conn: sqlite3.Connection, ids: list[str], documents: list[str | None]):
+        conn.executemany("INSERT OR IGNORE INTO ids (id) VALUES (?)", [(id_,) for id_ in ids])
+        rowids = self._rowids(conn, ids)
+        conn.executemany("DELETE FROM documents WHERE rowid = ?", [(rowids[id_],) for id_ in ids])
+        conn.executemany(
+            "INSERT INTO documents (rowid, document) VALUES (?, ?)",
+            [(rowids[id_], document or "") for id_, document in zip(ids, documents)],
+        )
+
+    def upsert(self, ids: list[str], documents: list[str | None]):
+        """Index documents, replacing the indexed text of existing ids."""
+        if not ids:
+            return
+        with closing(self._connect()) as conn, conn:
+            self._upsert(conn, ids, documents)
+
+    def delete(self, ids: list[str]):
+        """Remove documents from the index."""
+        if not ids:
+            return
+        with closing(self._connect()) as conn, conn:
+            rowids = [(rowid,) for rowid in self._rowids(conn, ids).values()]
+            conn.executemany("DELETE FROM documents WHERE rowid = ?", rowids)
+            conn.executemany("DELETE FROM ids WHERE rowid = ?", rowids)
+
+    def count(self) -> int:
+        """Number of indexed documents."""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+
+    def rebuild(self, collection: Any) -> int:
+        """
+        Replace the index with the documents of a collection, in one transaction.
+
+        Returns:
+            Number of indexed documents
+        """
+        total = collection.count()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM documents")
+            conn.execute("DELETE FROM ids")
+            for offset in range(0, total, MAX_BATCH_SIZE):
+                batch = collection.get(include=["documents"], limit=MAX_BATCH_SIZE, offset=offset)
+                self._upsert(conn, batch["ids"], batch["documents"])
+        return total
+
+    def search(self, text: str, limit: int, ids: Iterable[str] | None = None) -> list[tuple[str, float]]:
+        """
+        Rank documents by BM25 relevance to the words of text.
+
+        Args:
+            text: Query text
+            limit: Maximum number of results
+            ids: Only rank these documents (default: all)
+
+        Returns:
+            (id, score) pairs, best first. Higher scores are more relevant.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        with closing(self._connect()) as conn:
+            join = ""
+            if ids is not None:
+                # Restrict the match to the allowed ids, so filters do not eat into limit
+                conn.execute("CREATE TEMP TABLE allowed (id TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO allowed (id) VALUES (?)", ((id_,) for id_ in ids))
+                join = "JOIN allowed ON allowed.id = ids.id"
+            rows = conn.execute(
+                f"""
+                SELECT ids.id, bm25(documents) FROM documents JOIN ids ON ids.rowid = documents.rowid {join}
+                WHERE documents MATCH ? ORDER BY bm25(documents) LIMIT ?
+                """,
+                (query, limit),
+            ).fetchall()
+        # FTS5's bm25() is negated so that ascending order ranks best first
+        return [(id_, -score) for id_, score in rows]
+
+    def drop(self):
+        """Delete the index database."""
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{self.path}{suffix}")
+            except FileNotFoundError:
+                pass
+
+
+class IndexedCollection:
+    """Chroma collection proxy that keeps the collection's side indexes in line with its writes.
+
+    Writes update the lexical index and the quantized index (see quantization.py) if they exist,
+    then clear the collection's query result cache (so no query caches results of the old
+    indexes). Unfiltered queries with embeddings go through the quantized index if the
+    collection has one. Everything else is passed through to the collection.
+    """
+
+    def __init__(self, collection: Any, index: LexicalIndex | None = None):
+        self.collection = collection
+        self.index = index or LexicalIndex(str(collection.id))
+        self.results = ResultCache()
+        self.quantized: QuantizedIndex | None = None
+        if (collection.metadata or {}).get(QUANTIZATION_KEY) in QUANTIZATIONS:
+            space = (collection.configuration.get("hnsw") or {}).get("space", "l2")
+            self.quantized = QuantizedIndex(str(collection.id), space)
+        self._build_lock = Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.collection, name)
+
+    def _written(self, ids: list[str], documents: list[str] | None, embeddings: Any = None):
+        """Update the side indexes after ids were written, embeddings are fetched if not given."""
+        if documents is not None and self.index.exists:
+            self.index.upsert(ids, documents)
+        if self.quantized is not None and (documents is not None or embeddings is not None):
+            with self._build_lock:
+                if self.quantized.exists:
+                    if embeddings is None:
+                        stored = self.collection.get(ids=ids, include=["embeddings"])
+                        ids, embeddings = stored["ids"], stored["embeddings"]
+                    self.quantized.upsert(ids, embeddings)
+        self.results.clear()
+
+    def add(self, ids: list[str], documents: list[str] | None = None, **kwargs: Any):
+        self.collection.add(ids=ids, documents=documents, **kwargs)
+        self._written(ids, documents, kwargs.get("embeddings"))
+
+    def upsert(self, ids: list[str], documents: list[str] | None = None, **kwargs: Any):
+        self.collection.upsert(ids=ids, documents=documents, **kwargs)
+        self._written(ids, documents, kwargs.get("embeddings"))
+
+    def update(self, ids: list[str], documents: list[str] | None = None, **kwargs: Any):
+        self.collection.update(ids=ids, documents=documents, **kwargs)
+        self._written(ids, documents, kwargs.get("embeddings"))
+
+    def delete(
+        self,
+        ids: list[str] | None = None,
+        where: dict[str, Any] | None = None,
+        where_document: dict[str, Any] | None = None,
+    ):
+        indexed = self.index.exists or (self.quantized is not None and self.quantized.exists)
+        deleted = ids
+        if indexed and (where is not None or where_document is not None):
+            # Resolve the filters to ids before the documents are gone
+            deleted = self.collection.get(ids=ids, where=where, where_document=where_document, include=[])["ids"]
+        self.collection.delete(ids=ids, where=where, where_document=where_document)
+        if deleted and self.index.exists:
+            self.index.delete(deleted)
+        if deleted and self.quantized is not None:
+            with self._build_lock:
+                if self.quantized.exists:
+                    self.quantized.delete(deleted)
+        self.results.clear()
+
+    def query(
+        self,
+        query_embeddings: list[Any] | None = None,
+        query_texts: list[str] | None = None,
+        n_results: int = 10,
+        where: dict[str, Any] | None = None,
+        where_document: dict[str, Any] | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Vector search, through the quantized index if the collection has one and there are no filters.
+
+        Filtered queries go to Chroma, which applies the filters during its HNSW search instead of
+        to a fixed number of candidates.
+        """
+        include = include if include else ["documents", "metadatas", "distances"]
+        if self.quantized is None or query_embeddings is None or where is not None or where_document is not None:
+            return self.collection.query(
+                query_embeddings=query_embeddings,
+                query_texts=query_texts,
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                include=include,
+            )
+
+        with self._build_lock:
+            index = self.quantized
+            if not index.exists or index.count() != self.collection.count():
+                index.build(self.collection)
+        return index.query(self.collection, query_embeddings, n_results, include)
+
+    def lexical_index(self) -> LexicalIndex:
+        """Return the lexical index, building it if it is missing or out of date.
+
+        The index is rebuilt when its document count differs from the collection's, which
+        catches writes made by other clients that add or delete documents.
+        """
+        with self._build_lock:
+            if not self.index.exists or self.index.count() != self.collection.count():
+                self.index.rebuild(self.collection)
+        return self.index
+
+    def _matching_ids(self, where: dict[str, Any] | None, where_document: dict[str, Any] | None) -> list[str]:
+        """Ids of the documents matching the filters, fetched in pages."""
+        ids: list[str] = []
+        while True:
+            page = self.collection.get(
+                where=where, where_document=where_document, include=[], limit=MAX_BATCH_SIZE, offset=len(ids)
+            )["ids"]
+            ids.extend(page)
+            if len(page) < MAX_BATCH_SIZE:
+                return ids
+
+    def search(
+        self,
+        query_texts: list[str],
+        n_results: int,
+        mode: str,
+        where: dict[str, Any] | None = None,
+        where_document: dict[str, Any] | None = None,
+        include: list[str] | None = None,
+        query_embeddings: list[Any] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Lexical or hybrid search, in the shape of Chroma query results plus "scores".
+
+        Lexical results are ranked by BM25 score, hybrid results by the RRF score of the vector
+        and BM25 rankings of up to max(n_results, HYBRID_CANDIDATES) candidates each. Filters are
+        applied before ranking, the BM25 ranking only covers the matching documents. Distances
+        are those of the vector search, None for documents only found lexically.
+
+        Args:
+            query_texts: Query texts
+            n_results: Number of results per query
+            mode: "lexical" or "hybrid"
+            where: Optional metadata filter
+            where_document: Optional document content filter
+            include: Fields to include (default: ["documents", "metadatas", "distances"])
+            query_embeddings: Embeddings of query_texts for the vector search (default: embedded
+                by the collection)
+        """
+        include = include if include else ["documents", "metadatas", "distances"]
+        depth = max(n_results, HYBRID_CANDIDATES)
+        index = self.lexical_index()
+
+        distances: list[dict[str, float]] = [{} for _ in query_texts]
+        vector_rankings: list[list[str]] = [[] for _ in query_texts]
+        if mode == "hybrid":
+            vector = self.query(
+                query_texts=None if query_embeddings is not None else query_texts,
+                query_embeddings=query_embeddings,
+                n_results=depth,
+                where=where,
+                where_document=where_document,
+                include=["distances"],
+            )
+            vector_rankings = vector["ids"]
+            distances = [dict(zip(ids, row)) for ids, row in zip(vector["ids"], vector["distances"])]
+
+        allowed = None
+        if where is not None or where_document is not None:
+            allowed = self._matching_ids(where, where_document)
+
+        ranked: list[list[tuple[str, float]]] = []
+        for text, vector_ranking in zip(query_texts, vector_rankings):
+            lexical = index.search(text, depth, allowed) if allowed is None or allowed else []
+            if mode == "hybrid":
+                ranked.append(reciprocal_rank_fusion([vector_ranking, [id_ for id_, _ in lexical]])[:n_results])
+            else:
+                ranked.append(lexical[:n_results])
+
+        fields = [field for field in include if field != "distances"]
+        result_ids = list(dict.fromkeys(id_ for ranking in ranked for id_, _ in ranking))
+        found: dict[str, dict[str, Any]] = {}
+        if fields and result_ids:
+            stored = self.collection.get(ids=result_ids, include=fields)
+            for i, id_ in enumerate(stored["ids"]):
+                found[id_] = {field: stored[field][i] for field in fields}
+
+        result: dict[str, Any] = {"ids": [[id_ for id_, _ in ranking] for ranking in ranked]}
+        for field in fields:
+            result[field] = [[found.get(id_, {}).get(field) for id_, _ in ranking] for ranking in ranked]
+        if "distances" in include:
+            result["distances"] = [
+                [scores.get(id_) for id_, _ in ranking] for ranking, scores in zip(ranked, distances)
+            ]
+        result["scores"] = [[score for _, score in ranking] for ranking in ranked]
+        return result
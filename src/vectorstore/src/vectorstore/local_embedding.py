@@ -0,0 +1,133 @@
+"""Local CPU embedding backend for the vectorstore server.
+
+``LocalEmbeddingFunction`` runs all-MiniLM-L6-v2 (the model of Chroma's default embedding
+function) with ONNX Runtime on the CPU, with no network access once the model is downloaded:
+
+- batching: documents are embedded in batches of a configurable size. Documents are sorted by
+  length and each batch is padded to its longest document instead of the model's maximum of
+  256 tokens, so short chunks cost less compute. Vectors are the same as Chroma's.
+- threads: ONNX Runtime parallelizes each batch over a configurable number of threads. One batch
+  runs at a time, concurrent callers would only oversubscribe the CPU.
+- model cache: the model is downloaded once to a configurable directory.
+"""
+
+import os
+from functools import cached_property
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+import numpy as np
+from chromadb.api.types import Documents, Embeddings
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2, register_embedding_function
+
+from core import get_env_int
+
+# Configuration constants (configurable via environment variables)
+LOCAL_BATCH_SIZE = get_env_int("VECTORSTORE_LOCAL_BATCH_SIZE", 32, min_value=1)  # Default: 32 documents per batch
+LOCAL_THREADS = get_env_int("VECTORSTORE_LOCAL_THREADS", 0)  # Default: 0, ONNX Runtime uses all physical cores
+LOCAL_MODEL_DIR = os.getenv("VECTORSTORE_LOCAL_MODEL_DIR", str(ONNXMiniLM_L6_V2.DOWNLOAD_PATH.parent))
+
+# Longest input of the model in tokens, longer documents are truncated
+MAX_SEQUENCE_LENGTH = 256
+
+
+# Registered, so Chroma can rebuild the function from a collection's configuration
+@register_embedding_function
+class LocalEmbeddingFunction(ONNXMiniLM_L6_V2):
+    """all-MiniLM-L6-v2 on ONNX Runtime (CPU) with batch size, thread count and model directory."""
+
+    def __init__(
+        self,
+        batch_size: int = LOCAL_BATCH_SIZE,
+        threads: int = LOCAL_THREADS,
+        model_dir: str | Path = LOCAL_MODEL_DIR,
+    ):
+        """Initialize the embedding function, the model is loaded on first use.
+
+        Args:
+            batch_size: Documents per inference batch
+            threads: ONNX Runtime intra-op threads (0 for ONNX Runtime's default)
+            model_dir: Directory the model is downloaded to (in a subdirectory named after the model)
+        """
+        super().__init__(preferred_providers=["CPUExecutionProvider"])
+        self.batch_size = batch_size
+        self.threads = threads
+        self.DOWNLOAD_PATH = Path(model_dir).expanduser() / self.MODEL_NAME
+        self._run_lock = Lock()
+
+    @cached_property
+    def tokenizer(self) -> Any:
+        tokenizer = self.Tokenizer.from_file(str(self.DOWNLOAD_PATH / self.EXTRACTED_FOLDER_NAME / "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=MAX_SEQUENCE_LENGTH)
+        # Pad to the longest document of each batch
+        tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+        return tokenizer
+
+    @cached_property
+    def model(self) -> Any:
+        options = self.ort.SessionOptions()
+        options.log_severity_level = 3
+        options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = self.ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        return self.ort.InferenceSession(
+            str(self.DOWNLOAD_PATH / self.EXTRACTED_FOLDER_NAME / "model.onnx"),
+            providers=self._preferred_providers,
+            sess_options=options,
+        )
+
+    def _forward(self, documents: list[str], batch_size: int = LOCAL_BATCH_SIZE) -> list[np.ndarray]:
+        """Embed documents in batches of similar length, returning vectors in input order."""
+        embeddings: list[np.ndarray] = [np.empty(0, dtype=np.float32)] * len(documents)
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start : start + batch_size]
+            encoded = self.tokenizer.encode_batch([documents[i] for i in batch])
+            input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+
+            with self._run_lock:
+                last_hidden_state = self.model.run(
+                    None,
+                    {
+                        "input_ids": input_ids,
+                        "attention_mask": attention_mask,
+                        "token_type_ids": np.zeros_like(input_ids),
+                    },
+                )[0]
+
+            # Mean pooling over the tokens of each document, ignoring padding
+            mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+            pooled = (last_hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            for i, vector in zip(batch, self._normalize(pooled).astype(np.float32)):
+                embeddings[i] = vector
+        return embeddings
+
+    def __call__(self, input: Documents) -> Embeddings:
+        if not input:
+            return []
+        self._download_model_if_not_exists()
+        return self._forward(list(input), self.batch_size)
+
+    @staticmethod
+    def name() -> str:
+        return "local"
+
+    def get_config(self) -> dict[str, Any]:
+        # Batch size, threads and model directory don't change the vectors
+        return {"model_name": self.MODEL_NAME}
+
+    @staticmethod
+    def build_from_config(config: dict[str, Any]) -> "LocalEmbeddingFunction":
+        return LocalEmbeddingFunction()
+
+    @staticmethod
+    def validate_config(config: dict[str, Any]):
+        if config.get("model_name", ONNXMiniLM_L6_V2.MODEL_NAME) != ONNXMiniLM_L6_V2.MODEL_NAME:
+            raise ValueError(f"Unsupported local embedding model: {config['model_name']}")
+
+    def validate_config_update(self, old_config: dict[str, Any], new_config: dict[str, Any]):
+        if new_config.get("model_name", old_config.get("model_name")) != old_config.get("model_name"):
+            raise ValueError("The embedding model of a collection cannot be changed")
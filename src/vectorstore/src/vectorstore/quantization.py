@@ -0,0 +1,395 @@
+"""Quantized vector side index for the vectorstore server.
+
+A collection created with ``quantization="int8"`` gets a ``QuantizedIndex`` next to Chroma's
+HNSW index: its embeddings scalar-quantized to int8 with one scale per vector (4x smaller
+than float32), stored in the shared workspace and memory-mapped for queries.
+
+Queries scan the int8 codes in blocks for the QUANTIZED_RERANK_FACTOR * n_results best
+approximate candidates, then re-rank the candidates exactly on their float32 embeddings from
+Chroma, so returned distances are exact. A scan has no graph to traverse, so its recall does not
+depend on HNSW parameters, and its memory is bounded by the mapped codes.
+
+The index is built from the collection in blocks on the first query. Writes through the server
+update it in place: the codes of new and changed embeddings are appended to its files and the
+rows they replace or delete are marked deleted, until deleted rows outnumber live ones and the
+index is compacted. Writes by other clients are detected by a changed count and rebuild it.
+
+Filtered queries go to Chroma, whose HNSW search applies the filters while it searches.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from core import WORKSPACE, get_env_int, get_workspace_file
+
+from .ingest import MAX_BATCH_SIZE
+
+# Configuration constants (configurable via environment variables)
+QUANTIZED_RERANK_FACTOR = get_env_int("VECTORSTORE_QUANTIZED_RERANK_FACTOR", 4, min_value=1)  # Default: 4x n_results
+
+# Collection metadata key enabling the side index, and supported quantizations
+QUANTIZATION_KEY = "vectorstore:quantization"
+QUANTIZATIONS = ("int8",)
+
+# Vectors per block of the scan, bounds the float32 copy of the codes made for each block
+SCAN_BLOCK = 16384
+
+
+def quantized_index_dir() -> Path:
+    """Directory of the quantized indexes in the shared workspace."""
+    return get_workspace_file(WORKSPACE, "vectorstore_quantized")
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize vectors to int8 with one scale per vector.
+
+    Returns:
+        (codes, scales) with vectors ~= codes * scales[:, None]
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def distances(vectors: np.ndarray, queries: np.ndarray, space: str) -> np.ndarray:
+    """Distances of queries (rows) to vectors (columns) as Chroma computes them in space."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        return 1.0 - queries @ vectors.T
+    if space == "ip":
+        return 1.0 - queries @ vectors.T
+    # Squared euclidean distance
+    return (queries**2).sum(axis=1)[:, None] - 2.0 * queries @ vectors.T + (vectors**2).sum(axis=1)[None, :]
+
+
+@dataclass
+class _Snapshot:
+    """Loaded state of an index. Queries keep the snapshot they started with.
+
+    ids and rows are shared with the snapshots that follow writes: ids only grows, and rows (the
+    live row of each id) is only used by writers, which the collection serializes.
+    """
+
+    ids: list[str]
+    rows: dict[str, int]
+    deleted: np.ndarray
+    codes: np.ndarray
+    scales: np.ndarray
+    norms: np.ndarray
+    signature: tuple[int, ...]
+
+
+class QuantizedIndex:
+    """int8 codes, per-vector scales and ids of a collection's embeddings, in a directory.
+
+    Rows are append-only: codes.bin, scales.bin and norms.bin hold one row per vector, ids.jsonl
+    the id of each row and is written last, so a row exists once its id does. deleted.txt lists
+    the rows that were deleted or replaced by a later row.
+    """
+
+    def __init__(self, collection_id: str, space: str = "l2", path: Path | None = None):
+        """Initialize the index, it is loaded or built on first use.
+
+        Args:
+            collection_id: Id of the indexed collection
+            space: Distance function of the collection: "l2", "cosine" or "ip"
+            path: Index directory. Defaults to ~/.mcp-servers/workspace/vectorstore_quantized/<collection_id>
+        """
+        if path is None:
+            path = quantized_index_dir() / collection_id
+        self.path = path
+        self.space = space
+        self._snapshot: _Snapshot | None = None
+
+    @property
+    def exists(self) -> bool:
+        return (self.path / "ids.jsonl").exists()
+
+    def _signature(self) -> tuple[int, ...]:
+        """Identity and committed sizes of the index files, changed by writes of any process."""
+        ids = os.stat(self.path / "ids.jsonl")
+        try:
+            deleted = os.stat(self.path / "deleted.txt").st_size
+        except FileNotFoundError:
+            deleted = 0
+        return (ids.st_ino, ids.st_size, deleted)
+
+    def _load(self) -> _Snapshot:
+        signature = self._signature()
+        if self._snapshot is None or self._snapshot.signature != signature:
+            self._snapshot = self._read(signature)
+        return self._snapshot
+
+    def _read(self, signature: tuple[int, ...]) -> _Snapshot:
+        """Load the rows committed when signature was taken."""
+        _, ids_size, deleted_size = signature
+        with open(self.path / "ids.jsonl", "rb") as f:
+            ids = [json.loads(line) for line in f.read(ids_size).splitlines()]
+        deleted = np.zeros(len(ids), dtype=bool)
+        if deleted_size:
+            with open(self.path / "deleted.txt", "rb") as f:
+                deleted_rows = np.array(f.read(deleted_size).split(), dtype=np.int64)
+            deleted[deleted_rows[deleted_rows < len(ids)]] = True
+        rows = {id_: row for row, id_ in enumerate(ids) if not deleted[row]}
+
+        count = len(ids)
+        with open(self.path / "meta.json", encoding="utf-8") as f:
+            dimensions = json.load(f)["dimensions"]
+        if count and dimensions:
+            codes = np.memmap(self.path / "codes.bin", dtype=np.int8, mode="r", shape=(count, dimensions))
+        else:
+            codes = np.zeros((count, dimensions), dtype=np.int8)
+        scales = np.fromfile(self.path / "scales.bin", dtype=np.float32, count=count)
+        norms = np.fromfile(self.path / "norms.bin", dtype=np.float32, count=count)
+        return _Snapshot(ids, rows, deleted, codes, scales, norms, signature)
+
+    def count(self) -> int:
+        """Number of live (indexed and not deleted) vectors."""
+        return len(self._load().rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the codes, scales and norms."""
+        snapshot = self._load()
+        return snapshot.codes.nbytes + snapshot.scales.nbytes + snapshot.norms.nbytes
+
+    def _create(self):
+        """Write the files of an empty index."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"dimensions": 0}, f)
+        for name in ("codes.bin", "scales.bin", "norms.bin", "deleted.txt", "ids.jsonl"):
+            open(self.path / name, "wb").close()
+
+    def _append(self, name: str, data: bytes, offset: int):
+        """Write data to a file of the index at offset, dropping what an interrupted write left after it."""
+        with open(self.path / name, "r+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+
+    def _append_rows(self, ids: list[str], codes: np.ndarray, scales: np.ndarray, norms: np.ndarray) -> list[int]:
+        """
+        Append rows to the index files.
+
+        Returns:
+            Rows that held ids before, now replaced
+        """
+        snapshot = self._load()
+        count, dimensions = len(snapshot.scales), codes.shape[1]
+        if snapshot.codes.shape[1] != dimensions:
+            # First rows of an empty index
+            with open(self.path / "meta.json", "w", encoding="utf-8") as f:
+                json.dump({"dimensions": dimensions}, f)
+
+        replaced = [snapshot.rows[id_] for id_ in ids if id_ in snapshot.rows]
+        self._append("codes.bin", np.ascontiguousarray(codes, dtype=np.int8).tobytes(), count * dimensions)
+        self._append("scales.bin", np.asarray(scales, dtype=np.float32).tobytes(), count * 4)
+        self._append("norms.bin", np.asarray(norms, dtype=np.float32).tobytes(), count * 4)
+        # Written last, commits the rows
+        self._append("ids.jsonl", "".join(json.dumps(id_) + "\n" for id_ in ids).encode(), snapshot.signature[1])
+
+        snapshot.ids.extend(ids)
+        snapshot.rows.update(zip(ids, range(count, count + len(ids))))
+        total = count + len(ids)
+        self._snapshot = _Snapshot(
+            snapshot.ids,
+            snapshot.rows,
+            np.concatenate([snapshot.deleted, np.zeros(len(ids), dtype=bool)]),
+            np.memmap(self.path / "codes.bin", dtype=np.int8, mode="r", shape=(total, dimensions)),
+            np.concatenate([snapshot.scales, scales]),
+            np.concatenate([snapshot.norms, norms]),
+            self._signature(),
+        )
+        return replaced
+
+    def _delete_rows(self, rows: list[int]):
+        """Mark rows as deleted, compacting the index once deleted rows outnumber live ones."""
+        if not rows:
+            return
+        snapshot = self._load()
+        self._append("deleted.txt", "".join(f"{row}\n" for row in rows).encode(), snapshot.signature[2])
+        deleted = snapshot.deleted.copy()
+        deleted[rows] = True
+        self._snapshot = _Snapshot(
+            snapshot.ids,
+            snapshot.rows,
+            deleted,
+            snapshot.codes,
+            snapshot.scales,
+            snapshot.norms,
+            self._signature(),
+        )
+        if np.count_nonzero(deleted) > len(snapshot.rows):
+            self._compact()
+
+    def upsert(self, ids: list[str], embeddings: Any):
+        """Index the embeddings of ids, replacing the indexed embeddings of existing ids."""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if self.space == "cosine":
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        codes, scales = quantize(vectors)
+        norms = (vectors**2).sum(axis=1).astype(np.float32)
+        self._delete_rows(self._append_rows(ids, codes, scales, norms))
+
+    def delete(self, ids: list[str]):
+        """Remove the embeddings of ids from the index."""
+        rows = self._load().rows
+        self._delete_rows([rows.pop(id_) for id_ in ids if id_ in rows])
+
+    def _replace(self, write: Callable[["QuantizedIndex"], None]) -> int:
+        """
+        Replace the index with one written by write(index) in a temporary directory.
+
+        The new index is moved into place when complete, so concurrent queries keep using the
+        previous one.
+
+        Returns:
+            Number of indexed vectors
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staging = QuantizedIndex(
+            "", self.space, Path(tempfile.mkdtemp(dir=self.path.parent, prefix=f".{self.path.name}-"))
+        )
+        try:
+            staging._create()
+            write(staging)
+            count = staging.count()
+        except BaseException:
+            staging.drop()
+            raise
+        self.drop()
+        os.replace(staging.path, self.path)
+        return count
+
+    def build(self, collection: Any) -> int:
+        """
+        Replace the index with the quantized embeddings of a collection, written in blocks.
+
+        Returns:
+            Number of indexed vectors
+        """
+
+        def write(index: QuantizedIndex):
+            for offset in range(0, collection.count(), MAX_BATCH_SIZE):
+                batch = collection.get(include=["embeddings"], limit=MAX_BATCH_SIZE, offset=offset)
+                if not batch["ids"]:
+                    break
+                index.upsert(batch["ids"], batch["embeddings"])
+
+        return self._replace(write)
+
+    def _compact(self):
+        """Rewrite the index without its deleted rows, in blocks."""
+        snapshot = self._load()
+        live = np.flatnonzero(~snapshot.deleted)
+
+        def write(index: QuantizedIndex):
+            for start in range(0, len(live), SCAN_BLOCK):
+                rows = live[start : start + SCAN_BLOCK]
+                index._append_rows(
+                    [snapshot.ids[row] for row in rows],
+                    snapshot.codes[rows],
+                    snapshot.scales[rows],
+                    snapshot.norms[rows],
+                )
+
+        self._replace(write)
+
+    def candidates(self, queries: np.ndarray, limit: int) -> list[list[str]]:
+        """
+        Approximate nearest neighbors of each query by a scan of the int8 codes.
+
+        Returns:
+            Up to limit ids per query, nearest first
+        """
+        snapshot = self._load()
+        ids, codes, scales, norms, deleted = (
+            snapshot.ids,
+            snapshot.codes,
+            snapshot.scales,
+            snapshot.norms,
+            snapshot.deleted,
+        )
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.space == "cosine":
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        live = len(deleted) - np.count_nonzero(deleted)
+        if not live:
+            return [[] for _ in queries]
+
+        limit = min(limit, live)
+        best_scores = np.full((len(queries), 0), np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(deleted), SCAN_BLOCK):
+            block = slice(start, start + SCAN_BLOCK)
+            dots = (queries @ codes[block].astype(np.float32).T) * scales[block]
+            # Lower is nearer; constant terms of the distance are left out
+            scores = norms[block] - 2.0 * dots if self.space == "l2" else -dots
+            scores[:, deleted[block]] = np.inf
+            rows = np.arange(block.start, block.start + scores.shape[1])
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+            if best_scores.shape[1] > limit:
+                keep = np.argpartition(best_scores, limit - 1, axis=1)[:, :limit]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(best_scores, axis=1)
+        # An id can have two live rows while a write replaces it
+        return [list(dict.fromkeys(ids[row] for row in rows[o])) for rows, o in zip(best_rows, order)]
+
+    def query(
+        self,
+        collection: Any,
+        query_embeddings: list[Any],
+        n_results: int,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Nearest neighbors from the quantized scan, re-ranked exactly, in the shape of Chroma query results."""
+        include = include if include else ["documents", "metadatas", "distances"]
+        fields = [field for field in include if field not in ("distances", "embeddings")]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+
+        result: dict[str, Any] = {"ids": []}
+        for field in include:
+            result[field] = []
+        for query, candidates in zip(queries, self.candidates(queries, n_results * QUANTIZED_RERANK_FACTOR)):
+            if not candidates:
+                result["ids"].append([])
+                for field in include:
+                    result[field].append([])
+                continue
+
+            stored = collection.get(ids=candidates, include=["embeddings", *fields])
+            exact = distances(stored["embeddings"], query[None, :], self.space)[0] if stored["ids"] else []
+            ranked = np.argsort(exact)[:n_results]
+            result["ids"].append([stored["ids"][i] for i in ranked])
+            for field in fields:
+                result[field].append([stored[field][i] for i in ranked])
+            if "distances" in include:
+                result["distances"].append([float(exact[i]) for i in ranked])
+            if "embeddings" in include:
+                result["embeddings"].append([stored["embeddings"][i].tolist() for i in ranked])
+        return result
+
+    def drop(self):
+        """Delete the index directory."""
+        self._snapshot = None
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,140 @@
+"""In-memory query caches for the vectorstore server.
+
+Agents often repeat the same retrieval within a session. Two caches avoid redoing the work:
+
+- ``QueryEmbeddingCache``: least recently used query embeddings, keyed by the embedding model
+  and the normalized query text, so a repeated query is not embedded again.
+- ``ResultCache``: query results with a short time-to-live, keyed by all query parameters.
+  Each collection handle has its own result cache, which every write through the handle
+  clears. The TTL bounds how long writes made by other clients can go unseen.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any
+
+import numpy as np
+
+from core import get_env_int
+
+from .embedding_cache import model_key, text_hash
+
+# Configuration constants (configurable via environment variables)
+QUERY_EMBEDDING_CACHE_SIZE = get_env_int("VECTORSTORE_QUERY_EMBEDDING_CACHE_SIZE", 1024)  # Default: 1024, 0 disables
+RESULT_CACHE_TTL = get_env_int("VECTORSTORE_RESULT_CACHE_TTL", 30)  # Default: 30 seconds, 0 disables
+RESULT_CACHE_SIZE = get_env_int("VECTORSTORE_RESULT_CACHE_SIZE", 256)  # Default: 256 results per collection
+
+
+def result_key(**params: Any) -> str:
+    """Cache key of a query from its parameters (filters are compared by value)."""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class QueryEmbeddingCache:
+    """Least recently used cache of query embeddings."""
+
+    def __init__(self, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = Lock()
+
+    def embed(self, embedding_function: Any, texts: list[str]) -> list[np.ndarray]:
+        """Embed query texts, reusing the embeddings of texts queried before."""
+        if self.max_size <= 0:
+            return [np.asarray(vector, dtype=np.float32) for vector in embedding_function.embed_query(input=texts)]
+
+        model = model_key(embedding_function)
+        keys = [(model, text_hash(text)) for text in texts]
+        found: dict[tuple[str, str], np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = embedding_function.embed_query(input=list(missing.values()))
+            embedded = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+            found.update(embedded)
+            with self._lock:
+                self._entries.update(embedded)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResultCache:
+    """Query results that expire after a time-to-live, evicting least recently used ones."""
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_size: int = RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        # Incremented by clear(), so results computed before a write are not stored after it
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached result for key, or None if it is missing or expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, generation: int | None = None):
+        """Cache a result, unless the cache was cleared since generation (read before computing it)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+# Global instance with thread-safe initialization
+_query_embedding_cache: QueryEmbeddingCache | None = None
+_lock = Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Get or create the global query embedding cache instance.
+
+    Thread-safe singleton pattern using double-checked locking.
+
+    Returns:
+        QueryEmbeddingCache: The global query embedding cache instance
+    """
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        with _lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = QueryEmbeddingCache()
+    return _query_embedding_cache
@@ -1,6 +1,15 @@
+import os
+
+from dotenv import load_dotenv
+from fastmcp import FastMCP
+
 from core import parse_args, run_server
 
-from . import mcp
+load_dotenv()
+
+mcp = FastMCP(os.getenv("NAME", "vectorstore"))
+
+from . import tools  # noqa: F401, E402
 
 DEFAULT_PORT = 8014
 
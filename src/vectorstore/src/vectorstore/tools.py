@@ -1,19 +1,51 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
 import os
+import sqlite3
 import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 from pathlib import Path
-from typing import TYPE_CHECKING
+from threading import Lock
+from typing import TYPE_CHECKING, Any
 
 import chromadb
-import pymupdf
+import openai
+from chromadb.errors import ChromaError, NotFoundError
 from chromadb.utils import embedding_functions
+from fastmcp import Context
+
+from core import WORKSPACE, get_env_int, get_workspace_file
 
 if TYPE_CHECKING:
     from chromadb import ClientAPI
 
-from . import mcp
+from .chunking import CHUNKERS, tokenizer_spec
+from .diversity import MMR_CANDIDATE_FACTOR, diversify
+from .embedding_cache import CachedEmbeddingFunction, get_embedding_cache, model_key
+from .encoding import EMBEDDING_ENCODINGS, OUTPUT_FORMATS, encode_result
+from .ingest import (
+    BufferedWriter,
+    Chunk,
+    IngestManifest,
+    delete_stale_chunks,
+    document_chunks,
+    extract_files,
+    find_files,
+    ingest_chunks,
+    iter_pdf_pages,
+    sync_chunks,
+)
+from .lexical import SEARCH_MODES, IndexedCollection, LexicalIndex
+from .local_embedding import LocalEmbeddingFunction
+from .quantization import QUANTIZATION_KEY, QUANTIZATIONS, QuantizedIndex
+from .query_cache import get_query_embedding_cache, result_key
+from .server import mcp
+from .transfer import export_parquet, iter_parquet, read_header
 
 # ======================================================
 # Client Management
@@ -21,25 +53,40 @@ from . import mcp
 
 _client: ClientAPI | None = None
 _embedding_function = None
+# Guards creation of the client and embedding function
+_client_lock = Lock()
+# Collection handles by name
+_collections: dict[str, IndexedCollection] = {}
+_collections_lock = Lock()
 
 
 def _get_embedding_function():
     """Get or create the embedding function based on configuration."""
     global _embedding_function
     if _embedding_function is None:
-        embedding_type = os.getenv("EMBEDDING_TYPE", "openai")
-
-        if embedding_type == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY environment variable is required when using OpenAI embeddings")
-
-            model_name = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
-            _embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-                api_key=api_key,
-                model_name=model_name,
-            )
-        # else: use ChromaDB's default embedding function (no explicit function needed)
+        with _client_lock:
+            if _embedding_function is None:
+                embedding_type = os.getenv("EMBEDDING_TYPE", "openai")
+
+                if embedding_type == "openai":
+                    api_key = os.getenv("OPENAI_API_KEY")
+                    if not api_key:
+                        raise ValueError("OPENAI_API_KEY environment variable is required when using OpenAI embeddings")
+
+                    model_name = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+                    embedding_function = embedding_functions.OpenAIEmbeddingFunction(
+                        api_key=api_key,
+                        model_name=model_name,
+                    )
+                elif embedding_type == "local":
+                    embedding_function = LocalEmbeddingFunction()
+                else:
+                    embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+                # Reuse cached vectors for text that was embedded before
+                if get_embedding_cache().enabled:
+                    embedding_function = CachedEmbeddingFunction(embedding_function)
+                _embedding_function = embedding_function
 
     return _embedding_function
 
@@ -48,28 +95,143 @@ def _get_client() -> ClientAPI:
     """Get or create the ChromaDB client singleton."""
     global _client
     if _client is None:
-        chroma_path = os.getenv("CHROMA_PATH", "./chroma_data")
-        path = Path(chroma_path).expanduser().resolve()
-        path.mkdir(parents=True, exist_ok=True)
-        _client = chromadb.PersistentClient(path=str(path))
+        with _client_lock:
+            if _client is None:
+                chroma_path = os.getenv("CHROMA_PATH", "./chroma_data")
+                path = Path(chroma_path).expanduser().resolve()
+                path.mkdir(parents=True, exist_ok=True)
+                _collections.clear()
+                _client = chromadb.PersistentClient(path=str(path))
     return _client
 
 
+def _get_collection(name: str, get_or_create: bool = False) -> IndexedCollection:
+    """
+    Get a collection handle, cached by name.
+
+    Handles are looked up in the sysdb once and reused until the collection is deleted or
+    created through this server, or found missing (see _collection_error). Writes through
+    the handle keep the collection's lexical index current.
+    """
+    collection = _collections.get(name)
+    if collection is None:
+        with _collections_lock:
+            collection = _collections.get(name)
+            if collection is None:
+                client = _get_client()
+                embedding_function = _get_embedding_function()
+                if get_or_create:
+                    collection = client.get_or_create_collection(name=name, embedding_function=embedding_function)
+                else:
+                    collection = client.get_collection(name=name, embedding_function=embedding_function)
+                collection = _collections[name] = IndexedCollection(collection)
+    return collection
+
+
+# Errors of the collection store, the files and the embedding model that ingestion reports
+_INGEST_ERRORS = (ChromaError, OSError, RuntimeError, ValueError, sqlite3.Error, openai.OpenAIError)
+
+
+def _collection_error(name: str, error: Exception) -> str:
+    """Format a tool error, dropping the cached handle if the collection no longer exists."""
+    if isinstance(error, NotFoundError):
+        # Deleted (and maybe recreated) by another client, look it up again on the next call
+        _collections.pop(name, None)
+    return f"Error: {error}"
+
+
+def _encoding_error(output_format: str, embedding_encoding: str) -> str | None:
+    """Validate the response encoding options of get_documents and query."""
+    if output_format not in OUTPUT_FORMATS:
+        return f"Error: Invalid output_format '{output_format}'. Must be one of: {', '.join(OUTPUT_FORMATS)}"
+    if embedding_encoding not in EMBEDDING_ENCODINGS:
+        return (
+            f"Error: Invalid embedding_encoding '{embedding_encoding}'. "
+            f"Must be one of: {', '.join(EMBEDDING_ENCODINGS)}"
+        )
+    return None
+
+
 def _generate_ids(count: int) -> list[str]:
     """Generate unique IDs for documents."""
     return [str(uuid.uuid4()) for _ in range(count)]
 
 
+# ======================================================
+# Executor
+# ======================================================
+
+# Configuration constants (configurable via environment variables)
+MAX_WORKERS = get_env_int("VECTORSTORE_MAX_WORKERS", min(8, (os.cpu_count() or 1) + 4), min_value=1)
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = Lock()
+# Locks serializing the writes to each collection, by collection name
+_write_locks: dict[str, Lock] = {}
+_write_locks_lock = Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get or create the thread pool that runs blocking Chroma and embedding calls."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="vectorstore")
+    return _executor
+
+
+def _write_lock(name: str) -> Lock:
+    """Lock serializing writes to a collection."""
+    with _write_locks_lock:
+        return _write_locks.setdefault(name, Lock())
+
+
+async def _run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking function on the executor without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+def _blocking(writes: str | None = None) -> Callable[[Callable[..., str]], Callable[..., Any]]:
+    """
+    Turn a blocking tool into an async tool that runs on the executor.
+
+    Reads run concurrently. A tool that writes names the parameter holding the collection
+    name in writes, and holds that collection's write lock while it runs.
+    """
+
+    def decorator(func: Callable[..., str]) -> Callable[..., Any]:
+        signature = inspect.signature(func)
+
+        def locked(lock: Lock, /, *args: Any, **kwargs: Any) -> str:
+            with lock:
+                return func(*args, **kwargs)
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> str:
+            if writes is None:
+                return await _run_blocking(func, *args, **kwargs)
+            lock = _write_lock(signature.bind(*args, **kwargs).arguments[writes])
+            return await _run_blocking(locked, lock, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 # ======================================================
 # Collection Management
 # ======================================================
 
 
 @mcp.tool()
+@_blocking(writes="name")
 def create_collection(
     name: str,
     metadata: dict | None = None,
     get_or_create: bool = False,
+    hnsw: dict | None = None,
+    quantization: str | None = None,
 ) -> str:
     """
     Create a new collection.
@@ -78,33 +240,79 @@ def create_collection(
         name: Name of the collection
         metadata: Optional metadata for the collection
         get_or_create: If True, return existing collection if it exists
+        hnsw: Optional HNSW index configuration: "space" ("l2", "cosine" or "ip"),
+            "max_neighbors" (M, default 16), "ef_construction" (default 100), "ef_search"
+            (default 100), "num_threads", "batch_size", "sync_threshold" and "resize_factor".
+            Lower max_neighbors and ef values use less memory and are faster at lower recall
+        quantization: Optional side index for vector search: "int8" keeps int8-quantized
+            embeddings (4x smaller than float32) that are scanned for candidates, which are
+            then re-ranked exactly
 
     Returns:
         Success message with collection name or error message
     """
     try:
+        if quantization is not None and quantization not in QUANTIZATIONS:
+            return f"Error: Invalid quantization '{quantization}'. Must be one of: {', '.join(QUANTIZATIONS)}"
+        if quantization is not None:
+            metadata = {**(metadata or {}), QUANTIZATION_KEY: quantization}
+
         client = _get_client()
         embedding_function = _get_embedding_function()
+        configuration = {"hnsw": hnsw} if hnsw else None
+
+        with _collections_lock:
+            if get_or_create:
+                collection = client.get_or_create_collection(
+                    name=name,
+                    metadata=metadata,
+                    configuration=configuration,
+                    embedding_function=embedding_function,
+                )
+            else:
+                collection = client.create_collection(
+                    name=name,
+                    metadata=metadata,
+                    configuration=configuration,
+                    embedding_function=embedding_function,
+                )
+            _collections[name] = IndexedCollection(collection)
 
         if get_or_create:
-            collection = client.get_or_create_collection(
-                name=name,
-                metadata=metadata,
-                embedding_function=embedding_function,
-            )
             return f"Collection '{collection.name}' ready (get_or_create)"
-        else:
-            collection = client.create_collection(
-                name=name,
-                metadata=metadata,
-                embedding_function=embedding_function,
-            )
-            return f"Collection '{collection.name}' created successfully"
+        return f"Collection '{collection.name}' created successfully"
     except Exception as e:
         return f"Error: {e}"
 
 
 @mcp.tool()
+@_blocking(writes="name")
+def configure_collection(name: str, hnsw: dict) -> str:
+    """
+    Change the HNSW search configuration of a collection.
+
+    Args:
+        name: Name of the collection
+        hnsw: Settings to change: "ef_search", "num_threads", "batch_size", "sync_threshold"
+            and "resize_factor" ("space", "max_neighbors" and "ef_construction" are fixed
+            when the collection is created)
+
+    Returns:
+        Success message with the resulting configuration or error message
+    """
+    try:
+        with _collections_lock:
+            collection = _get_client().get_collection(name=name, embedding_function=_get_embedding_function())
+            collection.modify(configuration={"hnsw": hnsw})
+            # Cached results were computed with the previous settings
+            _collections.pop(name, None)
+        return f"Collection '{name}' configured: {json.dumps(collection.configuration.get('hnsw'))}"
+    except (ChromaError, ValueError) as e:
+        return f"Error: {e}"
+
+
+@mcp.tool()
+@_blocking()
 def list_collections() -> str:
     """
     List all collections.
@@ -122,6 +330,7 @@ def list_collections() -> str:
 
 
 @mcp.tool()
+@_blocking(writes="name")
 def delete_collection(name: str) -> str:
     """
     Delete a collection.
@@ -134,13 +343,19 @@ def delete_collection(name: str) -> str:
     """
     try:
         client = _get_client()
-        client.delete_collection(name=name)
+        with _collections_lock:
+            _collections.pop(name, None)
+            collection_id = client.get_collection(name=name, embedding_function=_get_embedding_function()).id
+            client.delete_collection(name=name)
+        LexicalIndex(str(collection_id)).drop()
+        QuantizedIndex(str(collection_id)).drop()
         return f"Collection '{name}' deleted successfully"
     except Exception as e:
         return f"Error: {e}"
 
 
 @mcp.tool()
+@_blocking()
 def get_collection_info(name: str) -> str:
     """
     Get collection details including count and metadata.
@@ -149,20 +364,121 @@ def get_collection_info(name: str) -> str:
         name: Name of the collection
 
     Returns:
-        JSON with collection name, count, and metadata
+        JSON with collection name, count, metadata and HNSW configuration
     """
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        collection = client.get_collection(name=name, embedding_function=embedding_function)
+        collection = _get_collection(name)
         result = {
             "name": collection.name,
             "count": collection.count(),
             "metadata": collection.metadata,
+            "hnsw": collection.configuration.get("hnsw"),
         }
         return json.dumps(result, indent=2)
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(name, e)
+
+
+@mcp.tool()
+@_blocking(writes="name")
+def export_collection(name: str, filename: str | None = None) -> str:
+    """
+    Export a collection with its embeddings to a Parquet file.
+
+    Documents are streamed in batches with their ids, metadata and embeddings, so other
+    environments can import the collection without embedding it again. Writes to the
+    collection wait until the export is complete.
+
+    Args:
+        name: Name of the collection
+        filename: File in the shared workspace (~/.mcp-servers/workspace/) to write
+            (default: vectorstore_exports/<name>.parquet)
+
+    Returns:
+        Path of the written file and document count, or error message
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        return "Error: pyarrow not installed. Run: uv sync --extra parquet"
+
+    try:
+        path = get_workspace_file(WORKSPACE, filename or f"vectorstore_exports/{name}.parquet")
+        coll = _get_collection(name)
+        header = {
+            "name": coll.name,
+            "metadata": coll.metadata,
+            "hnsw": coll.configuration.get("hnsw"),
+            "embedding_model": model_key(_get_embedding_function()),
+        }
+        count = export_parquet(coll, path, header)
+        return f"Exported {count} documents from '{name}' to {path} ({path.stat().st_size / 2**20:.1f} MB)"
+    except (ChromaError, OSError, KeyError, ValueError, pyarrow.ArrowException) as e:
+        return _collection_error(name, e)
+
+
+@mcp.tool()
+@_blocking(writes="name")
+def import_collection(file_path: str, name: str, get_or_create: bool = False) -> str:
+    """
+    Import a collection exported with export_collection, without embedding it again.
+
+    The collection is created with the exported metadata and HNSW configuration, and the
+    documents are added in batches with their exported embeddings.
+
+    Args:
+        file_path: Path to the Parquet file
+        name: Name of the collection to create
+        get_or_create: If True, add to the collection if it already exists, replacing
+            documents with the same ids
+
+    Returns:
+        Success message with document count or error message
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        return "Error: pyarrow not installed. Run: uv sync --extra parquet"
+
+    try:
+        path = Path(file_path).expanduser().resolve()
+        if not path.exists():
+            return f"Error: File not found: {path}"
+        header = read_header(path)
+
+        embedding_function = _get_embedding_function()
+        if header["embedding_model"] != model_key(embedding_function):
+            return (
+                f"Error: Collection was exported with embedding model {header['embedding_model']}, "
+                f"the server uses {model_key(embedding_function)}"
+            )
+
+        client = _get_client()
+        configuration = {"hnsw": header["hnsw"]} if header["hnsw"] else None
+        with _collections_lock:
+            if get_or_create:
+                collection = client.get_or_create_collection(
+                    name=name,
+                    metadata=header["metadata"],
+                    configuration=configuration,
+                    embedding_function=embedding_function,
+                )
+            else:
+                collection = client.create_collection(
+                    name=name,
+                    metadata=header["metadata"],
+                    configuration=configuration,
+                    embedding_function=embedding_function,
+                )
+            coll = _collections[name] = IndexedCollection(collection)
+
+        count = 0
+        for batch in iter_parquet(path):
+            coll.upsert(**batch)
+            count += len(batch["ids"])
+        return f"Imported {count} documents from {path} into collection '{name}'"
+    except (ChromaError, OSError, KeyError, ValueError, pyarrow.ArrowException) as e:
+        return _collection_error(name, e)
 
 
 # ======================================================
@@ -171,6 +487,7 @@ def get_collection_info(name: str) -> str:
 
 
 @mcp.tool()
+@_blocking(writes="collection")
 def add_documents(
     collection: str,
     documents: list[str],
@@ -190,9 +507,7 @@ def add_documents(
         Success message with count or error message
     """
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        coll = _get_collection(collection)
 
         doc_ids = ids if ids else _generate_ids(len(documents))
 
@@ -203,10 +518,11 @@ def add_documents(
         )
         return f"Added {len(documents)} document(s) to '{collection}'"
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 @mcp.tool()
+@_blocking()
 def get_documents(
     collection: str,
     ids: list[str] | None = None,
@@ -214,6 +530,9 @@ def get_documents(
     limit: int | None = None,
     offset: int | None = None,
     include: list[str] | None = None,
+    output_format: str = "json",
+    embedding_encoding: str = "list",
+    metadata_keys: list[str] | None = None,
 ) -> str:
     """
     Get documents from a collection by IDs or filters.
@@ -225,14 +544,20 @@ def get_documents(
         limit: Maximum number of results
         offset: Number of results to skip
         include: What to include in results (default: ["documents", "metadatas"])
+        output_format: "json" (indented) or "compact" (smallest JSON, fastest)
+        embedding_encoding: "list" (JSON numbers), "float32" or "float16" (base64 buffers of
+            little-endian floats, much smaller; see encoding.decode_embeddings)
+        metadata_keys: Only return these metadata keys (default: all)
 
     Returns:
         JSON with documents, metadatas, and ids
     """
+    error = _encoding_error(output_format, embedding_encoding)
+    if error:
+        return error
+
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        coll = _get_collection(collection)
 
         include_fields = include if include else ["documents", "metadatas"]
 
@@ -243,12 +568,13 @@ def get_documents(
             offset=offset,
             include=include_fields,
         )
-        return json.dumps(result, indent=2)
+        return encode_result(result, output_format, embedding_encoding, metadata_keys)
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 @mcp.tool()
+@_blocking(writes="collection")
 def update_documents(
     collection: str,
     ids: list[str],
@@ -268,9 +594,7 @@ def update_documents(
         Success message or error message
     """
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        coll = _get_collection(collection)
 
         coll.update(
             ids=ids,
@@ -279,10 +603,11 @@ def update_documents(
         )
         return f"Updated {len(ids)} document(s) in '{collection}'"
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 @mcp.tool()
+@_blocking(writes="collection")
 def upsert_documents(
     collection: str,
     documents: list[str],
@@ -302,9 +627,7 @@ def upsert_documents(
         Success message with count or error message
     """
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        coll = _get_collection(collection)
 
         coll.upsert(
             documents=documents,
@@ -313,10 +636,11 @@ def upsert_documents(
         )
         return f"Upserted {len(documents)} document(s) in '{collection}'"
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 @mcp.tool()
+@_blocking(writes="collection")
 def delete_documents(
     collection: str,
     ids: list[str] | None = None,
@@ -337,9 +661,7 @@ def delete_documents(
         if ids is None and where is None:
             return "Error: Must provide either 'ids' or 'where' filter"
 
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        coll = _get_collection(collection)
 
         coll.delete(
             ids=ids,
@@ -347,7 +669,7 @@ def delete_documents(
         )
         return f"Deleted documents from '{collection}'"
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 # ======================================================
@@ -356,6 +678,7 @@ def delete_documents(
 
 
 @mcp.tool()
+@_blocking()
 def query(
     collection: str,
     query_texts: list[str],
@@ -363,6 +686,12 @@ def query(
     where: dict | None = None,
     where_document: dict | None = None,
     include: list[str] | None = None,
+    mode: str = "vector",
+    diversity: float = 0.0,
+    dedup: bool = False,
+    output_format: str = "json",
+    embedding_encoding: str = "list",
+    metadata_keys: list[str] | None = None,
 ) -> str:
     """
     Perform similarity search on a collection.
@@ -374,27 +703,90 @@ def query(
         where: Optional metadata filter (e.g., {"category": "science"})
         where_document: Optional document content filter (e.g., {"$contains": "keyword"})
         include: What to include in results (default: ["documents", "metadatas", "distances"])
+        mode: "vector" (embedding similarity), "lexical" (BM25 keyword ranking) or "hybrid"
+            (vector and BM25 rankings fused, best for queries with names, codes or part
+            numbers). Lexical and hybrid results add "scores" (default: "vector")
+        diversity: Maximal marginal relevance re-ranking, from 0 (most relevant results, the
+            default) to 1 (least similar to each other). Around 0.5 drops near-duplicate chunks
+            while keeping relevant ones
+        dedup: If True, a document is returned only for the first of query_texts that ranks
+            it, so multi-query calls return distinct documents (default: False)
+        output_format: "json" (indented) or "compact" (smallest JSON, fastest)
+        embedding_encoding: "list" (JSON numbers), "float32" or "float16" (base64 buffers of
+            little-endian floats, one per query; see encoding.decode_embeddings)
+        metadata_keys: Only return these metadata keys (default: all)
 
     Returns:
         JSON with query results including documents, metadatas, distances, and ids
     """
     try:
-        client = _get_client()
-        embedding_function = _get_embedding_function()
-        coll = client.get_collection(name=collection, embedding_function=embedding_function)
+        if mode not in SEARCH_MODES:
+            return f"Error: Invalid mode '{mode}'. Must be one of: {', '.join(SEARCH_MODES)}"
+        if not 0.0 <= diversity <= 1.0:
+            return "Error: diversity must be between 0 and 1"
+        error = _encoding_error(output_format, embedding_encoding)
+        if error:
+            return error
+
+        coll = _get_collection(collection)
 
         include_fields = include if include else ["documents", "metadatas", "distances"]
 
-        result = coll.query(
+        # Repeated queries are answered from the collection's result cache until the next write
+        key = result_key(
             query_texts=query_texts,
             n_results=n_results,
             where=where,
             where_document=where_document,
             include=include_fields,
+            mode=mode,
+            diversity=diversity,
+            dedup=dedup,
+            output_format=output_format,
+            embedding_encoding=embedding_encoding,
+            metadata_keys=metadata_keys,
         )
-        return json.dumps(result, indent=2)
+        cached = coll.results.get(key)
+        if cached is not None:
+            return cached
+        generation = coll.results.generation
+
+        query_embeddings = None
+        if mode != "lexical":
+            query_embeddings = get_query_embedding_cache().embed(_get_embedding_function(), query_texts)
+
+        # Re-ranking picks from deeper candidate lists, with the fields it needs
+        depth, fields = n_results, include_fields
+        if diversity > 0 or dedup:
+            depth = n_results * MMR_CANDIDATE_FACTOR
+            fields = list(dict.fromkeys([*include_fields, "embeddings"])) if diversity > 0 else include_fields
+
+        if mode != "vector":
+            result = coll.search(
+                query_texts=query_texts,
+                n_results=depth,
+                mode=mode,
+                where=where,
+                where_document=where_document,
+                include=fields,
+                query_embeddings=query_embeddings,
+            )
+        else:
+            result = coll.query(
+                query_embeddings=query_embeddings,
+                n_results=depth,
+                where=where,
+                where_document=where_document,
+                include=fields,
+            )
+        if depth > n_results:
+            result = diversify(result, n_results, diversity, dedup, query_embeddings)
+            result = {field: value for field, value in result.items() if field in include_fields or field not in fields}
+        output = encode_result(result, output_format, embedding_encoding, metadata_keys, per_query=True)
+        coll.results.put(key, output, generation)
+        return output
     except Exception as e:
-        return f"Error: {e}"
+        return _collection_error(collection, e)
 
 
 # ======================================================
@@ -402,50 +794,35 @@ def query(
 # ======================================================
 
 
-def _chunk_text(
-    text: str,
-    chunk_size: int = 1000,
-    chunk_overlap: int = 200,
-) -> list[str]:
-    """Split text into overlapping chunks."""
-    if not text.strip():
-        return []
-
-    chunks = []
-    start = 0
-    text_len = len(text)
-
-    while start < text_len:
-        end = start + chunk_size
-        chunk = text[start:end]
-
-        if chunk.strip():
-            chunks.append(chunk.strip())
-
-        start = end - chunk_overlap
-        if start >= text_len:
-            break
-
-    return chunks
-
-
 @mcp.tool()
+@_blocking(writes="collection")
 def ingest_pdf(
     file_path: str,
     collection: str,
     chunk_size: int = 1000,
     chunk_overlap: int = 200,
     get_or_create: bool = True,
+    sync: bool = False,
+    chunker: str = "fixed",
 ) -> str:
     """
     Extract text from a PDF file and add it to a Chroma collection.
 
+    Pages are extracted, chunked, embedded in concurrent batches and added batch by batch,
+    so memory stays bounded for large PDFs.
+
     Args:
         file_path: Path to the PDF file
         collection: Name of the collection to add documents to
-        chunk_size: Size of each text chunk in characters (default: 1000)
-        chunk_overlap: Overlap between chunks in characters (default: 200)
+        chunk_size: Size of each text chunk, in characters for the "fixed" chunker and in
+            tokens for the "structure" chunker (default: 1000)
+        chunk_overlap: Overlap between chunks, in the same unit as chunk_size (default: 200)
         get_or_create: If True, create collection if it doesn't exist (default: True)
+        sync: If True, update a previously ingested copy of the file instead of adding it:
+            only new and changed chunks are embedded and upserted, and chunks that no
+            longer exist are deleted (default: False)
+        chunker: "fixed" (character windows per page) or "structure" (sentence, paragraph
+            and heading aware token budgets, across pages) (default: "fixed")
 
     Returns:
         Success message with count of chunks added or error message
@@ -456,65 +833,174 @@ def ingest_pdf(
             return f"Error: File not found: {path}"
         if not path.suffix.lower() == ".pdf":
             return f"Error: File is not a PDF: {path}"
+        if chunker not in CHUNKERS:
+            return f"Error: Invalid chunker '{chunker}'. Must be one of: {', '.join(CHUNKERS)}"
 
-        client = _get_client()
         embedding_function = _get_embedding_function()
+        coll = _get_collection(collection, get_or_create=get_or_create)
 
-        if get_or_create:
-            coll = client.get_or_create_collection(
-                name=collection,
-                embedding_function=embedding_function,
-            )
-        else:
-            coll = client.get_collection(
-                name=collection,
-                embedding_function=embedding_function,
-            )
-
-        doc = pymupdf.open(str(path))
         filename = path.name
+        total_pages = 0
+
+        def iter_pages() -> Iterator[tuple[int, str, int]]:
+            nonlocal total_pages
+            for page in iter_pdf_pages(path):
+                total_pages = page[2]
+                yield page
+
+        def iter_chunks() -> Iterator[Chunk]:
+            tokenizer = tokenizer_spec(embedding_function) if chunker != "fixed" else "estimate"
+            return document_chunks(filename, iter_pages(), chunk_size, chunk_overlap, chunker, tokenizer)
+
+        if sync:
+            written, unchanged, deleted = sync_chunks(coll, embedding_function, iter_chunks(), {"source": filename})
+            if not written + unchanged:
+                return f"Error: No text content found in PDF: {path}"
+            return (
+                f"Synced '{filename}' into collection '{collection}' ({total_pages} pages): "
+                f"{written} chunks added or updated, {unchanged} unchanged, {deleted} deleted"
+            )
 
-        all_chunks = []
-        all_ids = []
-        all_metadatas = []
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text()
+        count = ingest_chunks(coll.add, embedding_function, iter_chunks())
 
-            if not text.strip():
-                continue
+        if not count:
+            return f"Error: No text content found in PDF: {path}"
 
-            chunks = _chunk_text(text, chunk_size, chunk_overlap)
+        return (
+            f"Successfully ingested '{filename}' into collection '{collection}': "
+            f"{count} chunks from {total_pages} pages"
+        )
+    except Exception as e:
+        return _collection_error(collection, e)
 
-            for chunk_idx, chunk in enumerate(chunks):
-                chunk_id = f"{filename}:p{page_num + 1}:c{chunk_idx}"
-                metadata = {
-                    "source": filename,
-                    "page": page_num + 1,
-                    "chunk_index": chunk_idx,
-                    "total_pages": len(doc),
-                }
 
-                all_chunks.append(chunk)
-                all_ids.append(chunk_id)
-                all_metadatas.append(metadata)
+@mcp.tool()
+async def ingest_directory(
+    directory: str,
+    collection: str,
+    include: str = "**/*",
+    exclude: list[str] | None = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    workers: int | None = None,
+    resume: bool = True,
+    get_or_create: bool = True,
+    chunker: str = "fixed",
+    ctx: Context | None = None,
+) -> str:
+    """
+    Ingest the PDF, .txt and .md files of a directory into a Chroma collection.
 
-        total_pages = len(doc)
-        doc.close()
+    Files are extracted and chunked on a process pool, embedded in concurrent batches and
+    written in large batches. Completed files are recorded in a manifest, so running the
+    same ingestion again (e.g. after an interruption) skips unchanged files that are
+    already in the collection. Modified files replace their stored chunks. Progress is
+    reported after each write.
 
-        if not all_chunks:
-            return f"Error: No text content found in PDF: {path}"
+    Chunk ids are "{relative path}:p{page}:c{index}" and the "source" metadata is the path
+    relative to directory.
 
-        coll.add(
-            documents=all_chunks,
-            ids=all_ids,
-            metadatas=all_metadatas,
-        )
+    Args:
+        directory: Directory to ingest
+        collection: Name of the collection to add documents to
+        include: Glob pattern of the files to ingest, relative to directory (default: "**/*")
+        exclude: Patterns of relative paths to skip, e.g. ["drafts/*"] (default: None)
+        chunk_size: Size of each text chunk, in characters for the "fixed" chunker and in
+            tokens for the "structure" chunker (default: 1000)
+        chunk_overlap: Overlap between chunks, in the same unit as chunk_size (default: 200)
+        workers: Number of extraction processes (default: VECTORSTORE_EXTRACT_WORKERS)
+        resume: If True, skip files recorded as ingested by a previous run (default: True)
+        get_or_create: If True, create collection if it doesn't exist (default: True)
+        chunker: "fixed" or "structure", see ingest_pdf (default: "fixed")
 
-        return (
-            f"Successfully ingested '{filename}' into collection '{collection}': "
-            f"{len(all_chunks)} chunks from {total_pages} pages"
-        )
-    except Exception as e:
-        return f"Error: {e}"
+    Returns:
+        Summary of ingested, skipped and failed files or error message
+    """
+    try:
+        root = Path(directory).expanduser().resolve()
+        if not root.is_dir():
+            return f"Error: Directory not found: {root}"
+        if workers is not None and workers < 1:
+            return "Error: workers must be at least 1"
+        if chunker not in CHUNKERS:
+            return f"Error: Invalid chunker '{chunker}'. Must be one of: {', '.join(CHUNKERS)}"
+
+        files = await _run_blocking(find_files, root, include, exclude or [])
+        if not files:
+            return f"Error: No PDF or text files matching '{include}' in {root}"
+
+        embedding_function = await _run_blocking(_get_embedding_function)
+        coll = await _run_blocking(_get_collection, collection, get_or_create=get_or_create)
+
+        manifest = IngestManifest(str(coll.id))
+
+        def pending_files() -> list[tuple[Path, str, int, int]]:
+            completed = manifest.completed() if resume else {}
+            pending = []
+            for path in files:
+                stat = path.stat()
+                source = path.relative_to(root).as_posix()
+                if completed.get(source) != (stat.st_size, stat.st_mtime_ns):
+                    pending.append((path, source, stat.st_size, stat.st_mtime_ns))
+            return pending
+
+        pending = await _run_blocking(pending_files)
+
+        writer = BufferedWriter(coll.upsert)
+        group_chunks: list[Chunk] = []
+        group_files: list[tuple[str, int, int, int]] = []
+        ingested = chunk_count = removed = 0
+        failed: list[str] = []
+
+        def write_group() -> int:
+            with _write_lock(collection):
+                ingest_chunks(writer, embedding_function, group_chunks)
+                writer.flush()
+                # Earlier versions of modified files may have had more pages or chunks
+                sources = [source for source, _, _, _ in group_files]
+                deleted = delete_stale_chunks(coll, sources, {chunk.id for chunk in group_chunks})
+            # Files are recorded only once all their chunks are written
+            manifest.record(group_files)
+            return deleted
+
+        async def flush():
+            nonlocal ingested, chunk_count, removed
+            removed += await _run_blocking(write_group)
+            ingested += len(group_files)
+            chunk_count += len(group_chunks)
+            group_chunks.clear()
+            group_files.clear()
+            if ctx is not None:
+                await ctx.report_progress(ingested + len(failed), len(pending))
+
+        tokenizer = tokenizer_spec(embedding_function) if chunker != "fixed" else "estimate"
+        async for index, result in extract_files(
+            [(path, source) for path, source, _, _ in pending],
+            chunk_size,
+            chunk_overlap,
+            chunker,
+            tokenizer,
+            workers,
+        ):
+            _, source, size, mtime_ns = pending[index]
+            if isinstance(result, Exception):
+                failed.append(f"{source}: {result}")
+                continue
+            group_chunks.extend(result)
+            group_files.append((source, size, mtime_ns, len(result)))
+            if len(group_chunks) >= writer.batch_size:
+                await flush()
+        if group_files:
+            await flush()
+
+        lines = [f"Ingested {ingested} files ({chunk_count} chunks) from '{root}' into collection '{collection}'"]
+        if len(files) > len(pending):
+            lines.append(f"Skipped {len(files) - len(pending)} files already ingested")
+        if removed:
+            lines.append(f"Removed {removed} chunks of earlier versions of the files")
+        if failed:
+            lines.append(f"Failed {len(failed)} files:")
+            lines.extend(f"  {failure}" for failure in failed)
+        return "\n".join(lines)
+    except _INGEST_ERRORS as e:
+        return _collection_error(collection, e)
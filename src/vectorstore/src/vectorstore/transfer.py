@@ -0,0 +1,162 @@
+"""Collection export and import for the vectorstore server.
+
+A collection is exported to a Parquet file with one row per document:
+
+- ``id``: string
+- ``document``: string, null for documents stored without text
+- ``metadata``: the document's metadata as a JSON string (metadata keys differ between
+  documents), null for documents without metadata
+- ``embedding``: list of float32
+
+The file's schema metadata holds a header with the collection's name, metadata, HNSW
+configuration and embedding model, so an import can recreate the collection and check that
+its embeddings are comparable with the server's model. Embeddings are imported as they are,
+nothing is embedded again.
+
+Both directions stream the collection in batches, so memory is bounded by the batch size.
+Parquet support needs pyarrow (``uv sync --extra parquet``).
+"""
+
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from core import get_env_int
+
+# Configuration constants (configurable via environment variables)
+EXPORT_BATCH_SIZE = get_env_int("VECTORSTORE_EXPORT_BATCH_SIZE", 1024, min_value=1)  # Default: 1024 rows per batch
+
+# Schema metadata key of the header, and version of the file layout
+HEADER_KEY = b"vectorstore"
+FORMAT_VERSION = 1
+
+
+def _schema(header: dict[str, Any]) -> Any:
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            pa.field("id", pa.string(), nullable=False),
+            pa.field("document", pa.string()),
+            pa.field("metadata", pa.string()),
+            pa.field("embedding", pa.list_(pa.float32())),
+        ],
+        metadata={HEADER_KEY: json.dumps({"version": FORMAT_VERSION, **header})},
+    )
+
+
+def export_parquet(collection: Any, path: Path, header: dict[str, Any], batch_size: int | None = None) -> int:
+    """
+    Write the documents of a collection to a Parquet file, one row group per batch.
+
+    The file is written next to path and moved into place once complete. Batches are read by
+    offset, so the collection must not be written to during the export.
+
+    Args:
+        collection: Chroma collection to export
+        path: Parquet file to write
+        header: Collection details stored in the file's schema metadata
+        batch_size: Documents per batch (default: EXPORT_BATCH_SIZE)
+
+    Returns:
+        Number of exported documents
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    schema = _schema(header)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, staging = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    os.close(fd)
+    count = 0
+    try:
+        with pq.ParquetWriter(staging, schema, compression="zstd") as writer:
+            for offset in range(0, collection.count(), batch_size):
+                batch = collection.get(
+                    include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=offset
+                )
+                if not batch["ids"]:
+                    break
+                embeddings = np.asarray(batch["embeddings"], dtype=np.float32)
+                dimensions = embeddings.shape[1]
+                offsets = np.arange(0, len(embeddings) * dimensions + 1, dimensions, dtype=np.int32)
+                metadatas = batch["metadatas"] or [None] * len(batch["ids"])
+                documents = batch["documents"] or [None] * len(batch["ids"])
+                writer.write_batch(
+                    pa.record_batch(
+                        [
+                            pa.array(batch["ids"], pa.string()),
+                            pa.array(documents, pa.string()),
+                            pa.array([json.dumps(m) if m else None for m in metadatas], pa.string()),
+                            pa.ListArray.from_arrays(offsets, embeddings.ravel()),
+                        ],
+                        schema=schema,
+                    )
+                )
+                count += len(batch["ids"])
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.unlink(staging)
+    return count
+
+
+def read_header(path: Path) -> dict[str, Any]:
+    """
+    Read the collection header of an exported Parquet file.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+        ValueError: If the file is not a collection export
+    """
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    if HEADER_KEY not in metadata:
+        raise ValueError(f"Not a vectorstore collection export: {path}")
+    header = json.loads(metadata[HEADER_KEY])
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format version: {header.get('version')}")
+    return header
+
+
+def iter_parquet(path: Path, batch_size: int | None = None) -> Iterator[dict[str, Any]]:
+    """
+    Read an exported Parquet file in batches of batch_size rows (default: EXPORT_BATCH_SIZE).
+
+    Yields:
+        Dicts of ids, documents, metadatas and embeddings (a float32 array) in the shape of
+        Chroma's add arguments. Chroma rejects batches mixing documents and rows without text,
+        so the rows of a batch without a document are yielded separately, with documents None.
+        Metadatas are None if no row of the batch has any.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    import pyarrow.parquet as pq
+
+    with pq.ParquetFile(path) as parquet:
+        for batch in parquet.iter_batches(batch_size=batch_size or EXPORT_BATCH_SIZE):
+            texts = batch.column("document")
+            if 0 < texts.null_count < len(batch):
+                parts = [batch.filter(texts.is_valid()), batch.filter(texts.is_null())]
+            else:
+                parts = [batch]
+            for part in parts:
+                documents = part.column("document")
+                metadatas = [json.loads(m) if m else None for m in part.column("metadata").to_pylist()]
+                yield {
+                    "ids": part.column("id").to_pylist(),
+                    "documents": documents.to_pylist() if documents.null_count == 0 else None,
+                    "metadatas": metadatas if any(metadatas) else None,
+                    "embeddings": part.column("embedding").flatten().to_numpy().reshape(len(part), -1),
+                }
@@ -1,5 +1,9 @@
+import hashlib
 import os
+
+import numpy as np
 import pytest
+from chromadb.api.types import EmbeddingFunction
 
 
 @pytest.fixture(scope="function")
@@ -20,11 +24,71 @@ def temp_chroma_path(tmp_path):
 
     tools._client = None
     tools._embedding_function = None
+    tools._collections.clear()
     # Clean up environment
     if "EMBEDDING_TYPE" in os.environ:
         del os.environ["EMBEDDING_TYPE"]
 
 
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Redirect the shared workspace to a temporary directory."""
+    from core import workspace
+
+    monkeypatch.setattr(workspace, "MCP_SERVERS_BASE", tmp_path / ".mcp-servers")
+    return workspace.get_workspace(workspace.WORKSPACE)
+
+
+@pytest.fixture(autouse=True)
+def embedding_cache(tmp_path, monkeypatch):
+    """Use an isolated embedding cache for each test."""
+    from vectorstore import embedding_cache
+
+    cache = embedding_cache.EmbeddingCache(str(tmp_path / "vectorstore_embedding_cache.db"))
+    monkeypatch.setattr(embedding_cache, "_embedding_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def manifest_dir(tmp_path, monkeypatch):
+    """Keep ingest manifests of each test in its temporary directory."""
+    from vectorstore import ingest
+
+    path = tmp_path / "vectorstore_manifests"
+    monkeypatch.setattr(ingest, "manifest_dir", lambda: path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def lexical_index_dir(tmp_path, monkeypatch):
+    """Keep lexical indexes of each test in its temporary directory."""
+    from vectorstore import lexical
+
+    path = tmp_path / "vectorstore_lexical"
+    monkeypatch.setattr(lexical, "lexical_index_dir", lambda: path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def quantized_index_dir(tmp_path, monkeypatch):
+    """Keep quantized indexes of each test in its temporary directory."""
+    from vectorstore import quantization
+
+    path = tmp_path / "vectorstore_quantized"
+    monkeypatch.setattr(quantization, "quantized_index_dir", lambda: path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def query_embedding_cache(monkeypatch):
+    """Use an empty query embedding cache for each test."""
+    from vectorstore import query_cache
+
+    cache = query_cache.QueryEmbeddingCache()
+    monkeypatch.setattr(query_cache, "_query_embedding_cache", cache)
+    return cache
+
+
 @pytest.fixture
 def sample_collection(temp_chroma_path):
     """Create a sample collection with test documents."""
@@ -47,3 +111,81 @@ def sample_collection(temp_chroma_path):
         ids=["doc1", "doc2", "doc3"],
     )
     return collection
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic bag-of-words embeddings, so tests need neither network nor model downloads."""
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+        self.calls: list[list[str]] = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm else vector)
+        return embeddings
+
+    @staticmethod
+    def name() -> str:
+        return "hash"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(config["dimensions"])
+
+
+@pytest.fixture
+def hash_embeddings(temp_chroma_path, monkeypatch):
+    """Use HashEmbeddingFunction as the configured embedding function."""
+    from vectorstore import tools
+
+    embedding_function = HashEmbeddingFunction()
+    monkeypatch.setattr(tools, "_embedding_function", embedding_function)
+    return embedding_function
+
+
+@pytest.fixture(scope="session")
+def sample_pdf(tmp_path_factory):
+    """Create a PDF with three pages of text."""
+    import pymupdf
+
+    pdf_path = tmp_path_factory.mktemp("data") / "sample.pdf"
+    doc = pymupdf.open()
+    for n in range(1, 4):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {n} discusses topic{n} in detail.")
+        page.insert_text((72, 92), "Shared closing sentence on every page.")
+    doc.save(pdf_path)
+    doc.close()
+    return pdf_path
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Create a directory of PDF, text and other files."""
+    import pymupdf
+
+    root = tmp_path / "corpus"
+    (root / "notes").mkdir(parents=True)
+    (root / "drafts").mkdir()
+
+    doc = pymupdf.open()
+    for n in range(1, 3):
+        doc.new_page().insert_text((72, 72), f"Report page {n}")
+    doc.save(root / "report.pdf")
+    doc.close()
+
+    (root / "notes" / "meeting.txt").write_text("Meeting notes about the budget")
+    (root / "notes" / "plan.md").write_text("# Plan\n\nShip the release")
+    (root / "drafts" / "draft.txt").write_text("Unfinished draft")
+    (root / "data.csv").write_text("a,b\n1,2\n")
+    return root
@@ -1,5 +1,11 @@
+import asyncio
 import json
 
+import numpy as np
+import pymupdf
+import pytest
+import pytest_asyncio
+
 from vectorstore import mcp
 
 
@@ -9,54 +15,60 @@ def get_tool(name: str):
 
 
 class TestCreateCollection:
-    def test_create_collection(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_create_collection(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        result = create_collection(name="my_collection")
+        result = await create_collection(name="my_collection")
 
         assert "created successfully" in result
         assert "my_collection" in result
 
-    def test_create_collection_with_metadata(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_create_collection_with_metadata(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        result = create_collection(
+        result = await create_collection(
             name="my_collection",
             metadata={"description": "Test collection"},
         )
 
         assert "created successfully" in result
 
-    def test_create_existing_collection_error(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_create_existing_collection_error(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="my_collection")
+        await create_collection(name="my_collection")
 
-        result = create_collection(name="my_collection")
+        result = await create_collection(name="my_collection")
         assert "Error" in result
 
-    def test_get_or_create(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_or_create(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="my_collection")
+        await create_collection(name="my_collection")
 
-        result = create_collection(name="my_collection", get_or_create=True)
+        result = await create_collection(name="my_collection", get_or_create=True)
         assert "ready" in result
         assert "Error" not in result
 
 
 class TestListCollections:
-    def test_list_empty(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_list_empty(self, temp_chroma_path):
         list_collections = get_tool("list_collections")
-        result = list_collections()
+        result = await list_collections()
 
         data = json.loads(result)
         assert isinstance(data, list)
         assert len(data) == 0
 
-    def test_list_multiple(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_list_multiple(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="collection1")
-        create_collection(name="collection2")
+        await create_collection(name="collection1")
+        await create_collection(name="collection2")
 
         list_collections = get_tool("list_collections")
-        result = list_collections()
+        result = await list_collections()
 
         data = json.loads(result)
         assert len(data) == 2
@@ -66,59 +78,301 @@ class TestListCollections:
 
 
 class TestDeleteCollection:
-    def test_delete_existing(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_delete_existing(self, sample_collection, temp_chroma_path):
         delete_collection = get_tool("delete_collection")
-        result = delete_collection(name="test_collection")
+        result = await delete_collection(name="test_collection")
 
         assert "deleted successfully" in result
 
         # Verify it's gone
         list_collections = get_tool("list_collections")
-        data = json.loads(list_collections())
+        data = json.loads(await list_collections())
         assert len(data) == 0
 
-    def test_delete_nonexistent(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_delete_nonexistent(self, temp_chroma_path):
         delete_collection = get_tool("delete_collection")
-        result = delete_collection(name="nonexistent")
+        result = await delete_collection(name="nonexistent")
 
         assert "Error" in result
 
 
 class TestGetCollectionInfo:
-    def test_get_info(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_info(self, sample_collection, temp_chroma_path):
         get_collection_info = get_tool("get_collection_info")
-        result = get_collection_info(name="test_collection")
+        result = await get_collection_info(name="test_collection")
 
         data = json.loads(result)
         assert data["name"] == "test_collection"
         assert data["count"] == 3
 
-    def test_info_nonexistent(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_info_nonexistent(self, temp_chroma_path):
         get_collection_info = get_tool("get_collection_info")
-        result = get_collection_info(name="nonexistent")
+        result = await get_collection_info(name="nonexistent")
 
         assert "Error" in result
 
 
+class TestCollectionCache:
+    @pytest.mark.asyncio
+    async def test_handle_is_looked_up_once(self, hash_embeddings, monkeypatch):
+        from vectorstore import tools
+
+        client = tools._get_client()
+        await get_tool("create_collection")(name="cached")
+        lookups = []
+        get_collection = client.get_collection
+        monkeypatch.setattr(
+            client, "get_collection", lambda **kwargs: lookups.append(kwargs) or get_collection(**kwargs)
+        )
+
+        await get_tool("add_documents")(collection="cached", documents=["alpha", "beta"], ids=["a", "b"])
+        await get_tool("query")(collection="cached", query_texts=["alpha"], n_results=1)
+        await get_tool("get_collection_info")(name="cached")
+
+        assert lookups == []
+
+    @pytest.mark.asyncio
+    async def test_recreated_collection_is_not_stale(self, hash_embeddings):
+        add_documents = get_tool("add_documents")
+        await get_tool("create_collection")(name="cached")
+        await add_documents(collection="cached", documents=["alpha"], ids=["a"])
+
+        await get_tool("delete_collection")(name="cached")
+        assert "Error" in await add_documents(collection="cached", documents=["beta"], ids=["b"])
+        await get_tool("create_collection")(name="cached")
+        await add_documents(collection="cached", documents=["beta"], ids=["b"])
+
+        assert json.loads(await get_tool("get_collection_info")(name="cached"))["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_collection_deleted_by_another_client(self, hash_embeddings, temp_chroma_path):
+        import chromadb
+
+        await get_tool("create_collection")(name="cached")
+        get_collection_info = get_tool("get_collection_info")
+        await get_collection_info(name="cached")
+
+        other = chromadb.PersistentClient(path=str(temp_chroma_path))
+        other.delete_collection("cached")
+        other.create_collection("cached", embedding_function=hash_embeddings)
+
+        assert "does not exist" in await get_collection_info(name="cached")
+        assert json.loads(await get_collection_info(name="cached"))["count"] == 0
+
+
+class TestExecutor:
+    @pytest_asyncio.fixture
+    async def blocked_writes(self, hash_embeddings, monkeypatch):
+        """Make writes to the "shared" collection wait until release is set, recording overlapping writes."""
+        import threading
+        from types import SimpleNamespace
+
+        from vectorstore import tools
+
+        await get_tool("create_collection")(name="shared")
+        collection = tools._get_collection("shared").collection
+        release = threading.Event()
+        active, overlaps = [], []
+        add = collection.add
+
+        def blocking_add(**kwargs):
+            active.append(kwargs["ids"])
+            overlaps.append(len(active))
+            release.wait(5)
+            add(**kwargs)
+            active.pop()
+
+        monkeypatch.setattr(collection, "add", blocking_add)
+        return SimpleNamespace(release=release, overlaps=overlaps)
+
+    def test_tools_are_async(self):
+        import inspect
+
+        for name in mcp._tool_manager._tools:
+            assert inspect.iscoroutinefunction(get_tool(name)), name
+
+    @pytest.mark.asyncio
+    async def test_tool_parameters_are_kept(self):
+        tool = await mcp.get_tool("add_documents")
+        assert set(tool.parameters["properties"]) == {"collection", "documents", "ids", "metadatas"}
+
+    @pytest.mark.asyncio
+    async def test_reads_run_during_writes(self, blocked_writes):
+        write = asyncio.create_task(get_tool("add_documents")(collection="shared", documents=["alpha"], ids=["a"]))
+        await asyncio.sleep(0.1)
+
+        data = json.loads(await asyncio.wait_for(get_tool("get_documents")(collection="shared"), 5))
+        assert data["ids"] == []
+        assert not write.done()
+
+        blocked_writes.release.set()
+        assert "Added 1" in await write
+
+    @pytest.mark.asyncio
+    async def test_writes_to_a_collection_are_serialized(self, blocked_writes):
+        add_documents = get_tool("add_documents")
+        writes = [
+            asyncio.create_task(add_documents(collection="shared", documents=[text], ids=[text]))
+            for text in ("alpha", "beta", "gamma")
+        ]
+        await asyncio.sleep(0.1)
+        blocked_writes.release.set()
+        await asyncio.gather(*writes)
+
+        assert blocked_writes.overlaps == [1, 1, 1]
+        assert json.loads(await get_tool("get_collection_info")(name="shared"))["count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_writes_to_other_collections_proceed(self, blocked_writes):
+        write = asyncio.create_task(get_tool("add_documents")(collection="shared", documents=["alpha"], ids=["a"]))
+        await asyncio.sleep(0.1)
+
+        await asyncio.wait_for(get_tool("create_collection")(name="other"), 5)
+        result = await asyncio.wait_for(get_tool("add_documents")(collection="other", documents=["beta"], ids=["b"]), 5)
+        assert "Added 1" in result
+        assert not write.done()
+
+        blocked_writes.release.set()
+        await write
+
+
+class TestExportImport:
+    @pytest_asyncio.fixture
+    async def exported(self, hash_embeddings, workspace):
+        pytest.importorskip("pyarrow")
+        await get_tool("create_collection")(name="source", metadata={"team": "docs"}, hnsw={"space": "cosine"})
+        await get_tool("add_documents")(
+            collection="source",
+            documents=[f"document number {n}" for n in range(25)],
+            ids=[f"doc{n}" for n in range(25)],
+            metadatas=[{"n": n, "even": n % 2 == 0} if n else None for n in range(25)],
+        )
+        result = await get_tool("export_collection")(name="source")
+        assert "Exported 25 documents" in result
+        return workspace / "vectorstore_exports" / "source.parquet"
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, exported, hash_embeddings):
+        from vectorstore import tools
+
+        hash_embeddings.calls.clear()
+        result = await get_tool("import_collection")(file_path=str(exported), name="copy")
+        assert "Imported 25 documents" in result
+        assert hash_embeddings.calls == []
+
+        include = ["documents", "metadatas", "embeddings"]
+        source = tools._get_collection("source").get(include=include)
+        copy = tools._get_collection("copy").get(include=include)
+        assert copy["ids"] == source["ids"]
+        assert copy["documents"] == source["documents"]
+        assert copy["metadatas"] == source["metadatas"]
+        np.testing.assert_allclose(copy["embeddings"], source["embeddings"])
+
+        info = json.loads(await get_tool("get_collection_info")(name="copy"))
+        assert info["metadata"] == {"team": "docs"}
+        assert info["hnsw"]["space"] == "cosine"
+
+    @pytest.mark.asyncio
+    async def test_transfer_is_batched(self, exported, hash_embeddings, monkeypatch):
+        import pyarrow.parquet as pq
+
+        from vectorstore import transfer
+
+        monkeypatch.setattr(transfer, "EXPORT_BATCH_SIZE", 10)
+        await get_tool("export_collection")(name="source", filename="batched.parquet")
+        path = exported.parent.parent / "batched.parquet"
+
+        assert pq.ParquetFile(path).metadata.num_row_groups == 3
+        assert [len(batch["ids"]) for batch in transfer.iter_parquet(path)] == [10, 10, 5]
+
+    @pytest.mark.asyncio
+    async def test_import_documents_without_text(self, exported, hash_embeddings):
+        from vectorstore import tools, transfer
+
+        tools._get_collection("source").upsert(ids=["bare"], embeddings=hash_embeddings(["bare"]))
+        await get_tool("export_collection")(name="source", filename="bare.parquet")
+        path = exported.parent.parent / "bare.parquet"
+
+        assert [batch["documents"] is None for batch in transfer.iter_parquet(path)] == [False, True]
+        result = await get_tool("import_collection")(file_path=str(path), name="copy")
+        assert "Imported 26 documents" in result
+        copy = tools._get_collection("copy").get(ids=["bare", "doc1"], include=["documents"])
+        assert dict(zip(copy["ids"], copy["documents"])) == {"bare": None, "doc1": "document number 1"}
+
+    @pytest.mark.asyncio
+    async def test_export_holds_write_lock(self, exported):
+        from vectorstore import tools
+
+        lock = tools._write_lock("source")
+        with lock:
+            export = asyncio.create_task(get_tool("export_collection")(name="source"))
+            await asyncio.sleep(0.1)
+            assert not export.done()
+        assert "Exported 25 documents" in await asyncio.wait_for(export, 5)
+
+    @pytest.mark.asyncio
+    async def test_import_existing_collection(self, exported):
+        import_collection = get_tool("import_collection")
+
+        assert "Error" in await import_collection(file_path=str(exported), name="source")
+        result = await import_collection(file_path=str(exported), name="source", get_or_create=True)
+        assert "Imported 25 documents" in result
+        assert json.loads(await get_tool("get_collection_info")(name="source"))["count"] == 25
+
+    @pytest.mark.asyncio
+    async def test_import_with_other_embedding_model(self, exported, hash_embeddings):
+        hash_embeddings.dimensions = 32
+        result = await get_tool("import_collection")(file_path=str(exported), name="copy")
+
+        assert "Error: Collection was exported with embedding model" in result
+
+    @pytest.mark.asyncio
+    async def test_import_errors(self, hash_embeddings, tmp_path):
+        import_collection = get_tool("import_collection")
+        assert "Error: File not found" in await import_collection(file_path=str(tmp_path / "missing.parquet"), name="x")
+
+        pytest.importorskip("pyarrow")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table({"a": [1]}), tmp_path / "other.parquet")
+        result = await import_collection(file_path=str(tmp_path / "other.parquet"), name="other")
+        assert "Error: Not a vectorstore collection export" in result
+
+    @pytest.mark.asyncio
+    async def test_export_path_stays_in_workspace(self, hash_embeddings, workspace):
+        pytest.importorskip("pyarrow")
+        await get_tool("create_collection")(name="source")
+
+        result = await get_tool("export_collection")(name="source", filename="../escape.parquet")
+        assert "Error: Path traversal not allowed" in result
+
+
 class TestAddDocuments:
-    def test_add_with_auto_ids(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_add_with_auto_ids(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="test_collection")
+        await create_collection(name="test_collection")
 
         add_documents = get_tool("add_documents")
-        result = add_documents(
+        result = await add_documents(
             collection="test_collection",
             documents=["Doc 1", "Doc 2"],
         )
 
         assert "Added 2 document(s)" in result
 
-    def test_add_with_custom_ids(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_add_with_custom_ids(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="test_collection")
+        await create_collection(name="test_collection")
 
         add_documents = get_tool("add_documents")
-        result = add_documents(
+        result = await add_documents(
             collection="test_collection",
             documents=["Doc 1", "Doc 2"],
             ids=["id1", "id2"],
@@ -126,12 +380,13 @@ class TestAddDocuments:
 
         assert "Added 2 document(s)" in result
 
-    def test_add_with_metadata(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_add_with_metadata(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="test_collection")
+        await create_collection(name="test_collection")
 
         add_documents = get_tool("add_documents")
-        result = add_documents(
+        result = await add_documents(
             collection="test_collection",
             documents=["Doc 1"],
             ids=["id1"],
@@ -140,9 +395,10 @@ class TestAddDocuments:
 
         assert "Added 1 document(s)" in result
 
-    def test_add_to_nonexistent_collection(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_add_to_nonexistent_collection(self, temp_chroma_path):
         add_documents = get_tool("add_documents")
-        result = add_documents(
+        result = await add_documents(
             collection="nonexistent",
             documents=["Doc 1"],
         )
@@ -151,9 +407,10 @@ class TestAddDocuments:
 
 
 class TestGetDocuments:
-    def test_get_by_ids(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_by_ids(self, sample_collection, temp_chroma_path):
         get_documents = get_tool("get_documents")
-        result = get_documents(
+        result = await get_documents(
             collection="test_collection",
             ids=["doc1", "doc2"],
         )
@@ -163,16 +420,18 @@ class TestGetDocuments:
         assert "doc1" in data["ids"]
         assert "doc2" in data["ids"]
 
-    def test_get_all(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_all(self, sample_collection, temp_chroma_path):
         get_documents = get_tool("get_documents")
-        result = get_documents(collection="test_collection")
+        result = await get_documents(collection="test_collection")
 
         data = json.loads(result)
         assert len(data["ids"]) == 3
 
-    def test_get_with_where_filter(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_with_where_filter(self, sample_collection, temp_chroma_path):
         get_documents = get_tool("get_documents")
-        result = get_documents(
+        result = await get_documents(
             collection="test_collection",
             where={"type": "feline"},
         )
@@ -181,9 +440,10 @@ class TestGetDocuments:
         assert len(data["ids"]) == 1
         assert "doc1" in data["ids"]
 
-    def test_get_with_limit(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_get_with_limit(self, sample_collection, temp_chroma_path):
         get_documents = get_tool("get_documents")
-        result = get_documents(
+        result = await get_documents(
             collection="test_collection",
             limit=2,
         )
@@ -193,9 +453,10 @@ class TestGetDocuments:
 
 
 class TestUpdateDocuments:
-    def test_update_document(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_update_document(self, sample_collection, temp_chroma_path):
         update_documents = get_tool("update_documents")
-        result = update_documents(
+        result = await update_documents(
             collection="test_collection",
             ids=["doc1"],
             documents=["Updated document about cats"],
@@ -205,12 +466,13 @@ class TestUpdateDocuments:
 
         # Verify update
         get_documents = get_tool("get_documents")
-        data = json.loads(get_documents(collection="test_collection", ids=["doc1"]))
+        data = json.loads(await get_documents(collection="test_collection", ids=["doc1"]))
         assert "Updated document" in data["documents"][0]
 
-    def test_update_metadata(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_update_metadata(self, sample_collection, temp_chroma_path):
         update_documents = get_tool("update_documents")
-        result = update_documents(
+        result = await update_documents(
             collection="test_collection",
             ids=["doc1"],
             metadatas=[{"category": "pets", "type": "feline"}],
@@ -220,12 +482,13 @@ class TestUpdateDocuments:
 
 
 class TestUpsertDocuments:
-    def test_upsert_new(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_upsert_new(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="test_collection")
+        await create_collection(name="test_collection")
 
         upsert_documents = get_tool("upsert_documents")
-        result = upsert_documents(
+        result = await upsert_documents(
             collection="test_collection",
             documents=["New document"],
             ids=["new_id"],
@@ -235,12 +498,13 @@ class TestUpsertDocuments:
 
         # Verify insertion
         get_documents = get_tool("get_documents")
-        data = json.loads(get_documents(collection="test_collection"))
+        data = json.loads(await get_documents(collection="test_collection"))
         assert len(data["ids"]) == 1
 
-    def test_upsert_existing(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_upsert_existing(self, sample_collection, temp_chroma_path):
         upsert_documents = get_tool("upsert_documents")
-        result = upsert_documents(
+        result = await upsert_documents(
             collection="test_collection",
             documents=["Updated via upsert"],
             ids=["doc1"],
@@ -250,14 +514,15 @@ class TestUpsertDocuments:
 
         # Verify update (count should still be 3)
         get_collection_info = get_tool("get_collection_info")
-        data = json.loads(get_collection_info(name="test_collection"))
+        data = json.loads(await get_collection_info(name="test_collection"))
         assert data["count"] == 3
 
 
 class TestDeleteDocuments:
-    def test_delete_by_ids(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_delete_by_ids(self, sample_collection, temp_chroma_path):
         delete_documents = get_tool("delete_documents")
-        result = delete_documents(
+        result = await delete_documents(
             collection="test_collection",
             ids=["doc1"],
         )
@@ -266,12 +531,13 @@ class TestDeleteDocuments:
 
         # Verify deletion
         get_collection_info = get_tool("get_collection_info")
-        data = json.loads(get_collection_info(name="test_collection"))
+        data = json.loads(await get_collection_info(name="test_collection"))
         assert data["count"] == 2
 
-    def test_delete_by_where(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_delete_by_where(self, sample_collection, temp_chroma_path):
         delete_documents = get_tool("delete_documents")
-        result = delete_documents(
+        result = await delete_documents(
             collection="test_collection",
             where={"type": "feline"},
         )
@@ -280,21 +546,23 @@ class TestDeleteDocuments:
 
         # Verify deletion
         get_collection_info = get_tool("get_collection_info")
-        data = json.loads(get_collection_info(name="test_collection"))
+        data = json.loads(await get_collection_info(name="test_collection"))
         assert data["count"] == 2
 
-    def test_delete_no_filter_error(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_delete_no_filter_error(self, sample_collection, temp_chroma_path):
         delete_documents = get_tool("delete_documents")
-        result = delete_documents(collection="test_collection")
+        result = await delete_documents(collection="test_collection")
 
         assert "Error" in result
         assert "ids" in result or "where" in result
 
 
 class TestQuery:
-    def test_basic_query(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_basic_query(self, sample_collection, temp_chroma_path):
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="test_collection",
             query_texts=["cats"],
         )
@@ -305,9 +573,10 @@ class TestQuery:
         assert len(data["ids"]) == 1
         assert len(data["ids"][0]) > 0
 
-    def test_query_with_n_results(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_query_with_n_results(self, sample_collection, temp_chroma_path):
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="test_collection",
             query_texts=["animals"],
             n_results=2,
@@ -316,9 +585,10 @@ class TestQuery:
         data = json.loads(result)
         assert len(data["ids"][0]) == 2
 
-    def test_query_with_where(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_query_with_where(self, sample_collection, temp_chroma_path):
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="test_collection",
             query_texts=["animals"],
             n_results=10,
@@ -329,9 +599,10 @@ class TestQuery:
         # Should only return the cat document
         assert len(data["ids"][0]) == 1
 
-    def test_query_with_where_document(self, sample_collection, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_query_with_where_document(self, sample_collection, temp_chroma_path):
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="test_collection",
             query_texts=["animals"],
             n_results=10,
@@ -342,12 +613,13 @@ class TestQuery:
         # Should only return the dog training document
         assert len(data["ids"][0]) == 1
 
-    def test_query_empty_collection(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_query_empty_collection(self, temp_chroma_path):
         create_collection = get_tool("create_collection")
-        create_collection(name="empty_collection")
+        await create_collection(name="empty_collection")
 
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="empty_collection",
             query_texts=["test"],
         )
@@ -355,11 +627,1065 @@ class TestQuery:
         data = json.loads(result)
         assert len(data["ids"][0]) == 0
 
-    def test_query_nonexistent_collection(self, temp_chroma_path):
+    @pytest.mark.asyncio
+    async def test_query_nonexistent_collection(self, temp_chroma_path):
         query = get_tool("query")
-        result = query(
+        result = await query(
             collection="nonexistent",
             query_texts=["test"],
         )
 
         assert "Error" in result
+
+
+class TestHybridQuery:
+    @pytest_asyncio.fixture
+    async def parts(self, hash_embeddings):
+        await get_tool("create_collection")(name="parts")
+        await get_tool("add_documents")(
+            collection="parts",
+            documents=[
+                "Replacement pump model XJ-9000 installation guide",
+                "General maintenance of pumps and valves",
+                "Valve XJ-9001 spare parts list",
+            ],
+            ids=["pump", "maintenance", "valve"],
+            metadatas=[{"kind": "guide"}, {"kind": "guide"}, {"kind": "list"}],
+        )
+        return "parts"
+
+    @pytest.mark.asyncio
+    async def test_lexical_matches_exact_terms(self, parts):
+        data = json.loads(await get_tool("query")(collection=parts, query_texts=["XJ-9000"], mode="lexical"))
+
+        assert data["ids"] == [["pump"]]
+        assert data["documents"][0][0].startswith("Replacement pump")
+        assert data["scores"][0][0] > 0
+
+    @pytest.mark.asyncio
+    async def test_hybrid_fuses_rankings(self, parts):
+        from vectorstore.lexical import RRF_K
+
+        data = json.loads(
+            await get_tool("query")(collection=parts, query_texts=["XJ-9000 pump"], n_results=2, mode="hybrid")
+        )
+
+        # First in both rankings
+        assert data["ids"][0][0] == "pump"
+        assert data["scores"][0][0] == pytest.approx(2 / (RRF_K + 1))
+        assert len(data["distances"][0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_to_lexical_results(self, parts):
+        data = json.loads(
+            await get_tool("query")(
+                collection=parts, query_texts=["XJ-9000 XJ-9001"], where={"kind": "list"}, mode="lexical"
+            )
+        )
+
+        assert data["ids"] == [["valve"]]
+
+    @pytest.mark.asyncio
+    async def test_filters_apply_before_lexical_ranking(self, parts, monkeypatch):
+        from vectorstore import lexical
+
+        # The best BM25 match is filtered out, it must not use up the candidates
+        monkeypatch.setattr(lexical, "HYBRID_CANDIDATES", 1)
+        data = json.loads(
+            await get_tool("query")(
+                collection=parts,
+                query_texts=["pump XJ-9000 XJ-9001"],
+                n_results=1,
+                where={"kind": "list"},
+                mode="lexical",
+            )
+        )
+
+        assert data["ids"] == [["valve"]]
+
+    @pytest.mark.asyncio
+    async def test_index_follows_writes(self, parts, monkeypatch):
+        from vectorstore.lexical import LexicalIndex
+
+        query = get_tool("query")
+        await query(collection=parts, query_texts=["pump"], mode="lexical")
+        rebuilds = []
+        rebuild = LexicalIndex.rebuild
+        monkeypatch.setattr(LexicalIndex, "rebuild", lambda self, c: rebuilds.append(c) or rebuild(self, c))
+
+        await get_tool("add_documents")(collection=parts, documents=["Compressor ZK-12 manual"], ids=["compressor"])
+        await get_tool("upsert_documents")(collection=parts, documents=["Valve YQ-7 spare parts list"], ids=["valve"])
+        await get_tool("delete_documents")(collection=parts, where={"kind": "guide"})
+
+        async def lexical(text):
+            return json.loads(await query(collection=parts, query_texts=[text], mode="lexical"))["ids"][0]
+
+        assert await lexical("ZK-12") == ["compressor"]
+        assert await lexical("YQ-7") == ["valve"]
+        assert await lexical("XJ-9001") == []
+        assert await lexical("pump") == []
+        assert rebuilds == []
+
+    @pytest.mark.asyncio
+    async def test_index_is_rebuilt_after_external_writes(self, parts):
+        from vectorstore import tools
+
+        query = get_tool("query")
+        await query(collection=parts, query_texts=["pump"], mode="lexical")
+        tools._get_client().get_collection(parts).delete(ids=["pump"])
+
+        data = json.loads(await query(collection=parts, query_texts=["XJ-9000 XJ-9001"], mode="lexical"))
+        assert data["ids"] == [["valve"]]
+
+    @pytest.mark.asyncio
+    async def test_delete_collection_drops_index(self, parts, lexical_index_dir):
+        await get_tool("query")(collection=parts, query_texts=["pump"], mode="lexical")
+        assert list(lexical_index_dir.glob("*.db"))
+
+        await get_tool("delete_collection")(name=parts)
+        assert not list(lexical_index_dir.glob("*.db"))
+
+    @pytest.mark.asyncio
+    async def test_invalid_mode(self, parts):
+        assert "Error: Invalid mode" in await get_tool("query")(collection=parts, query_texts=["pump"], mode="fuzzy")
+
+    def test_reciprocal_rank_fusion(self):
+        from vectorstore.lexical import fts_query, reciprocal_rank_fusion
+
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=1)
+        assert [id_ for id_, _ in fused] == ["a", "c", "b"]
+        assert fused[0][1] == pytest.approx(1 / 2 + 1 / 3)
+        assert fts_query('say "hi" - AB-12') == '"say" OR """hi""" OR "AB-12"'
+
+
+class TestQueryCache:
+    @pytest_asyncio.fixture
+    async def animals(self, hash_embeddings):
+        await get_tool("create_collection")(name="animals")
+        await get_tool("add_documents")(
+            collection="animals", documents=["cats purr", "dogs bark", "birds sing"], ids=["cat", "dog", "bird"]
+        )
+        hash_embeddings.calls.clear()
+        return "animals"
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_cached(self, animals, hash_embeddings, monkeypatch):
+        from vectorstore import tools
+
+        query = get_tool("query")
+        first = await query(collection=animals, query_texts=["cats"], n_results=2)
+        searches = []
+        collection = tools._get_collection(animals).collection
+        monkeypatch.setattr(collection, "query", lambda **kwargs: searches.append(kwargs))
+
+        assert await query(collection=animals, query_texts=["cats"], n_results=2) == first
+        assert searches == []
+        assert hash_embeddings.calls == [["cats"]]
+
+    @pytest.mark.asyncio
+    async def test_query_embeddings_are_reused(self, animals, hash_embeddings):
+        query = get_tool("query")
+        await query(collection=animals, query_texts=["cats"], n_results=1)
+        await query(collection=animals, query_texts=["cats", "dogs"], n_results=2, mode="hybrid")
+
+        assert hash_embeddings.calls == [["cats"], ["dogs"]]
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_results(self, animals):
+        query = get_tool("query")
+        before = json.loads(await query(collection=animals, query_texts=["cows moo"], n_results=1))
+        await get_tool("add_documents")(collection=animals, documents=["cows moo"], ids=["cow"])
+        after = json.loads(await query(collection=animals, query_texts=["cows moo"], n_results=1))
+
+        assert before["ids"] != [["cow"]]
+        assert after["ids"] == [["cow"]]
+
+    def test_results_expire(self, monkeypatch):
+        from vectorstore import query_cache
+
+        now = [100.0]
+        monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+        cache = query_cache.ResultCache(ttl=30, max_size=2)
+        cache.put("a", "result")
+        now[0] += 29
+        assert cache.get("a") == "result"
+        now[0] += 1
+        assert cache.get("a") is None
+
+    def test_results_computed_before_a_write_are_not_cached(self):
+        from vectorstore.query_cache import ResultCache
+
+        cache = ResultCache(ttl=30)
+        generation = cache.generation
+        cache.clear()
+        cache.put("a", "stale", generation)
+
+        assert cache.get("a") is None
+
+    def test_query_embedding_cache_evicts_least_recently_used(self, hash_embeddings):
+        from vectorstore.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_size=2)
+        cache.embed(hash_embeddings, ["one", "two"])
+        cache.embed(hash_embeddings, ["one", "three"])
+        cache.embed(hash_embeddings, ["one", "two"])
+
+        assert hash_embeddings.calls == [["one", "two"], ["three"], ["two"]]
+
+
+class TestQuantization:
+    @pytest_asyncio.fixture
+    async def vectors(self, hash_embeddings):
+        documents = [f"topic{n % 7} item{n} shared" for n in range(60)]
+        ids = [f"doc{n}" for n in range(60)]
+        metadatas = [{"parity": n % 2} for n in range(60)]
+        for name, quantization in (("exact", None), ("quantized", "int8")):
+            await get_tool("create_collection")(name=name, hnsw={"space": "cosine"}, quantization=quantization)
+            await get_tool("add_documents")(collection=name, documents=documents, ids=ids, metadatas=metadatas)
+        return documents
+
+    @pytest.mark.asyncio
+    async def test_create_with_hnsw_configuration(self, hash_embeddings):
+        result = await get_tool("create_collection")(name="tuned", hnsw={"space": "cosine", "max_neighbors": 8})
+        assert "created successfully" in result
+
+        info = json.loads(await get_tool("get_collection_info")(name="tuned"))
+        assert info["hnsw"]["space"] == "cosine"
+        assert info["hnsw"]["max_neighbors"] == 8
+
+    @pytest.mark.asyncio
+    async def test_invalid_hnsw_configuration(self, hash_embeddings):
+        result = await get_tool("create_collection")(name="tuned", hnsw={"neighbours": 8})
+        assert "Error" in result
+
+    @pytest.mark.asyncio
+    async def test_invalid_quantization(self, hash_embeddings):
+        result = await get_tool("create_collection")(name="tuned", quantization="int4")
+        assert "Error: Invalid quantization" in result
+
+    @pytest.mark.asyncio
+    async def test_configure_collection(self, hash_embeddings):
+        await get_tool("create_collection")(name="tuned")
+        result = await get_tool("configure_collection")(name="tuned", hnsw={"ef_search": 20})
+        assert "configured" in result
+
+        info = json.loads(await get_tool("get_collection_info")(name="tuned"))
+        assert info["hnsw"]["ef_search"] == 20
+
+    @pytest.mark.asyncio
+    async def test_quantized_query_matches_exact(self, vectors, quantized_index_dir):
+        query = get_tool("query")
+        exact = json.loads(await query(collection="exact", query_texts=["topic3 item10", "item42 shared"], n_results=5))
+        quantized = json.loads(
+            await query(collection="quantized", query_texts=["topic3 item10", "item42 shared"], n_results=5)
+        )
+
+        assert quantized["ids"][0][0] == exact["ids"][0][0] == "doc10"
+        assert quantized["ids"][1][0] == exact["ids"][1][0] == "doc42"
+        assert quantized["distances"][0] == pytest.approx(exact["distances"][0], abs=1e-5)
+        assert quantized["documents"][0][0] == vectors[10]
+        assert any(quantized_index_dir.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_writes_update_index(self, vectors, monkeypatch):
+        from vectorstore.quantization import QuantizedIndex
+
+        from vectorstore import tools
+
+        query = get_tool("query")
+        await query(collection="quantized", query_texts=["anything"], n_results=1)
+        collection = tools._get_collection("quantized")
+        assert collection.quantized.count() == 60
+        builds = []
+        monkeypatch.setattr(QuantizedIndex, "build", lambda self, c: builds.append(c))
+
+        await get_tool("add_documents")(collection="quantized", documents=["brand new words"], ids=["new"])
+        await get_tool("delete_documents")(collection="quantized", where={"parity": 1})
+        result = json.loads(await query(collection="quantized", query_texts=["brand new words"], n_results=1))
+
+        assert result["ids"] == [["new"]]
+        assert collection.quantized.count() == 31
+        assert not builds
+
+    def test_index_updates_and_compaction(self, tmp_path):
+        from vectorstore.quantization import QuantizedIndex
+
+        vectors = np.random.default_rng(0).normal(size=(20, 8)).astype(np.float32)
+        ids = [f"v{n}" for n in range(20)]
+        index = QuantizedIndex("test", "l2", tmp_path / "index")
+        index._create()
+        index.upsert(ids, vectors)
+        index.upsert(["v3"], -vectors[3:4])
+        index.delete(ids[15:])
+
+        assert index.count() == 15
+        assert len(index._load().ids) == 21
+        assert index.candidates(-vectors[3:4], 1) == [["v3"]]
+        # Reloaded from the files, as by another process
+        reloaded = QuantizedIndex("test", "l2", tmp_path / "index")
+        assert reloaded.count() == 15
+        assert "v17" not in reloaded.candidates(vectors[17:18], 15)[0]
+
+        index.delete(ids[:12])
+        # Deleted rows outnumbered live ones, the index was rewritten without them
+        assert len(index._load().ids) == 3
+        assert index.candidates(vectors[12:14], 1) == [["v12"], ["v13"]]
+
+    @pytest.mark.asyncio
+    async def test_quantized_query_with_filter(self, vectors):
+        result = json.loads(
+            await get_tool("query")(
+                collection="quantized", query_texts=["topic3 item10"], n_results=3, where={"parity": 1}
+            )
+        )
+
+        assert result["ids"][0]
+        assert all(metadata["parity"] == 1 for metadata in result["metadatas"][0])
+
+    def test_quantize_round_trip(self):
+        from vectorstore.quantization import quantize
+
+        vectors = np.random.default_rng(0).normal(size=(10, 32)).astype(np.float32)
+        codes, scales = quantize(vectors)
+
+        assert codes.dtype == np.int8
+        np.testing.assert_allclose(codes * scales[:, None], vectors, atol=scales.max())
+
+
+class TestDiversity:
+    @pytest_asyncio.fixture
+    async def notes(self, hash_embeddings):
+        await get_tool("create_collection")(name="notes")
+        await get_tool("add_documents")(
+            collection="notes",
+            documents=[
+                "pump pressure drops at startup",
+                "pump pressure drops at startup",
+                "pump pressure drops at startup",
+                "pump seal leaks after startup",
+                "valve pressure limits",
+            ],
+            ids=["copy1", "copy2", "copy3", "seal", "valve"],
+        )
+        return "notes"
+
+    @pytest.mark.asyncio
+    async def test_mmr_skips_near_duplicates(self, notes):
+        query = get_tool("query")
+        plain = json.loads(await query(collection=notes, query_texts=["pump pressure drops"], n_results=3))
+        diverse = json.loads(
+            await query(collection=notes, query_texts=["pump pressure drops"], n_results=3, diversity=0.5)
+        )
+
+        assert sorted(plain["ids"][0]) == ["copy1", "copy2", "copy3"]
+        assert diverse["ids"][0][0].startswith("copy")
+        assert sum(id_.startswith("copy") for id_ in diverse["ids"][0]) == 1
+        assert len(diverse["distances"][0]) == 3
+        assert diverse.get("embeddings") is None
+
+    @pytest.mark.asyncio
+    async def test_mmr_in_hybrid_mode(self, notes):
+        result = json.loads(
+            await get_tool("query")(
+                collection=notes, query_texts=["pump pressure"], n_results=2, mode="hybrid", diversity=0.5
+            )
+        )
+
+        assert sum(id_.startswith("copy") for id_ in result["ids"][0]) == 1
+        assert len(result["scores"][0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_dedup_across_queries(self, notes):
+        result = json.loads(
+            await get_tool("query")(
+                collection=notes, query_texts=["pump pressure drops", "pump startup"], n_results=3, dedup=True
+            )
+        )
+
+        assert len(result["ids"][1]) == 2
+        assert not set(result["ids"][0]) & set(result["ids"][1])
+        assert len(result["documents"][1]) == 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_diversity(self, notes):
+        result = await get_tool("query")(collection=notes, query_texts=["pump"], diversity=1.5)
+        assert "Error: diversity must be between 0 and 1" in result
+
+    def test_mmr(self):
+        from vectorstore.diversity import mmr
+
+        embeddings = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        relevance = np.array([1.0, 0.9, 0.5])
+
+        assert mmr(relevance, embeddings, 2, 0.0) == [0, 1]
+        assert mmr(relevance, embeddings, 2, 0.5) == [0, 2]
+        assert mmr(relevance, embeddings, 2, 0.5, picked=embeddings[[2]]) == [0, 1]
+
+
+class TestResponseEncoding:
+    @pytest_asyncio.fixture
+    async def docs(self, hash_embeddings):
+        await get_tool("create_collection")(name="docs")
+        await get_tool("add_documents")(
+            collection="docs",
+            documents=["alpha beta", "gamma delta", "epsilon"],
+            metadatas=[{"source": "a.md", "page": 1}, {"source": "b.md", "page": 2}, {"source": "c.md", "page": 3}],
+            ids=["a", "b", "c"],
+        )
+        return "docs"
+
+    @pytest.mark.asyncio
+    async def test_embeddings_as_json_lists(self, docs):
+        from vectorstore import tools
+
+        result = json.loads(await get_tool("get_documents")(collection=docs, include=["embeddings"]))
+        stored = tools._get_collection(docs).get(include=["embeddings"])
+
+        np.testing.assert_allclose(result["embeddings"], stored["embeddings"])
+
+    @pytest.mark.asyncio
+    async def test_embeddings_as_base64(self, docs):
+        from vectorstore.encoding import decode_embeddings
+
+        from vectorstore import tools
+
+        get = get_tool("get_documents")
+        stored = tools._get_collection(docs).get(include=["embeddings"])["embeddings"]
+        plain = await get(collection=docs, include=["embeddings"], output_format="compact")
+        full = await get(collection=docs, include=["embeddings"], output_format="compact", embedding_encoding="float32")
+        half = await get(collection=docs, include=["embeddings"], output_format="compact", embedding_encoding="float16")
+
+        assert decode_embeddings(json.loads(full)["embeddings"]).tolist() == np.asarray(stored).tolist()
+        np.testing.assert_allclose(decode_embeddings(json.loads(half)["embeddings"]), stored, atol=1e-3)
+        assert len(half) < len(full)
+        assert "embeddings" in json.loads(plain)
+
+    @pytest.mark.asyncio
+    async def test_query_encoding(self, docs):
+        from vectorstore.encoding import decode_embeddings
+
+        result = json.loads(
+            await get_tool("query")(
+                collection=docs,
+                query_texts=["alpha", "epsilon"],
+                n_results=2,
+                include=["metadatas", "embeddings"],
+                output_format="compact",
+                embedding_encoding="float16",
+                metadata_keys=["source"],
+            )
+        )
+
+        assert [decode_embeddings(e).shape for e in result["embeddings"]] == [(2, 64), (2, 64)]
+        assert all(set(m) == {"source"} for row in result["metadatas"] for m in row)
+
+    @pytest.mark.asyncio
+    async def test_compact_output(self, docs):
+        get = get_tool("get_documents")
+        pretty = await get(collection=docs)
+        compact = await get(collection=docs, output_format="compact", metadata_keys=["page"])
+
+        assert "\n" not in compact
+        assert json.loads(compact)["metadatas"] == [{"page": 1}, {"page": 2}, {"page": 3}]
+        assert json.loads(pretty)["metadatas"][0] == {"source": "a.md", "page": 1}
+
+    @pytest.mark.asyncio
+    async def test_invalid_encoding(self, docs):
+        result = await get_tool("get_documents")(collection=docs, output_format="yaml")
+        assert "Error: Invalid output_format 'yaml'" in result
+
+        result = await get_tool("query")(collection=docs, query_texts=["alpha"], embedding_encoding="int8")
+        assert "Error: Invalid embedding_encoding 'int8'" in result
+
+
+class TestIngestPdf:
+    @pytest.mark.asyncio
+    async def test_ingest_pdf(self, hash_embeddings, sample_pdf):
+        ingest_pdf = get_tool("ingest_pdf")
+        result = await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+
+        assert "3 chunks from 3 pages" in result
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="pdf_docs", ids=["sample.pdf:p2:c0"], include=["metadatas"]))
+        metadata = data["metadatas"][0]
+        assert metadata.pop("chunk_hash")
+        assert metadata == {"source": "sample.pdf", "page": 2, "chunk_index": 0, "total_pages": 3}
+
+    @pytest.mark.asyncio
+    async def test_embeddings_are_computed_once_per_chunk(self, hash_embeddings, sample_pdf):
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+
+        assert sum(len(call) for call in hash_embeddings.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_batches_follow_token_budget(self, hash_embeddings, sample_pdf, monkeypatch):
+        from vectorstore import ingest
+
+        monkeypatch.setattr(ingest, "EMBED_BATCH_TOKENS", 1)
+        ingest_pdf = get_tool("ingest_pdf")
+        result = await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+
+        assert "3 chunks" in result
+        assert [len(call) for call in hash_embeddings.calls] == [1, 1, 1]
+
+    @pytest.mark.asyncio
+    async def test_not_a_pdf(self, hash_embeddings, tmp_path):
+        text_file = tmp_path / "notes.txt"
+        text_file.write_text("hello")
+        ingest_pdf = get_tool("ingest_pdf")
+
+        assert "Error" in await ingest_pdf(file_path=str(text_file), collection="pdf_docs")
+
+    @pytest.mark.asyncio
+    async def test_file_not_found(self, hash_embeddings):
+        ingest_pdf = get_tool("ingest_pdf")
+
+        assert "Error" in await ingest_pdf(file_path="/nonexistent/file.pdf", collection="pdf_docs")
+
+
+class TestIngestPdfSync:
+    @staticmethod
+    def write_pdf(path, pages):
+        doc = pymupdf.open()
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+        doc.close()
+
+    @pytest.mark.asyncio
+    async def test_sync_unchanged_file(self, hash_embeddings, sample_pdf):
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+        hash_embeddings.calls.clear()
+
+        result = await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs", sync=True)
+
+        assert "0 chunks added or updated, 3 unchanged, 0 deleted" in result
+        assert hash_embeddings.calls == []
+
+    @pytest.mark.asyncio
+    async def test_sync_embeds_only_changed_chunks(self, hash_embeddings, tmp_path):
+        pdf_path = tmp_path / "report.pdf"
+        self.write_pdf(pdf_path, ["First page", "Second page", "Third page"])
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(pdf_path), collection="pdf_docs", sync=True)
+        hash_embeddings.calls.clear()
+
+        self.write_pdf(pdf_path, ["First page", "Second page, revised", "Third page"])
+        result = await ingest_pdf(file_path=str(pdf_path), collection="pdf_docs", sync=True)
+
+        assert "1 chunks added or updated, 2 unchanged, 0 deleted" in result
+        assert hash_embeddings.calls == [["Second page, revised"]]
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="pdf_docs", ids=["report.pdf:p2:c0"]))
+        assert data["documents"] == ["Second page, revised"]
+
+    @pytest.mark.asyncio
+    async def test_sync_deletes_removed_chunks(self, hash_embeddings, tmp_path):
+        pdf_path = tmp_path / "report.pdf"
+        self.write_pdf(pdf_path, ["First page", "Second page", "Third page"])
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(pdf_path), collection="pdf_docs", sync=True)
+
+        self.write_pdf(pdf_path, ["First page", "Second page"])
+        result = await ingest_pdf(file_path=str(pdf_path), collection="pdf_docs", sync=True)
+
+        assert "1 deleted" in result
+        get_collection_info = get_tool("get_collection_info")
+        assert json.loads(await get_collection_info(name="pdf_docs"))["count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_sync_keeps_other_sources(self, hash_embeddings, sample_pdf, tmp_path):
+        pdf_path = tmp_path / "other.pdf"
+        self.write_pdf(pdf_path, ["Other document"])
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+
+        result = await ingest_pdf(file_path=str(pdf_path), collection="pdf_docs", sync=True)
+
+        assert "1 chunks added or updated, 0 unchanged, 0 deleted" in result
+        get_collection_info = get_tool("get_collection_info")
+        assert json.loads(await get_collection_info(name="pdf_docs"))["count"] == 4
+
+
+class TestChunking:
+    TEXT = (
+        "# Introduction\n"
+        "Vector stores index chunks of text. Each chunk is embedded once.\n"
+        "\n"
+        "Chunks should not cut sentences in half. Otherwise retrieval suffers.\n"
+        "# Methods\n"
+        "We compare two chunkers on the same corpus.\n"
+    )
+
+    def test_structure_chunks_end_at_headings(self):
+        from vectorstore.chunking import chunk_pages
+
+        chunks = list(chunk_pages([(0, self.TEXT)], 100, 0, "structure"))
+
+        assert [chunk.section for chunk in chunks] == ["Introduction", "Methods"]
+        assert chunks[0].text.startswith("Introduction\n\nVector stores index chunks of text.")
+        assert chunks[1].text == "Methods\n\nWe compare two chunkers on the same corpus."
+
+    def test_structure_chunks_keep_sentences_within_budget(self):
+        from vectorstore.chunking import chunk_pages, estimate_tokens, split_sentences
+
+        sentences = [f"Sentence number {n} talks about topic {n % 7}." for n in range(200)]
+        chunks = list(chunk_pages([(0, " ".join(sentences))], 64, 16, "structure"))
+
+        assert all(estimate_tokens(chunk.text) <= 64 for chunk in chunks)
+        assert all(sentence in sentences for chunk in chunks for sentence in split_sentences(chunk.text))
+        # Consecutive chunks overlap by whole sentences
+        assert split_sentences(chunks[1].text)[0] in split_sentences(chunks[0].text)
+
+    def test_structure_paragraphs_continue_across_pages(self):
+        from vectorstore.chunking import chunk_pages
+
+        pages = [(0, "A paragraph that continues\non the next"), (1, "page and ends here.\n\nNext paragraph.")]
+        chunks = list(chunk_pages(pages, 1000, 0, "structure"))
+
+        assert len(chunks) == 1
+        assert chunks[0].text == "A paragraph that continues on the next page and ends here.\n\nNext paragraph."
+        assert (chunks[0].page, chunks[0].page_end) == (0, 1)
+
+    def test_sentence_splitting(self):
+        from vectorstore.chunking import split_sentences
+
+        assert split_sentences('Dr. Smith said "Hello." Then he left. See Fig. 2 for details!') == [
+            'Dr. Smith said "Hello."',
+            "Then he left.",
+            "See Fig. 2 for details!",
+        ]
+
+    def test_unknown_tokenizer_falls_back_to_estimate(self, hash_embeddings):
+        from vectorstore.chunking import estimate_tokens, token_counter, tokenizer_spec
+
+        assert tokenizer_spec(hash_embeddings) == "estimate"
+        assert token_counter("hf:/nonexistent/tokenizer.json") is estimate_tokens
+
+    def test_fallback_warned_once(self, tmp_path, capsys):
+        from vectorstore.chunking import token_counter
+
+        spec = f"hf:{tmp_path / 'tokenizer.json'}"
+        token_counter(spec)
+        token_counter(spec)
+
+        assert capsys.readouterr().err.count(f"Could not load tokenizer '{spec}'") == 1
+
+    def test_tokenizer_loaded_after_fallback(self, tmp_path):
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from vectorstore.chunking import estimate_tokens, token_counter
+
+        path = tmp_path / "tokenizer.json"
+        assert token_counter(f"hf:{path}") is estimate_tokens
+
+        # The model files appear after the first embedding
+        tokenizer = Tokenizer(models.WordLevel({"[UNK]": 0}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        tokenizer.save(str(path))
+        assert token_counter(f"hf:{path}")("one two three") == 3
+
+    def test_structure_chunk_size_clamped_to_model_limit(self, tmp_path):
+        from vectorstore.chunking import MAX_MODEL_TOKENS, chunk_pages
+
+        text = " ".join(f"Sentence number {n} talks about topic {n % 7}." for n in range(200))
+        chunks = list(chunk_pages([(0, text)], 1000, 200, "structure", f"hf:{tmp_path / 'tokenizer.json'}"))
+
+        assert len(chunks) > 1
+        assert all(len(chunk.text) <= 4 * MAX_MODEL_TOKENS["hf"] for chunk in chunks)
+
+    @pytest.mark.asyncio
+    async def test_ingest_pdf_structure_chunker(self, hash_embeddings, sample_pdf):
+        ingest_pdf = get_tool("ingest_pdf")
+        result = await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs", chunker="structure")
+
+        assert "1 chunks from 3 pages" in result
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="pdf_docs", ids=["sample.pdf:p1:c0"]))
+        assert data["metadatas"][0]["page_end"] == 3
+        assert "Page 3 discusses topic3 in detail." in data["documents"][0]
+
+    @pytest.mark.asyncio
+    async def test_invalid_chunker(self, hash_embeddings, sample_pdf):
+        ingest_pdf = get_tool("ingest_pdf")
+
+        assert "Error: Invalid chunker" in await ingest_pdf(
+            file_path=str(sample_pdf), collection="pdf_docs", chunker="x"
+        )
+
+
+class TestIngestDirectory:
+    @pytest.mark.asyncio
+    async def test_ingest_directory(self, hash_embeddings, corpus):
+        ingest_directory = get_tool("ingest_directory")
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        assert "Ingested 4 files (5 chunks)" in result
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="corpus", ids=["notes/meeting.txt:p1:c0"]))
+        assert data["documents"] == ["Meeting notes about the budget"]
+        assert data["metadatas"][0]["source"] == "notes/meeting.txt"
+
+    @pytest.mark.asyncio
+    async def test_include_and_exclude(self, hash_embeddings, corpus):
+        ingest_directory = get_tool("ingest_directory")
+        result = await ingest_directory(
+            directory=str(corpus), collection="corpus", include="**/*.txt", exclude=["drafts/*"], workers=1
+        )
+
+        assert "Ingested 1 files (1 chunks)" in result
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_ingested_files(self, hash_embeddings, corpus):
+        ingest_directory = get_tool("ingest_directory")
+        await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+        hash_embeddings.calls.clear()
+
+        (corpus / "notes" / "meeting.txt").write_text("Meeting notes, updated")
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        assert "Ingested 1 files (1 chunks)" in result
+        assert "Skipped 3 files already ingested" in result
+        assert hash_embeddings.calls == [["Meeting notes, updated"]]
+
+    @pytest.mark.asyncio
+    async def test_modified_file_drops_removed_pages(self, hash_embeddings, corpus):
+        import pymupdf
+
+        ingest_directory = get_tool("ingest_directory")
+        await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        doc = pymupdf.open()
+        doc.new_page().insert_text((72, 72), "Shorter report")
+        doc.save(corpus / "report.pdf")
+        doc.close()
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        assert "Removed 1 chunks of earlier versions" in result
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="corpus", where={"source": "report.pdf"}))
+        assert data["ids"] == ["report.pdf:p1:c0"]
+        assert data["documents"][0].strip() == "Shorter report"
+
+    @pytest.mark.asyncio
+    async def test_emptied_file_drops_all_chunks(self, hash_embeddings, corpus):
+        ingest_directory = get_tool("ingest_directory")
+        await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        (corpus / "notes" / "meeting.txt").write_text("  \n")
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        assert "Ingested 1 files (0 chunks)" in result
+        assert "Removed 1 chunks of earlier versions" in result
+        get_documents = get_tool("get_documents")
+        data = json.loads(await get_documents(collection="corpus", where={"source": "notes/meeting.txt"}))
+        assert data["ids"] == []
+
+    @pytest.mark.asyncio
+    async def test_no_resume_reingests_everything(self, hash_embeddings, corpus):
+        ingest_directory = get_tool("ingest_directory")
+        await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1, resume=False)
+
+        assert "Ingested 4 files (5 chunks)" in result
+        get_collection_info = get_tool("get_collection_info")
+        assert json.loads(await get_collection_info(name="corpus"))["count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_parallel_workers_and_progress(self, hash_embeddings, corpus, monkeypatch):
+        from vectorstore import ingest
+
+        monkeypatch.setattr(ingest, "WRITE_BATCH_SIZE", 1)
+        progress = []
+
+        class FakeContext:
+            async def report_progress(self, progress_value, total=None, message=None):
+                progress.append((progress_value, total))
+
+        ingest_directory = get_tool("ingest_directory")
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=2, ctx=FakeContext())
+
+        assert "Ingested 4 files (5 chunks)" in result
+        assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+    @pytest.mark.asyncio
+    async def test_failed_files_are_retried(self, hash_embeddings, corpus):
+        (corpus / "broken.pdf").write_bytes(b"not a pdf")
+        ingest_directory = get_tool("ingest_directory")
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+
+        assert "Ingested 4 files" in result
+        assert "Failed 1 files:\n  broken.pdf:" in result
+
+        result = await ingest_directory(directory=str(corpus), collection="corpus", workers=1)
+        assert "Ingested 0 files" in result
+        assert "Failed 1 files" in result
+
+    @pytest.mark.asyncio
+    async def test_directory_not_found(self, hash_embeddings):
+        ingest_directory = get_tool("ingest_directory")
+
+        assert "Error" in await ingest_directory(directory="/nonexistent/corpus", collection="corpus")
+
+    def test_buffered_writer(self):
+        from vectorstore.ingest import BufferedWriter
+
+        writes = []
+        writer = BufferedWriter(lambda **batch: writes.append(batch["ids"]), batch_size=3)
+        writer(ids=["a", "b"], documents=["", ""], metadatas=[{}, {}], embeddings=[[0.0], [0.0]])
+        writer(ids=["c", "d", "e", "f", "g"], documents=[""] * 5, metadatas=[{}] * 5, embeddings=[[0.0]] * 5)
+        writer.flush()
+
+        assert writes == [["a", "b", "c"], ["d", "e", "f"], ["g"]]
+
+
+class TestIngestPipeline:
+    def test_retry_transient_errors(self, monkeypatch):
+        from vectorstore import ingest
+
+        monkeypatch.setattr(ingest, "BACKOFF_BASE", 0)
+        attempts = []
+
+        def flaky(texts):
+            attempts.append(texts)
+            if len(attempts) < 3:
+                raise ConnectionError("connection reset")
+            return [[1.0] for _ in texts]
+
+        assert ingest.embed_with_retry(flaky, ["a", "b"]) == [[1.0], [1.0]]
+        assert len(attempts) == 3
+
+    def test_retries_exhausted(self, monkeypatch):
+        from vectorstore import ingest
+
+        monkeypatch.setattr(ingest, "BACKOFF_BASE", 0)
+
+        def failing(texts):
+            raise ConnectionError("connection reset")
+
+        with pytest.raises(ConnectionError):
+            ingest.embed_with_retry(failing, ["a"], max_retries=2)
+
+    def test_batches_are_written_in_order(self):
+        from vectorstore.ingest import Chunk, ingest_chunks
+
+        written = []
+        chunks = [Chunk(f"id{i}", "word " * (i + 1), {"i": i}) for i in range(20)]
+        count = ingest_chunks(
+            lambda **batch: written.extend(batch["ids"]),
+            lambda texts: [[float(len(text))] for text in texts],
+            chunks,
+            max_tokens=8,
+            concurrency=3,
+        )
+
+        assert count == 20
+        assert written == [f"id{i}" for i in range(20)]
+
+    def test_parallel_page_extraction(self, tmp_path):
+        from vectorstore.ingest import EXTRACT_WINDOW, iter_pdf_pages
+
+        pdf_path = tmp_path / "long.pdf"
+        doc = pymupdf.open()
+        for n in range(EXTRACT_WINDOW * 2 + 5):
+            doc.new_page().insert_text((72, 72), f"Page {n + 1}")
+        doc.save(pdf_path)
+        doc.close()
+
+        pages = list(iter_pdf_pages(pdf_path, workers=2))
+
+        assert [i for i, _, _ in pages] == list(range(EXTRACT_WINDOW * 2 + 5))
+        assert pages[-1][1].strip() == f"Page {EXTRACT_WINDOW * 2 + 5}"
+
+
+class TestEmbeddingCache:
+    def test_only_uncached_text_is_embedded(self, hash_embeddings, embedding_cache):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        cached = CachedEmbeddingFunction(hash_embeddings, embedding_cache)
+        first = cached(["alpha beta", "gamma"])
+        second = cached(["gamma", "delta", "alpha  beta\n"])
+
+        assert hash_embeddings.calls == [["alpha beta", "gamma"], ["delta"]]
+        assert (second[0] == first[1]).all()
+        assert (second[2] == first[0]).all()
+
+    def test_duplicate_text_is_embedded_once(self, hash_embeddings, embedding_cache):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        cached = CachedEmbeddingFunction(hash_embeddings, embedding_cache)
+        embeddings = cached(["same text", "same text"])
+
+        assert hash_embeddings.calls == [["same text"]]
+        assert len(embeddings) == 2
+
+    def test_entries_are_keyed_by_model(self, hash_embeddings, embedding_cache):
+        from conftest import HashEmbeddingFunction
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        other = HashEmbeddingFunction(dimensions=32)
+        CachedEmbeddingFunction(hash_embeddings, embedding_cache)(["text"])
+        embeddings = CachedEmbeddingFunction(other, embedding_cache)(["text"])
+
+        assert other.calls == [["text"]]
+        assert len(embeddings[0]) == 32
+
+    def test_evicts_least_recently_used(self, hash_embeddings, tmp_path):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction, EmbeddingCache, model_key, text_hash
+
+        # Room for two 64-dimensional float32 vectors
+        cache = EmbeddingCache(str(tmp_path / "small.db"), max_bytes=2 * 64 * 4)
+        cached = CachedEmbeddingFunction(hash_embeddings, cache)
+        cached(["one"])
+        cached(["two"])
+        cached(["one"])
+        cached(["three"])
+
+        found = cache.get_many(model_key(hash_embeddings), [text_hash(t) for t in ("one", "two", "three")])
+        assert set(found) == {text_hash("one"), text_hash("three")}
+
+    def test_queries_use_wrapped_embed_query(self, hash_embeddings, embedding_cache, monkeypatch):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        monkeypatch.setattr(hash_embeddings, "embed_query", lambda input: [[1.0] * 64 for _ in input], raising=False)
+        cached = CachedEmbeddingFunction(hash_embeddings, embedding_cache)
+
+        assert cached.embed_query(["query"]) == [[1.0] * 64]
+        assert cached.name() == "hash"
+        assert hash_embeddings.calls == []
+
+    @pytest.mark.asyncio
+    async def test_reingest_reuses_embeddings(self, hash_embeddings, sample_pdf, monkeypatch):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        from vectorstore import tools
+
+        monkeypatch.setattr(tools, "_embedding_function", CachedEmbeddingFunction(hash_embeddings))
+        ingest_pdf = get_tool("ingest_pdf")
+        await ingest_pdf(file_path=str(sample_pdf), collection="pdf_docs")
+        result = await ingest_pdf(file_path=str(sample_pdf), collection="pdf_copy")
+
+        assert "3 chunks" in result
+        assert sum(len(call) for call in hash_embeddings.calls) == 3
+
+    def test_wrapper_is_compatible_with_wrapped_function(self, hash_embeddings):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        from vectorstore import tools
+
+        client = tools._get_client()
+        client.create_collection("hashed", embedding_function=hash_embeddings)
+        collection = client.get_collection("hashed", embedding_function=CachedEmbeddingFunction(hash_embeddings))
+
+        collection.add(ids=["a"], documents=["cached text"])
+        assert collection.query(query_texts=["cached text"], n_results=1)["ids"] == [["a"]]
+
+    def test_class_and_instance_report_wrapped_name(self, hash_embeddings, monkeypatch):
+        from chromadb.utils.embedding_functions import known_embedding_functions
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+
+        from vectorstore import tools
+
+        monkeypatch.setitem(known_embedding_functions, "hash", type(hash_embeddings))
+        cached = CachedEmbeddingFunction(hash_embeddings)
+        assert type(cached).name() == cached.name() == "hash"
+
+        client = tools._get_client()
+        client.create_collection("hashed", embedding_function=cached)
+        # Chroma rebuilds the function from the collection configuration
+        rebuilt = client.get_collection("hashed").configuration["embedding_function"]
+        assert isinstance(rebuilt, CachedEmbeddingFunction)
+        assert rebuilt.get_config() == hash_embeddings.get_config()
+
+    def test_configured_function_is_cached(self, temp_chroma_path):
+        from vectorstore.embedding_cache import CachedEmbeddingFunction
+        from vectorstore.tools import _get_embedding_function
+
+        embedding_function = _get_embedding_function()
+
+        assert isinstance(embedding_function, CachedEmbeddingFunction)
+        assert embedding_function.name() == "default"
+
+
+class TestLocalEmbedding:
+    VOCABULARY = ("[PAD]", "[UNK]", "alpha", "beta", "gamma", "delta")
+
+    class OneHotModel:
+        """Stands in for the ONNX session: each token's hidden state is its one-hot vector."""
+
+        def __init__(self, dimensions: int):
+            self.dimensions = dimensions
+            self.shapes = []
+
+        def run(self, output_names, inputs):
+            import numpy as np
+
+            self.shapes.append(inputs["input_ids"].shape)
+            return [np.eye(self.dimensions, dtype=np.float32)[inputs["input_ids"]]]
+
+    @pytest.fixture
+    def local_embeddings(self, tmp_path, monkeypatch):
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        from vectorstore.local_embedding import LocalEmbeddingFunction
+
+        embedding_function = LocalEmbeddingFunction(batch_size=2, threads=1, model_dir=tmp_path / "models")
+        tokenizer = Tokenizer(models.WordLevel({w: i for i, w in enumerate(self.VOCABULARY)}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        model_path = embedding_function.DOWNLOAD_PATH / "onnx"
+        model_path.mkdir(parents=True)
+        tokenizer.save(str(model_path / "tokenizer.json"))
+
+        monkeypatch.setattr(embedding_function, "_download_model_if_not_exists", lambda: None)
+        embedding_function.model = self.OneHotModel(len(self.VOCABULARY))
+        return embedding_function
+
+    def test_batches_are_padded_to_longest_document(self, local_embeddings):
+        import numpy as np
+
+        documents = ["alpha beta gamma delta", "alpha", "beta gamma", "delta"]
+        embeddings = local_embeddings(documents)
+
+        # Sorted by length: ("alpha", "delta"), then ("beta gamma", "alpha beta gamma delta")
+        assert local_embeddings.model.shapes == [(2, 1), (2, 4)]
+        for document, embedding in zip(documents, embeddings):
+            assert np.allclose(embedding, local_embeddings([document])[0])
+        assert np.allclose(embeddings[2], [0, 0, 0, 0.5**0.5, 0.5**0.5, 0])
+
+    def test_session_uses_configured_threads(self, tmp_path):
+        from types import SimpleNamespace
+
+        from vectorstore.local_embedding import LocalEmbeddingFunction
+
+        embedding_function = LocalEmbeddingFunction(threads=3, model_dir=tmp_path)
+        embedding_function.ort = SimpleNamespace(
+            SessionOptions=SimpleNamespace,
+            GraphOptimizationLevel=SimpleNamespace(ORT_ENABLE_ALL="all"),
+            ExecutionMode=SimpleNamespace(ORT_SEQUENTIAL="sequential"),
+            InferenceSession=lambda path, providers, sess_options: (path, providers, sess_options),
+        )
+        path, providers, options = embedding_function.model
+
+        assert path == str(tmp_path / "all-MiniLM-L6-v2" / "onnx" / "model.onnx")
+        assert providers == ["CPUExecutionProvider"]
+        assert options.intra_op_num_threads == 3
+
+    @pytest.mark.asyncio
+    async def test_configured_local_backend(self, temp_chroma_path, monkeypatch):
+        from vectorstore.chunking import tokenizer_spec
+        from vectorstore.local_embedding import LocalEmbeddingFunction
+
+        from vectorstore import tools
+
+        monkeypatch.setenv("EMBEDDING_TYPE", "local")
+        embedding_function = tools._get_embedding_function()
+
+        assert isinstance(embedding_function.embedding_function, LocalEmbeddingFunction)
+        assert tokenizer_spec(embedding_function) == (
+            f"hf:{embedding_function.embedding_function.DOWNLOAD_PATH / 'onnx' / 'tokenizer.json'}"
+        )
+
+        create_collection = get_tool("create_collection")
+        assert "created successfully" in await create_collection(name="local_docs")
+        configuration = tools._get_client().get_collection("local_docs").configuration
+        assert configuration["embedding_function"].name() == "local"